@@ -1,7 +1,7 @@
 from evennia import default_cmds
 from evennia.utils import ansi
 from commands.CmdPose import PoseBreakMixin
-import re
+from world.wod20th.utils.speech import parse_speech
 
 class CmdEmit(PoseBreakMixin, default_cmds.MuxCommand):
     """
@@ -58,44 +58,15 @@ class CmdEmit(PoseBreakMixin, default_cmds.MuxCommand):
 
             message = processed_args.strip()
 
-            def process_speech(match):
-                content = match.group(1)
-                if content.startswith('~'):
-                    content = content[1:]  # Remove the tilde
-                    _, msg_understand, msg_not_understand, _ = caller.prepare_say(content, language_only=True)
-                    return f'"{msg_understand}"', f'"{msg_not_understand}"'
-                else:
-                    return f'"{content}"', f'"{content}"'
-
-            # Process the message
-            parts_understand = []
-            parts_not_understand = []
-            last_end = 0
-            for match in re.finditer(r'"(.*?)"', message):
-                parts_understand.append(message[last_end:match.start()])
-                parts_not_understand.append(message[last_end:match.start()])
-                
-                understand, not_understand = process_speech(match)
-                parts_understand.append(understand)
-                parts_not_understand.append(not_understand)
-                
-                last_end = match.end()
-            
-            parts_understand.append(message[last_end:])
-            parts_not_understand.append(message[last_end:])
-
-            emit_understand = "".join(parts_understand)
-            emit_not_understand = "".join(parts_not_understand)
+            # Split the emit into narration and quotes once
+            speech = parse_speech(message, speaking_language)
+            emit_understand = speech.understood
+            emit_not_understand = speech.masked
 
             # Send the message to the room
-            for receiver in [char for char in caller.location.contents if char.has_account]:
-                if receiver != caller:
-                    if speaking_language and speaking_language in receiver.get_languages():
-                        receiver.msg(emit_understand)
-                    else:
-                        receiver.msg(emit_not_understand)
-                else:
-                    receiver.msg(f"{emit_understand}")
+            caller.location.broadcast(
+                {"understand": emit_understand, "not_understand": emit_not_understand},
+                from_obj=caller, language=speaking_language)
 
             # Log the emit
             caller.location.msg_contents(f"{message}", exclude=caller)
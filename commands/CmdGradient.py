@@ -1,4 +1,5 @@
 from evennia import Command
+from world.wod20th.utils.activity import presence_changed
 # Extensive Color Map
 COLOR_MAP = {
     # General, commonly used colors
@@ -175,6 +176,8 @@ class CmdGradientName(Command):
         gradient_name = self.create_gradient(target.key, start_rgb, end_rgb)
         
         target.db.gradient_name = gradient_name
+        # +where shows the gradient name.
+        presence_changed()
         if target == self.caller:
             self.caller.msg(f"Your name now appears as: {gradient_name}")
         else:
@@ -66,6 +66,7 @@ class CmdHurt(Command):
 
         if target.db.agg > health:
             target.db.agg = health
+            target.bump_stats_version()
 
         # Get the green gradient_name of th target
         target_gradient = target.db.gradient_name or target.key
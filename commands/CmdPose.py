@@ -1,5 +1,5 @@
 from evennia import default_cmds
-import re
+from world.wod20th.utils.speech import parse_speech
 
 class PoseBreakMixin:
     """
@@ -78,34 +78,10 @@ class CmdPose(PoseBreakMixin, default_cmds.MuxCommand):
         # Get the character's speaking language
         speaking_language = self.caller.get_speaking_language()
 
-        def process_speech(match):
-            content = match.group(1)
-            if content.startswith('~'):
-                content = content[1:]  # Remove the tilde
-                msg_self, msg_understand, msg_not_understand, _ = self.caller.prepare_say(content, language_only=True)
-                return f'"{msg_understand}"', f'"{msg_not_understand}"'
-            else:
-                return f'"{content}"', f'"{content}"'
-
-        # Process the pose message
-        pose_parts_understand = []
-        pose_parts_not_understand = []
-        last_end = 0
-        for match in re.finditer(r'"(.*?)"', processed_args):
-            pose_parts_understand.append(processed_args[last_end:match.start()])
-            pose_parts_not_understand.append(processed_args[last_end:match.start()])
-            
-            understand, not_understand = process_speech(match)
-            pose_parts_understand.append(understand)
-            pose_parts_not_understand.append(not_understand)
-            
-            last_end = match.end()
-        
-        pose_parts_understand.append(processed_args[last_end:])
-        pose_parts_not_understand.append(processed_args[last_end:])
-
-        pose_understand = "".join(pose_parts_understand)
-        pose_not_understand = "".join(pose_parts_not_understand)
+        # Split the pose into narration and quotes once
+        speech = parse_speech(processed_args, speaking_language)
+        pose_understand = speech.understood
+        pose_not_understand = speech.masked
 
         # Construct the final pose messages
         pose_self = f"{poser_name}{pose_understand}"
@@ -113,11 +89,6 @@ class CmdPose(PoseBreakMixin, default_cmds.MuxCommand):
         pose_not_understand = f"{poser_name}{pose_not_understand}"
 
         # Announce the pose to the room
-        for receiver in [char for char in self.caller.location.contents if char.has_account]:
-            if receiver != self.caller:
-                if speaking_language and speaking_language in receiver.get_languages():
-                    receiver.msg(pose_understand)
-                else:
-                    receiver.msg(pose_not_understand)
-            else:
-                receiver.msg(pose_self)
+        self.caller.location.broadcast(
+            {"self": pose_self, "understand": pose_understand, "not_understand": pose_not_understand},
+            from_obj=self.caller, language=speaking_language)
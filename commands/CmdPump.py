@@ -1,6 +1,9 @@
 from evennia import default_cmds
 from evennia.utils import utils
 from world.wod20th.models import Stat
+from world.wod20th.utils.stat_resolver import StatNameIndex
+
+PUMPABLE_ATTRIBUTES = StatNameIndex(["Strength", "Dexterity", "Stamina"])
 
 class CmdPump(default_cmds.MuxCommand):
     """
@@ -30,7 +33,7 @@ class CmdPump(default_cmds.MuxCommand):
         caller = self.caller
 
         # Check if the character is a vampire
-        if caller.db.stats.get('other', {}).get('splat', {}).get('Splat', {}).get('perm') != 'Vampire':
+        if caller.stats.get_type('other', 'splat').get('Splat', {}).get('perm') != 'Vampire':
             caller.msg("Only vampires can use this power.")
             return
 
@@ -39,13 +42,16 @@ class CmdPump(default_cmds.MuxCommand):
             return
 
         attribute, amount = self.args.split("=")
-        attribute = attribute.strip().lower()
         amount = amount.strip()
 
-        valid_attributes = ["strength", "dexterity", "stamina"]
-        if attribute not in valid_attributes:
-            caller.msg(f"Invalid attribute. Choose from: {', '.join(valid_attributes)}")
+        # Blood is spent on the result, so don't guess between attributes
+        # sharing a prefix.
+        ambiguous = len(PUMPABLE_ATTRIBUTES.prefixed(attribute.strip())) > 1
+        resolved = None if ambiguous else PUMPABLE_ATTRIBUTES.resolve(attribute)
+        if not resolved:
+            caller.msg(f"Invalid attribute. Choose from: {', '.join(PUMPABLE_ATTRIBUTES.keys)}")
             return
+        attribute = resolved.lower()
 
         try:
             amount = int(amount)
@@ -58,7 +64,7 @@ class CmdPump(default_cmds.MuxCommand):
             return
 
         # Get the current blood pool value
-        current_blood = caller.db.stats.get('pools', {}).get('dual', {}).get('Blood', {}).get('temp', 0)
+        current_blood = caller.stats.get_type('pools', 'dual').get('Blood', {}).get('temp', 0)
         if current_blood < amount:
             caller.msg(f"You don't have enough blood. Current blood: {current_blood}")
             return
@@ -78,7 +84,7 @@ class CmdPump(default_cmds.MuxCommand):
             return
 
         # Decrease blood pool
-        caller.db.stats['pools']['dual']['Blood']['temp'] = current_blood - actual_increase
+        caller.set_stat('pools', 'dual', 'Blood', current_blood - actual_increase, temp=True)
 
         # Increase attribute
         caller.set_stat('attributes', 'physical', attribute.capitalize(), new_value, temp=True)
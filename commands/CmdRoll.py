@@ -2,9 +2,11 @@ from evennia import default_cmds
 from evennia.utils.ansi import ANSIString
 from evennia.utils import inherits_from
 from world.wod20th.models import Stat
-from world.wod20th.utils.dice_rolls import roll_dice, interpret_roll_results
+from world.wod20th.utils.dice_rolls import roll_seeded, format_roll
+from world.wod20th.utils.dice_odds import roll_odds
+from world.wod20th.utils.roll_log import log_roll, recent_rolls, replay_roll
+from world.wod20th.models import RollLog
 import re
-from difflib import get_close_matches
 
 class CmdRoll(default_cmds.MuxCommand):
     """
@@ -12,15 +14,26 @@ class CmdRoll(default_cmds.MuxCommand):
 
     Usage:
       +roll <expression> [vs <difficulty>]
+      +roll/odds <expression> [vs <difficulty>]
+      +roll/log [<character>]          (staff)
+      +roll/replay <roll number>       (staff)
 
     Examples:
       +roll strength+dexterity+3-2
       +roll stre+dex+3-2 vs 7
+      +roll/odds 7 vs 8
 
     This command allows you to roll dice based on your character's stats
     and any modifiers. You can specify stats by their full name or abbreviation.
     The difficulty is optional and defaults to 6 if not specified.
     Stats that don't exist or have non-numeric values are treated as 0.
+
+    /odds shows the exact chance of each number of successes and of a
+    botch for the pool instead of rolling it. Nothing is shown to the room.
+
+    Every roll is logged with the seed it was rolled from. Staff can list
+    recent rolls with /log and roll a logged roll's dice again with
+    /replay to check them.
     """
 
     key = "+roll"
@@ -29,6 +42,15 @@ class CmdRoll(default_cmds.MuxCommand):
     help_category = "Game"
 
     def func(self):
+        if "log" in self.switches or "replay" in self.switches:
+            if not self.caller.check_permstring("builders"):
+                self.caller.msg("You don't have permission to view the roll log.")
+            elif "log" in self.switches:
+                self.show_log()
+            else:
+                self.show_replay()
+            return
+
         if not self.args:
             self.caller.msg("Usage: +roll <expression> [vs <difficulty>]")
             return
@@ -42,7 +64,45 @@ class CmdRoll(default_cmds.MuxCommand):
         expression, difficulty = match.groups()
         difficulty = int(difficulty) if difficulty else 6
 
-        # Process the expression
+        dice_pool, description, detailed_description, warnings = self.parse_pool(expression)
+
+        if "odds" in self.switches:
+            self.show_odds(dice_pool, difficulty, " ".join(detailed_description), warnings)
+            return
+
+        # Roll the dice from a fresh seed and log it so the roll can be replayed
+        engine, roll = roll_seeded(dice_pool, difficulty)
+        log_roll(self.caller, expression.strip(), dice_pool, difficulty, engine, roll)
+
+        # Describe the roll from the same scoring the log keeps
+        result = format_roll(roll, diff=difficulty)
+
+        # Format the outputs
+        public_description = " ".join(description)
+        private_description = " ".join(detailed_description)
+        
+        public_output = f"|rRoll>|n {self.caller.db.gradient_name or self.caller.key} |yrolls |n{public_description} |yvs {difficulty} |r=>|n {result}"
+        private_output = f"|rRoll> |yYou roll |n{private_description} |yvs {difficulty} |r=>|n {result}"
+        builder_output = f"|rRoll> |n{self.caller.db.gradient_name or self.caller.key} rolls {private_description} |yvs {difficulty}|r =>|n {result}"
+
+        # Send outputs
+        self.caller.msg(private_output)
+        if warnings:
+            self.caller.msg("\n".join(warnings))
+
+        # Send builder to builders, and public to everyone else
+        self.caller.location.broadcast(
+            {"builder": builder_output, "understand": public_output},
+            exclude=self.caller)
+
+    def parse_pool(self, expression):
+        """
+        Work out the dice pool for a roll expression.
+
+        Returns:
+            tuple: (dice pool, public description parts, detailed
+                description parts, warnings)
+        """
         components = re.findall(r'([+-])?\s*(\w+|\d+)', expression)
         dice_pool = 0
         description = []
@@ -75,72 +135,102 @@ class CmdRoll(default_cmds.MuxCommand):
                     detailed_description.append(f"{sign} |h|x{full_name} (0)|n")
                     warnings.append(f"|rWarning: Stat '{full_name}' not found or has no value. Treating as 0.|n")
 
-        # Roll the dice using our utility function
-        rolls, successes, ones = roll_dice(dice_pool, difficulty)
-        
-        # Interpret the results
-        result = interpret_roll_results(successes, ones, rolls=rolls, diff=difficulty)
+        return dice_pool, description, detailed_description, warnings
 
-        # Format the outputs
-        public_description = " ".join(description)
-        private_description = " ".join(detailed_description)
-        
-        public_output = f"|rRoll>|n {self.caller.db.gradient_name or self.caller.key} |yrolls |n{public_description} |yvs {difficulty} |r=>|n {result}"
-        private_output = f"|rRoll> |yYou roll |n{private_description} |yvs {difficulty} |r=>|n {result}"
-        builder_output = f"|rRoll> |n{self.caller.db.gradient_name or self.caller.key} rolls {private_description} |yvs {difficulty}|r =>|n {result}"
+    def show_odds(self, dice_pool, difficulty, pool_description, warnings):
+        """
+        Send the caller the odds table for a pool.
+        """
+        try:
+            odds = roll_odds(dice_pool, difficulty)
+        except ValueError as err:
+            self.caller.msg(f"|rOdds> {err}|n")
+            return
 
-        # Send outputs
-        self.caller.msg(private_output)
+        lines = [f"|rOdds>|n {pool_description} |yvs {difficulty}|n ({max(0, dice_pool)} dice)"]
+        lines.append(f"|wBotch:|n {odds.botch:6.1%}   |wAverage successes:|n {odds.expected:.2f}")
+        lines.append("|wSuccesses   Exactly   At least|n")
+        for successes in range(len(odds.successes)):
+            at_least = odds.at_least(successes)
+            if successes and at_least < 0.0005:
+                break
+            lines.append(f"{successes:>9}   {odds.exactly(successes):>7.1%}   {at_least:>8.1%}")
+        self.caller.msg("\n".join(lines))
         if warnings:
             self.caller.msg("\n".join(warnings))
 
-        # Send builder to builders, and public to everyone else
-        for obj in self.caller.location.contents:
-            if inherits_from(obj, "typeclasses.characters.Character") and obj != self.caller:
-                if obj.locks.check_lockstring(obj, "perm(Builder)"):
-                    obj.msg(builder_output)
-                else:
-                    obj.msg(public_output)
+    def show_log(self):
+        """
+        List the latest logged rolls, optionally for one character.
+        """
+        character = None
+        if self.args:
+            character = self.caller.search(self.args.strip(), global_search=True)
+            if not character:
+                return
+
+        rolls = recent_rolls(character)
+        if not rolls:
+            self.caller.msg("No rolls logged.")
+            return
+        lines = ["|wRoll log|n"]
+        for entry in rolls:
+            outcome = "|rbotch|n" if entry.botch else f"{entry.successes} successes"
+            lines.append(f"|w#{entry.id}|n {entry.created_at:%Y-%m-%d %H:%M:%S} {entry.character_name}: "
+                         f"{entry.expression} ({entry.pool} dice) vs {entry.difficulty} => {entry.dice} {outcome}")
+        self.caller.msg("\n".join(lines))
+
+    def show_replay(self):
+        """
+        Roll a logged roll again from its seed and compare the dice.
+        """
+        try:
+            entry = RollLog.objects.get(id=int(self.args.strip().lstrip('#')))
+        except (ValueError, RollLog.DoesNotExist):
+            self.caller.msg("Usage: +roll/replay <roll number> (see +roll/log)")
+            return
+
+        try:
+            replayed = replay_roll(entry)
+        except ValueError as err:
+            self.caller.msg(f"|r{err}|n")
+            return
+
+        verdict = "|gmatches the log|n" if list(replayed.dice) == entry.dice else "|rdoes NOT match the log|n"
+        self.caller.msg(f"|wRoll #{entry.id}|n by {entry.character_name} on {entry.created_at:%Y-%m-%d %H:%M:%S}: "
+                        f"{entry.expression} ({entry.pool} dice) vs {entry.difficulty}, seed {entry.seed}\n"
+                        f"Logged:   {entry.dice}\nReplayed: {list(replayed.dice)} - {verdict}\n"
+                        f"Result:   {format_roll(replayed, diff=entry.difficulty)}")
 
     def get_stat_value_and_name(self, stat_name):
         """
         Retrieve the value and full name of a stat for the character by searching the character's stats.
-        Returns the closest matching stat if an exact match is not found.
+        Exact names and unique prefixes are matched first; otherwise the
+        best ranked stat is used, so a prefix several stats share picks the
+        closest of them.
         Uses 'temp' value if available and non-zero, otherwise uses 'perm'.
         """
         if not inherits_from(self.caller, "typeclasses.characters.Character"):
             self.caller.msg("Error: This command can only be used by characters.")
             return 0, stat_name.capitalize()
 
-        character_stats = self.caller.db.stats or {}
-        all_stats = []
-
-        # Flatten the nested dictionary structure
-        for category in character_stats.values():
-            for stat_type in category.values():
-                all_stats.extend(stat_type.keys())
-
-        # Find the closest matching stat name
-        closest_matches = get_close_matches(stat_name.lower(), [s.lower() for s in all_stats], n=1, cutoff=0.6)
-        
-        if closest_matches:
-            closest_match = next(s for s in all_stats if s.lower() == closest_matches[0])
-            
-            # Find the category and stat_type for the matched stat
-            for category, cat_stats in character_stats.items():
-                for stat_type, stats in cat_stats.items():
-                    if closest_match in stats:
-                        stat_data = stats[closest_match]
-                        temp_value = stat_data.get('temp', 0)
-                        perm_value = stat_data.get('perm', 0)
-                        
-                        # Use temp value if it's non-zero, otherwise use perm value
-                        value = temp_value if temp_value != 0 else perm_value
-                        
-                        try:
-                            return int(value), closest_match
-                        except ValueError:
-                            return 0, closest_match
+        stats = self.caller.stats
+
+        # Exact names and unique prefixes come straight from the flat index;
+        # ambiguous prefixes and misspellings fall back to ranked matching.
+        entry = stats.lookup(stat_name)
+        if not entry:
+            closest_match = stats.name_index.resolve(stat_name)
+            if closest_match:
+                entry = stats.index[closest_match.lower()]
+
+        if entry:
+            # Use temp value if it's non-zero, otherwise use perm value
+            value = entry.temp if entry.temp != 0 else entry.perm
+            try:
+                return int(value), entry.name
+            except (TypeError, ValueError):
+                return 0, entry.name
 
         # If no matching stat is found, return 0 and the capitalized input
         return 0, stat_name.capitalize()
\ No newline at end of file
@@ -41,16 +41,10 @@ class CmdSay(MuxCommand):
 
         msg_self, msg_understand, msg_not_understand, language = caller.prepare_say(speech)
 
-        # Send messages to receivers.  Filter out everything but connected players.
-        receivers = [char for char in caller.location.contents if char.has_account]
-        for receiver in receivers:
-            if receiver != caller:
-                if language and language in receiver.get_languages():
-                    receiver.msg(msg_understand)
-                else:
-                    receiver.msg(msg_not_understand)
-            else:
-                receiver.msg(msg_self)
+        # Send messages to receivers.  Only connected players hear it.
+        caller.location.broadcast(
+            {"self": msg_self, "understand": msg_understand, "not_understand": msg_not_understand},
+            from_obj=caller, language=language)
 
         # Call the at_say hook
         caller.at_say(speech)
\ No newline at end of file
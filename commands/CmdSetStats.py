@@ -1,6 +1,8 @@
 from evennia import default_cmds
 from world.wod20th.models import Stat, SHIFTER_IDENTITY_STATS, SHIFTER_RENOWN, calculate_willpower, calculate_road
 from evennia.utils import search
+from world.wod20th.utils.stat_catalog import find_stats, get_stat_definition
+from world.wod20th.utils.stat_resolver import catalog_name_index, find_catalog_stats, resolve_stat_names
 
 # Define the allowed identity stats for each shifter type
 SHIFTER_IDENTITY_STATS = {
@@ -113,7 +115,7 @@ class CmdStats(default_cmds.MuxCommand):
 
         # Handle the reset command
         if self.stat_name and self.stat_name.lower() == 'reset':
-            character.db.stats = {}
+            character.stats.clear()
             self.caller.msg(f"|gReset all stats for {character.name}.|n")
             character.msg(f"|y{self.caller.name}|n |greset all your stats.|n")
             return
@@ -122,33 +124,33 @@ class CmdStats(default_cmds.MuxCommand):
             self.caller.msg("|rUsage: +stats <character>/<stat>[(<instance>)]/[<category>]=[+-]<value>|n")
             return
 
-        # Fetch the stat definition from the database
-        try:
-            if self.stat_name.lower() in ['nature', 'demeanor']:
-                matching_stats = Stat.objects.filter(name=self.stat_name, category='identity', stat_type='personal')
+        # Look up the stat definition in the stat catalog
+        if self.stat_name.lower() in ['nature', 'demeanor']:
+            stat = get_stat_definition(self.stat_name, 'identity', 'personal')
+            matching_stats = [stat] if stat else []
+        else:
+            matching_stats = []
+        if not matching_stats:
+            matching_stats = find_catalog_stats(self.stat_name.strip())
+
+        if not matching_stats:
+            suggestions = [candidate.name for candidate in resolve_stat_names(self.stat_name, limit=3)]
+            if suggestions:
+                self.caller.msg(f"|rNo stats matching '{self.stat_name}' found in the database. Did you mean: {', '.join(suggestions)}?|n")
             else:
-                matching_stats = Stat.objects.filter(name__iexact=self.stat_name.strip())
-            
-            if not matching_stats.exists():
-                matching_stats = Stat.objects.filter(name__icontains=self.stat_name.strip())
-        except Exception as e:
-            self.caller.msg(f"|rError fetching stats: {e}|n")
-            return
-
-        if not matching_stats.exists():
-            self.caller.msg(f"|rNo stats matching '{self.stat_name}' found in the database.|n")
+                self.caller.msg(f"|rNo stats matching '{self.stat_name}' found in the database.|n")
             return
 
         if len(matching_stats) > 1:
             # If multiple matches and one of them is 'Seelie Legacy', use that
-            seelie_legacy = matching_stats.filter(name='Seelie Legacy').first()
+            seelie_legacy = next((stat for stat in matching_stats if stat.name == 'Seelie Legacy'), None)
             if seelie_legacy:
                 stat = seelie_legacy
             else:
                 self.caller.msg(f"|rMultiple stats matching '{self.stat_name}' found: {[stat.name for stat in matching_stats]}. Please be more specific.|n")
                 return
         else:
-            stat = matching_stats.first()
+            stat = matching_stats[0]
 
         full_stat_name = stat.name
 
@@ -194,10 +196,7 @@ class CmdStats(default_cmds.MuxCommand):
 
         # Determine if the stat should be removed
         if self.value_change == '':
-            current_stats = character.db.stats.get(stat.category, {}).get(stat.stat_type, {})
-            if full_stat_name in current_stats:
-                del current_stats[full_stat_name]
-                character.db.stats[stat.category][stat.stat_type] = current_stats
+            if character.stats.remove_stat(stat.category, stat.stat_type, full_stat_name):
                 self.caller.msg(f"|gRemoved stat '{full_stat_name}' from {character.name}.|n")
                 character.msg(f"|y{self.caller.name}|n |rremoved your stat|n '|y{full_stat_name}|n'.")
             else:
@@ -213,9 +212,6 @@ class CmdStats(default_cmds.MuxCommand):
             is_number = False
 
         # Check if the stat exists for the character and get the current value
-        if not hasattr(character.db, "stats"):
-            character.db.stats = {}
-
         current_value = character.get_stat(stat.category, stat.stat_type, full_stat_name, temp=self.temp)
         if current_value is None:
             # Initialize the stat if it doesn't exist
@@ -323,7 +319,7 @@ class CmdStats(default_cmds.MuxCommand):
             virtues = path_virtues[enlightenment]
             
             # Remove all existing virtues
-            character.db.stats['virtues']['moral'] = {}
+            character.stats.clear('virtues', 'moral')
             
             # Set new virtues
             for virtue in virtues:
@@ -335,10 +331,12 @@ class CmdStats(default_cmds.MuxCommand):
     def apply_splat_pools(self, character, splat):
         """Apply the correct pools and bio stats based on the character's splat."""
         # Remove all existing pools except Willpower
-        character.db.stats['pools'] = {k: v for k, v in character.db.stats.get('pools', {}).items() if k == 'Willpower'}
+        for stat_type in character.stats.get_category('pools'):
+            if stat_type != 'Willpower':
+                character.stats.clear('pools', stat_type)
 
         # Add Willpower for all characters if it doesn't exist
-        if 'Willpower' not in character.db.stats['pools']:
+        if 'Willpower' not in character.stats.get_category('pools'):
             character.set_stat('pools', 'dual', 'Willpower', 1, temp=False)
             character.set_stat('pools', 'dual', 'Willpower', 1, temp=True)
 
@@ -411,8 +409,7 @@ class CmdStats(default_cmds.MuxCommand):
         character.set_stat('identity', 'lineage', 'Unseelie Legacy', '')
 
         # Remove the generic 'Legacy' stat if it exists
-        if 'Legacy' in character.db.stats.get('identity', {}).get('lineage', {}):
-            del character.db.stats['identity']['lineage']['Legacy']
+        character.stats.remove_stat('identity', 'lineage', 'Legacy')
 
         # Ensure these stats are added to the database if they don't exist
         for stat_name in ['Kith', 'Seeming', 'House', 'Seelie Legacy', 'Unseelie Legacy']:
@@ -444,8 +441,8 @@ class CmdStats(default_cmds.MuxCommand):
 
         # Remove any stats that don't apply to the new faction
         for stat in ['Tradition', 'Traditions Subfaction', 'Convention', 'Methodology', 'Nephandi Faction']:
-            if stat not in character.db.stats.get('identity', {}).get('lineage', {}):
-                character.db.stats['identity']['lineage'].pop(stat, None)
+            if not character.stats.has_stat('identity', 'lineage', stat):
+                character.stats.remove_stat('identity', 'lineage', stat)
 
         self.caller.msg(f"|gApplied {faction} specific stats to {character.name}.|n")
         character.msg(f"|gYour {faction} specific stats have been applied.|n")
@@ -453,7 +450,7 @@ class CmdStats(default_cmds.MuxCommand):
     def apply_shifter_pools(self, character, shifter_type):
         """Apply the correct pools and renown based on the Shifter's type."""
         # Ensure Willpower exists
-        if 'Willpower' not in character.db.stats.get('pools', {}):
+        if 'Willpower' not in character.stats.get_category('pools'):
             character.set_stat('pools', 'dual', 'Willpower', 1, temp=False)
             character.set_stat('pools', 'dual', 'Willpower', 1, temp=True)
 
@@ -463,15 +460,15 @@ class CmdStats(default_cmds.MuxCommand):
 
         if shifter_type == 'Ananasi':
             # Remove Rage if it exists
-            if 'Rage' in character.db.stats.get('pools', {}):
-                del character.db.stats['pools']['Rage']
+            if 'Rage' in character.stats.get_category('pools'):
+                character.stats.clear('pools', 'Rage')
             # Add Blood
             character.set_stat('pools', 'dual', 'Blood', 10, temp=False)
             character.set_stat('pools', 'dual', 'Blood', 10, temp=True)
         else:
             # Remove Blood if it exists
-            if 'Blood' in character.db.stats.get('pools', {}):
-                del character.db.stats['pools']['Blood']
+            if 'Blood' in character.stats.get_category('pools'):
+                character.stats.clear('pools', 'Blood')
             # Add Rage
             character.set_stat('pools', 'dual', 'Rage', 1, temp=False)
             character.set_stat('pools', 'dual', 'Rage', 1, temp=True)
@@ -544,14 +541,11 @@ class CmdSpecialty(MuxCommand):
             self.caller.msg(f"|rCharacter '{self.character_name}' not found.|n")
             return
 
-        # Fetch the stat definition from the database
-        try:
-            matching_stats = Stat.objects.filter(name__icontains=self.stat_name.strip())
-        except Exception as e:
-            self.caller.msg(f"|rError fetching stats: {e}|n")
-            return
+        # Look up the stat definition in the stat catalog
+        matching_stats = [stat for name in catalog_name_index().containing(self.stat_name.strip())
+                          for stat in find_stats(name)]
 
-        if not matching_stats.exists():
+        if not matching_stats:
             self.caller.msg(f"|rNo stats matching '{self.stat_name}' found in the database.|n")
             return
 
@@ -559,7 +553,7 @@ class CmdSpecialty(MuxCommand):
             self.caller.msg(f"|rMultiple stats matching '{self.stat_name}' found: {[stat.name for stat in matching_stats]}. Please be more specific.|n")
             return
 
-        stat = matching_stats.first()
+        stat = matching_stats[0]
         stat_name = stat.name
 
         specialties = character.db.specialties or {}
@@ -567,6 +561,7 @@ class CmdSpecialty(MuxCommand):
             specialties[stat_name] = []
         specialties[stat_name].append(self.specialty)
         character.db.specialties = specialties
+        character.bump_stats_version()
 
         self.caller.msg(f"|gAdded specialty '{self.specialty}' to {character.name}'s {stat_name}.|n")
         character.msg(f"|y{self.caller.name}|n |gadded the specialty|n '|y{self.specialty}|n' |gto your {stat_name}.|n")
\ No newline at end of file
@@ -5,22 +5,13 @@ from evennia.utils import evtable
 from typeclasses.characters import Character
 from world.wod20th.models import ShapeshifterForm, Stat
 from world.wod20th.utils.formatting import format_stat
+from world.wod20th.utils.dice_rolls import roll_pool
 
-from random import randint
-from typing import List, Tuple
-
-def roll_dice(dice_pool: int, difficulty: int) -> Tuple[List[int], int, int]:
-    rolls = [randint(1, 10) for _ in range(max(0, dice_pool))]
-    successes = sum(1 for roll in rolls if roll >= difficulty)
-    ones = sum(1 for roll in rolls if roll == 1)
-    successes = max(0, successes - ones)  # Ensure successes don't go negative
-    return rolls, successes, ones
-
-def interpret_roll_results(successes, ones, diff=6, rolls=None):
+def interpret_roll_results(successes, botch, diff=6, rolls=None):
     success_string = f"|g{successes}|n" if successes > 0 else f"|y{successes}|n" if successes == 0 else f"|r{successes}|n"
     
     msg = f"|w(|n{success_string}|w)|n"
-    msg += f"|r Botch!|n" if successes == 0 and ones > 0 else "|y Successes|n" if successes != 1 else "|y Success|n"
+    msg += f"|r Botch!|n" if botch else "|y Successes|n" if successes != 1 else "|y Success|n"
     
     if rolls:
         msg += " |w(|n"
@@ -156,13 +147,14 @@ class CmdShift(default_cmds.MuxCommand):
 
     def _shift_with_roll(self, character, form):
         # Use the character's Primal-Urge (or equivalent) + relevant Attribute for the dice pool
-        primal_urge = character.db.stats['abilities'].get('talent', {}).get('Primal-Urge', {}).get('perm', 0)
-        relevant_attribute = character.db.stats['attributes'].get('physical', {}).get('Stamina', {}).get('perm', 1)
+        primal_urge = character.stats.get_type('abilities', 'talent').get('Primal-Urge', {}).get('perm', 0)
+        relevant_attribute = character.stats.get_type('attributes', 'physical').get('Stamina', {}).get('perm', 1)
         dice_pool = primal_urge + relevant_attribute
         difficulty = form.difficulty
 
-        rolls, successes, ones = roll_dice(dice_pool, difficulty)
-        result_msg = interpret_roll_results(successes, ones, difficulty, rolls)
+        result = roll_pool(dice_pool, difficulty)
+        successes = result.successes
+        result_msg = interpret_roll_results(successes, result.botch, difficulty, list(result.dice))
 
         self.caller.msg(f"Attempting to shift into {form.name} form...")
         self.caller.msg(f"Rolling {dice_pool} dice (Primal-Urge {primal_urge} + Stamina {relevant_attribute}) against difficulty {difficulty}.")
@@ -171,7 +163,7 @@ class CmdShift(default_cmds.MuxCommand):
         if successes > 0:
             self.caller.msg(f"Success! You shift into {form.name} form.")
             return True
-        elif successes == 0 and ones > 0:
+        elif result.botch:
             self.caller.msg(f"Botch! Your attempt to shift goes horribly wrong!")
             # Implement botch consequences here
             return False
@@ -180,10 +172,10 @@ class CmdShift(default_cmds.MuxCommand):
             return False
 
     def _shift_with_rage(self, character, form):
-        current_rage = character.db.stats['other'].get('other', {}).get('Rage', {}).get('temp', 0)
+        current_rage = character.stats.get_type('other', 'other').get('Rage', {}).get('temp', 0)
         if current_rage >= form.rage_cost:
-            character.db.stats['other']['other']['Rage']['temp'] = current_rage - form.rage_cost
-            self.caller.msg(f"You spend {form.rage_cost} Rage to shift into {form.name} form. (Remaining Rage: {character.db.stats['other']['other']['Rage']['temp']})")
+            character.set_stat('other', 'other', 'Rage', current_rage - form.rage_cost, temp=True)
+            self.caller.msg(f"You spend {form.rage_cost} Rage to shift into {form.name} form. (Remaining Rage: {current_rage - form.rage_cost})")
             return True
         else:
             self.caller.msg(f"You don't have enough Rage to shift into {form.name} form. (Required: {form.rage_cost}, Current: {current_rage})")
@@ -37,6 +37,9 @@ class CmdSpendGain(default_cmds.MuxCommand):
 
         pool, amount_reason = args.split("=", 1)
         pool = pool.strip().lower()
+        if not pool:
+            caller.msg("Usage: +spend/+gain <pool>=<amount>[/<reason>]")
+            return
         
         if "/" in amount_reason:
             amount, reason = amount_reason.split("/", 1)
@@ -54,7 +57,16 @@ class CmdSpendGain(default_cmds.MuxCommand):
             return
 
         # Get the current pool value
-        current_value = caller.db.stats.get('pools', {}).get('dual', {}).get(pool.capitalize(), {}).get('temp', 0)
+        matches = self.find_pools(caller.stats, pool)
+        if len(matches) != 1:
+            if matches:
+                caller.msg(f"Which pool do you mean: {', '.join(matches)}?")
+            else:
+                caller.msg(f"Invalid pool: {pool}")
+            return
+        pool_name = matches[0]
+        pool = pool_name.lower()
+        current_value = caller.stats.get_stat('pools', 'dual', pool_name, temp=True)
         if current_value is None:
             caller.msg(f"Invalid pool: {pool}")
             return
@@ -70,7 +82,7 @@ class CmdSpendGain(default_cmds.MuxCommand):
             action = "gained"
 
         # Update the pool value
-        caller.db.stats['pools']['dual'][pool.capitalize()]['temp'] = new_value
+        caller.set_stat('pools', 'dual', pool_name, new_value, temp=True)
 
         # Prepare the message
         msg = f"You have {action} {amount} point{'s' if amount > 1 else ''} of {pool}."
@@ -87,6 +99,15 @@ class CmdSpendGain(default_cmds.MuxCommand):
         log_msg += f" (New value: {new_value})"
         self.log_action(log_msg)
 
+    def find_pools(self, stats, name):
+        """
+        Return the pools name could mean: the pool with exactly that name,
+        or every pool whose name starts with it.
+        """
+        pools = [match for match in stats.name_index.prefixed(name) if stats.has_stat('pools', 'dual', match)]
+        exact = [match for match in pools if match.lower() == name]
+        return exact or pools
+
     def log_action(self, message):
         # Log to the server's info channel
         log_info(message)
\ No newline at end of file
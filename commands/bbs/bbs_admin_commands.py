@@ -36,7 +36,6 @@ class CmdResetBBS(default_cmds.MuxCommand):
             controller = create_object(BBSController, key="BBSController")
             self.caller.msg("BBSController created.")
 
-        # Reset the boards and initialize next_board_id
-        controller.db.boards = {}
-        controller.db.next_board_id = 1  # Initialize next_board_id to 1
+        # Delete the boards and start numbering them from 1 again
+        controller.reset()
         self.caller.msg("BBSController has been reset. All boards and posts have been deleted.")
\ No newline at end of file
@@ -1,9 +1,34 @@
 #commands/bbs/bbs_all_commands.py
 
+from collections import OrderedDict
+
+from django.utils import timezone
 from evennia import default_cmds
 from evennia import create_object
+from evennia.utils.utils import datetime_format
 from typeclasses.bbs_controller import BBSController
+from world.wod20th.utils.ansi_utils import text_cell
 from world.wod20th.utils.bbs_utils import get_or_create_bbs_controller
+
+POSTS_PER_PAGE = 20
+PAGE_CACHE_SIZE = 128
+
+# (controller id, board id, page, newest first) -> (cache stamp, rendered page)
+_page_cache = OrderedDict()
+
+
+def show_post(caller, post):
+    """Send a post to caller."""
+    edit_info = f"(edited on {post['edited_at']})" if post['edited_at'] else ""
+
+    caller.msg(f"{'-'*40}")
+    caller.msg(f"Title: {post['title']}")
+    caller.msg(f"Author: {post['author']}")
+    caller.msg(f"Date: {post['created_at']} {edit_info}")
+    caller.msg(f"{'-'*40}")
+    caller.msg(f"{post['content']}")
+    caller.msg(f"{'-'*40}")
+
 class CmdPost(default_cmds.MuxCommand):
     """
     Post a message on a board.
@@ -27,7 +52,6 @@ class CmdPost(default_cmds.MuxCommand):
             controller = BBSController.objects.get(db_key="BBSController")
         except BBSController.DoesNotExist:
             controller = create_object(BBSController, key="BBSController")
-            controller.db.boards = {}  # Initialize with an empty boards dictionary
             self.caller.msg("BBSController created.")
 
         try:
@@ -42,7 +66,7 @@ class CmdPost(default_cmds.MuxCommand):
         if board.get('locked', False):
             self.caller.msg(f"The board '{board['name']}' is locked. No new posts can be made.")
             return
-        if not controller.has_write_access(board_ref, self.caller.key):
+        if not controller.can_write(board, self.caller.key):
             self.caller.msg(f"You do not have write access to post on the board '{board['name']}'.")
             return
         controller.create_post(board_ref, title, content, self.caller.key)
@@ -54,8 +78,12 @@ class CmdReadBBS(default_cmds.MuxCommand):
 
     Usage:
       +bbs
-      +bbs <board_name_or_number>
+      +bbs <board_name_or_number>[=<page>]
+      +bbs/recent <board_name_or_number>[=<page>]
       +bbs <board_number>/<post_number>
+
+    Posts are listed twenty to a page, oldest first, or newest first with
+    /recent. Pinned posts are listed at the top of the first page.
     """
     key = "+bbs"
     locks = "cmd:all()"
@@ -78,17 +106,24 @@ class CmdReadBBS(default_cmds.MuxCommand):
                 except ValueError:
                     self.caller.msg("Usage: +bbs <board_id>/<post_id> where both are numbers.")
             else:
-                # List posts in a board
+                # List posts in a board: +bbs <board>[=<page>]
+                board_ref, _, page = arg.partition("=")
+                board_ref = board_ref.strip()
+                try:
+                    page = int(page) if page.strip() else 1
+                except ValueError:
+                    self.caller.msg("Usage: +bbs <board>=<page> where the page is a number.")
+                    return
                 try:
-                    board_ref = int(arg)
+                    board_ref = int(board_ref)
                 except ValueError:
-                    board_ref = arg
+                    pass
 
-                self.list_posts(controller, board_ref)
+                self.list_posts(controller, board_ref, page, newest_first="recent" in self.switches)
 
     def list_boards(self, controller):
         """List all available boards."""
-        boards = controller.db.boards
+        boards = controller.get_boards()
         if not boards:
             self.caller.msg("No boards available.")
             return
@@ -96,15 +131,20 @@ class CmdReadBBS(default_cmds.MuxCommand):
         # Table Header
         output = []
         output.append("=" * 78)
-        output.append("{:<5} {:<10} {:<30} {:<20} {:<15}".format("ID", "Access", "Group Name", "Last Post", "# of messages"))
+        output.append("{:<5} {:<10} {:<30} {:<20} {:<9} {:<5}".format("ID", "Access", "Group Name", "Last Post", "Messages", "New"))
         output.append("-" * 78)
 
-        for board_id, board in boards.items():
+        account = getattr(self, 'account', None)
+        unread = controller.unread_counts(account, boards) if account else {}
+
+        for board in boards:
+            board_id = board['id']
             access_type = "Private" if not board['public'] else "Public"
-            read_only = "*" if controller.has_access(board_id, self.caller.key) and not controller.has_write_access(board_id, self.caller.key) else " "
-            last_post = max((post['created_at'] for post in board['posts']), default="No posts")
+            read_only = "*" if controller.can_read(board, self.caller.key) and not controller.can_write(board, self.caller.key) else " "
+            last_post = datetime_format(board['last_post']) if board['last_post'] else "No posts"
             num_posts = len(board['posts'])
-            output.append(f"{board_id:<5} {access_type:<10} {read_only} {board['name']:<30} {last_post:<20} {num_posts:<15}")
+            new_posts = unread.get(board_id, "-") if controller.can_read(board, self.caller.key) else "-"
+            output.append(f"{board_id:<5} {access_type:<10} {read_only} {text_cell(board['name']).ljust(30)} {last_post:<20} {num_posts:<9} {new_posts:<5}")
 
         # Table Footer
         output.append("-" * 78)
@@ -113,20 +153,37 @@ class CmdReadBBS(default_cmds.MuxCommand):
 
         self.caller.msg("\n".join(output))
 
-    def list_posts(self, controller, board_ref):
-        """List all posts in the specified board."""
+    def list_posts(self, controller, board_ref, page=1, newest_first=False):
+        """List one page of posts in the specified board."""
         board = controller.get_board(board_ref)
         if not board:
             self.caller.msg(f"No board found with the name or number '{board_ref}'.")
             return
-        if not controller.has_access(board_ref, self.caller.key):
+        if not controller.can_read(board, self.caller.key):
             self.caller.msg(f"You do not have access to view posts on the board '{board['name']}'.")
             return
+        pages = max(1, -(-len(board['posts']) // POSTS_PER_PAGE))
+        if page < 1 or page > pages:
+            self.caller.msg(f"Invalid page number. Board '{board['name']}' has {pages} pages.")
+            return
 
-        posts = board['posts']
-        pinned_posts = [post for post in posts if post.get('pinned', False)]
-        unpinned_posts = [post for post in posts if not post.get('pinned', False)]
+        # Post dates are shown relative to now, and change at most hourly.
+        stamp = (controller.board_version(board), timezone.now().strftime("%Y-%m-%d %H"))
+        key = (controller.id, board['id'], page, newest_first)
+        cached = _page_cache.get(key)
+        if cached and cached[0] == stamp:
+            _page_cache.move_to_end(key)
+            self.caller.msg(cached[1])
+            return
+
+        text = self.render_page(board, page, pages, newest_first)
+        _page_cache[key] = (stamp, text)
+        if len(_page_cache) > PAGE_CACHE_SIZE:
+            _page_cache.popitem(last=False)
+        self.caller.msg(text)
 
+    def render_page(self, board, page, pages, newest_first):
+        """Render one page of a board's post listing."""
         # Table Header
         output = []
         output.append("=" * 78)
@@ -134,20 +191,21 @@ class CmdReadBBS(default_cmds.MuxCommand):
         output.append("{:<5} {:<40} {:<20} {:<15}".format("ID", "Message", "Posted", "By"))
         output.append("-" * 78)
 
-        # List pinned posts first with correct IDs
-        for i, post in enumerate(pinned_posts):
-            post_id = posts.index(post) + 1
-            output.append(f"{board['id']}/{post_id:<5} [Pinned] {post['title']:<40} {post['created_at']:<20} {post['author']}")
-
-        # List unpinned posts with correct IDs
-        for post in unpinned_posts:
-            post_id = posts.index(post) + 1
-            output.append(f"{board['id']}/{post_id:<5} {post['title']:<40} {post['created_at']:<20} {post['author']}")
+        # Pinned posts come first, keeping their post numbers
+        posts = board['posts']
+        rows = posts.pinned() if page == 1 else []
+        rows += [row for row in posts.page(page, POSTS_PER_PAGE, newest_first) if not row[1]['pinned']]
+        for post_id, post in rows:
+            pinned = "[Pinned] " if post['pinned'] else ""
+            output.append(f"{board['id']}/{post_id:<5} {pinned}{text_cell(post['title']).ljust(40)} {post['created_at']:<20} {post['author']}")
 
         # Table Footer
+        output.append("-" * 78)
+        order, command = ("newest first", "+bbs/recent") if newest_first else ("oldest first", "+bbs")
+        output.append(f"Page {page} of {pages}, {order}. Use {command} {board['id']}=<page> to see another page.")
         output.append("=" * 78)
 
-        self.caller.msg("\n".join(output))
+        return "\n".join(output)
 
     def read_post(self, controller, board_ref, post_number):
         """Read a specific post in a board."""
@@ -155,7 +213,7 @@ class CmdReadBBS(default_cmds.MuxCommand):
         if not board:
             self.caller.msg(f"No board found with the name or number '{board_ref}'.")
             return
-        if not controller.has_access(board_ref, self.caller.key):
+        if not controller.can_read(board, self.caller.key):
             self.caller.msg(f"You do not have access to view posts on the board '{board['name']}'.")
             return
         posts = board['posts']
@@ -163,15 +221,98 @@ class CmdReadBBS(default_cmds.MuxCommand):
             self.caller.msg(f"Invalid post number. Board '{board['name']}' has {len(posts)} posts.")
             return
         post = posts[post_number - 1]
-        edit_info = f"(edited on {post['edited_at']})" if post['edited_at'] else ""
+        show_post(self.caller, post)
+
+        account = getattr(self, 'account', None)
+        if account:
+            controller.mark_read(account, board['id'], post['id'])
+
+class CmdNewPosts(default_cmds.MuxCommand):
+    """
+    List the posts you have not read yet.
+
+    Usage:
+      +bbs/new
+      +bbs/new <board_name_or_number>
+
+    Shows up to ten unread posts per board. Reading a post with +bbs or
+    +bbs/next marks it read.
+    """
+    key = "+bbs/new"
+    locks = "cmd:all()"
+    help_category = "BBS"
+
+    def func(self):
+        account = getattr(self, 'account', None)
+        if not account:
+            self.caller.msg("Unread posts are only tracked for logged-in accounts.")
+            return
+        controller = get_or_create_bbs_controller()
+
+        if self.args:
+            board_ref = self.args.strip()
+            try:
+                board_ref = int(board_ref)
+            except ValueError:
+                pass
+            board = controller.get_board(board_ref)
+            if not board:
+                self.caller.msg(f"No board found with the name or number '{board_ref}'.")
+                return
+            if not controller.can_read(board, self.caller.key):
+                self.caller.msg(f"You do not have access to view posts on the board '{board['name']}'.")
+                return
+            boards = [board]
+        else:
+            boards = [board for board in controller.get_boards() if controller.can_read(board, self.caller.key)]
+
+        counts = controller.unread_counts(account, boards)
+        output = []
+        for board in boards:
+            count = counts.get(board['id'], 0)
+            if not count:
+                continue
+            output.append(f"{'*' * 20} {board['name']} ({count} new) {'*' * 20}")
+            for post_id, post in controller.unread_posts(account, board['id']):
+                output.append(f"{board['id']}/{post_id:<5} {text_cell(post['title']).ljust(40)} {post['created_at']:<20} {post['author']}")
+            if count > 10:
+                output.append(f"...and {count - 10} more.")
+
+        if not output:
+            self.caller.msg("You have no unread posts.")
+            return
+        self.caller.msg("\n".join(["=" * 78] + output + ["=" * 78]))
+
+
+class CmdNextPost(default_cmds.MuxCommand):
+    """
+    Read the next post you have not read yet.
+
+    Usage:
+      +bbs/next
+
+    Boards are gone through in order of their numbers.
+    """
+    key = "+bbs/next"
+    locks = "cmd:all()"
+    help_category = "BBS"
+
+    def func(self):
+        account = getattr(self, 'account', None)
+        if not account:
+            self.caller.msg("Unread posts are only tracked for logged-in accounts.")
+            return
+        controller = get_or_create_bbs_controller()
+
+        found = controller.next_unread(account, self.caller.key)
+        if not found:
+            self.caller.msg("You have no unread posts.")
+            return
+        board, post_number, post = found
+        self.caller.msg(f"Board '{board['name']}', post {board['id']}/{post_number}:")
+        show_post(self.caller, post)
+        controller.mark_read(account, board['id'], post['id'])
 
-        self.caller.msg(f"{'-'*40}")
-        self.caller.msg(f"Title: {post['title']}")
-        self.caller.msg(f"Author: {post['author']}")
-        self.caller.msg(f"Date: {post['created_at']} {edit_info}")
-        self.caller.msg(f"{'-'*40}")
-        self.caller.msg(f"{post['content']}")
-        self.caller.msg(f"{'-'*40}")
 
 class CmdEditPost(default_cmds.MuxCommand):
     """
@@ -203,7 +344,7 @@ class CmdEditPost(default_cmds.MuxCommand):
         if board.get('locked', False):
             self.caller.msg(f"The board '{board_name}' is locked. No edits can be made.")
             return
-        if not controller.has_write_access(board_name, self.caller.key):
+        if not controller.can_write(board, self.caller.key):
             self.caller.msg(f"You do not have write access to edit posts on the board '{board_name}'.")
             return
         try:
@@ -5,7 +5,7 @@ from commands.bbs.bbs_admin_commands import CmdResetBBS
 
 from commands.bbs.bbs_all_commands import (
     CmdPost, CmdReadBBS, CmdEditPost, 
-    CmdDeletePost
+    CmdDeletePost, CmdNewPosts, CmdNextPost
 )
 
 from commands.bbs.bbs_builder_commands import (
@@ -27,6 +27,8 @@ class BBSCmdSet(CmdSet):
         self.add(CmdCreateBoard())
         self.add(CmdPost())
         self.add(CmdReadBBS())
+        self.add(CmdNewPosts())
+        self.add(CmdNextPost())
         self.add(CmdEditPost())
         self.add(CmdDeletePost())
         self.add(CmdDeleteBoard())
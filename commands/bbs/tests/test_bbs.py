@@ -1,7 +1,8 @@
 import unittest
-from unittest.mock import Mock
-from evennia import create_object
+from unittest.mock import Mock, patch
+from evennia import create_account, create_object
 from typeclasses.bbs_controller import BBSController
+from world.wod20th.models import BoardReadMarker, Post
 from commands.bbs.bbs_admin_commands import CmdResetBBS
 from commands.bbs.bbs_builder_commands import (
     CmdCreateBoard,
@@ -14,6 +15,7 @@ from commands.bbs.bbs_builder_commands import (
     CmdEditBoard,
     CmdGrantAccess
 )
+from commands.bbs import bbs_all_commands
 from commands.bbs.bbs_all_commands import CmdPost, CmdReadBBS, CmdEditPost, CmdDeletePost
 
 class TestBBSAdminCommands(unittest.TestCase):
@@ -329,5 +331,363 @@ class TestBBSAllCommands(unittest.TestCase):
         posts = self.bbs_controller.get_posts("General")
         self.assertEqual(len(posts), 2)  # Ensure the post was not deleted
 
+class TestBoardStorage(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up test environment.
+        """
+        BBSController.objects.filter(db_key="BBSController").delete()
+        self.bbs_controller = create_object(BBSController, key="BBSController")
+        self.bbs_controller.create_board("General", "General discussion board", public=True)
+        for number in range(1, 6):
+            self.bbs_controller.create_post("General", f"Post {number}", f"Content {number}", f"Author{number}")
+
+    def tearDown(self):
+        """
+        Clean up test environment.
+        """
+        BBSController.objects.filter(db_key="BBSController").delete()
+
+    def reload(self):
+        """
+        Drop the board index so the next lookup reads the tables again.
+        """
+        self.bbs_controller.ndb.board_index = None
+
+    def test_post_list(self):
+        """
+        Test that a board's post list counts, indexes and slices in post order.
+        """
+        posts = self.bbs_controller.get_posts("General")
+        self.assertEqual(len(posts), 5)
+        self.assertEqual(posts[0]['title'], "Post 1")
+        self.assertEqual(posts[-1]['title'], "Post 5")
+        self.assertEqual([post['title'] for post in posts[1:3]], ["Post 2", "Post 3"])
+        self.assertEqual([post['title'] for post in posts[::2]], ["Post 1", "Post 3", "Post 5"])
+        self.assertEqual([post['title'] for post in posts], [f"Post {number}" for number in range(1, 6)])
+        with self.assertRaises(IndexError):
+            posts[5]
+        with self.assertRaises(IndexError):
+            posts[-6]
+
+    def test_rename_board(self):
+        """
+        Test that a renamed board is found by its new name only.
+        """
+        self.bbs_controller.save_board("General", {'name': "Chatter"})
+        self.assertIsNone(self.bbs_controller.get_board("General"))
+        self.assertEqual(self.bbs_controller.get_board("chatter")['id'], 1)
+        self.bbs_controller.create_board("General", "A new general board")
+        self.assertEqual(self.bbs_controller.get_board("General")['id'], 2)
+
+        self.reload()
+        self.assertEqual(self.bbs_controller.get_board("Chatter")['id'], 1)
+        self.assertEqual(self.bbs_controller.get_board("General")['id'], 2)
+
+    def test_delete_board(self):
+        """
+        Test that a deleted board is gone from the index and the tables.
+        """
+        self.bbs_controller.delete_board("General")
+        self.assertIsNone(self.bbs_controller.get_board("General"))
+        self.assertIsNone(self.bbs_controller.get_board(1))
+        self.assertEqual(self.bbs_controller.get_boards(), [])
+        self.reload()
+        self.assertIsNone(self.bbs_controller.get_board("General"))
+
+    def test_delete_post_summary(self):
+        """
+        Test that deleting posts keeps the post count and last post up to date.
+        """
+        self.bbs_controller.delete_post("General", 4)
+        board = self.bbs_controller.get_board("General")
+        self.assertEqual(len(board['posts']), 4)
+        self.assertEqual(board['last_poster'], "Author4")
+
+        self.bbs_controller.delete_post("General", 0)
+        self.reload()
+        board = self.bbs_controller.get_board("General")
+        self.assertEqual(len(board['posts']), 3)
+        self.assertEqual(board['last_poster'], "Author4")
+        latest = Post.objects.filter(board__controller_id=self.bbs_controller.id).last()
+        self.assertEqual(board['last_post'], latest.created_at)
+
+        for _ in range(3):
+            self.bbs_controller.delete_post("General", 0)
+        self.reload()
+        board = self.bbs_controller.get_board("General")
+        self.assertEqual(len(board['posts']), 0)
+        self.assertIsNone(board['last_post'])
+        self.assertEqual(board['last_poster'], "")
+
+
+class TestBoardReadMarker(unittest.TestCase):
+
+    def test_mark_and_advance(self):
+        """
+        Test that posts read ahead are kept in the bitmap until the marker
+        moves past them.
+        """
+        marker = BoardReadMarker(last_read_id=10)
+        self.assertTrue(marker.is_read(10))
+        self.assertFalse(marker.is_read(11))
+        self.assertTrue(marker.mark(13))
+        self.assertTrue(marker.mark(15))
+        self.assertFalse(marker.mark(13))
+        self.assertFalse(marker.mark(9))
+        self.assertEqual(marker.read_ids(), [13, 15])
+
+        marker.advance(13)
+        self.assertEqual(marker.last_read_id, 13)
+        self.assertEqual(marker.read_ids(), [15])
+        self.assertTrue(marker.is_read(12))
+        self.assertFalse(marker.is_read(14))
+
+        marker.advance(12)
+        self.assertEqual(marker.last_read_id, 13)
+        marker.advance(15)
+        self.assertEqual(marker.read_ids(), [])
+        self.assertEqual(bytes(marker.read_bits), b'')
+
+
+class TestUnreadPosts(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up test environment.
+        """
+        BBSController.objects.filter(db_key="BBSController").delete()
+        self.bbs_controller = create_object(BBSController, key="BBSController")
+        self.account = create_account("BBSReader", "reader@example.com", "testpassword")
+        self.bbs_controller.create_board("General", "General discussion board", public=True)
+        self.bbs_controller.create_board("Staff", "Staff board", public=False)
+        self.bbs_controller.create_board("Empty", "Nothing here", public=True)
+        for number in range(1, 5):
+            self.bbs_controller.create_post("General", f"General {number}", "Content", "Author")
+        for number in range(1, 3):
+            self.bbs_controller.create_post("Staff", f"Staff {number}", "Content", "Author")
+        self.general = [post['id'] for post in self.bbs_controller.get_posts("General")]
+
+    def tearDown(self):
+        """
+        Clean up test environment.
+        """
+        BBSController.objects.filter(db_key="BBSController").delete()
+        self.account.delete()
+
+    def unread_counts(self):
+        return self.bbs_controller.unread_counts(self.account, self.bbs_controller.get_boards())
+
+    def test_unread_counts(self):
+        """
+        Test counting unread posts before and after reading some.
+        """
+        self.assertEqual(self.unread_counts(), {1: 4, 2: 2, 3: 0})
+        self.bbs_controller.mark_read(self.account, "General", self.general[2])
+        self.assertEqual(self.unread_counts(), {1: 3, 2: 2, 3: 0})
+        self.bbs_controller.mark_read(self.account, "General", self.general[0])
+        self.bbs_controller.mark_read(self.account, "General", self.general[0])
+        self.assertEqual(self.unread_counts(), {1: 2, 2: 2, 3: 0})
+        self.bbs_controller.create_post("General", "General 5", "Content", "Author")
+        self.assertEqual(self.unread_counts(), {1: 3, 2: 2, 3: 0})
+
+    def test_mark_read_advances_marker(self):
+        """
+        Test that the marker moves up once the posts before it are read.
+        """
+        self.bbs_controller.mark_read(self.account, "General", self.general[1])
+        marker = BoardReadMarker.objects.get(account=self.account)
+        self.assertEqual(marker.last_read_id, self.general[0] - 1)
+        self.assertEqual(marker.read_ids(), [self.general[1]])
+
+        self.bbs_controller.mark_read(self.account, "General", self.general[0])
+        marker.refresh_from_db()
+        self.assertEqual(marker.last_read_id, self.general[1])
+        self.assertEqual(marker.read_ids(), [])
+
+    def test_unread_posts(self):
+        """
+        Test that unread posts come back in order with their post numbers.
+        """
+        self.bbs_controller.mark_read(self.account, "General", self.general[0])
+        self.bbs_controller.mark_read(self.account, "General", self.general[2])
+        unread = self.bbs_controller.unread_posts(self.account, "General")
+        self.assertEqual([(number, post['title']) for number, post in unread], [(2, "General 2"), (4, "General 4")])
+        unread = self.bbs_controller.unread_posts(self.account, "General", limit=1)
+        self.assertEqual([number for number, post in unread], [2])
+        self.assertEqual(self.bbs_controller.unread_posts(self.account, "Empty"), [])
+        self.assertEqual(self.bbs_controller.unread_posts(self.account, "Missing"), [])
+
+    def test_next_unread(self):
+        """
+        Test that the next unread post skips boards the character can't read.
+        """
+        board, number, post = self.bbs_controller.next_unread(self.account, "Reader")
+        self.assertEqual((board['name'], number, post['title']), ("General", 1, "General 1"))
+
+        for post_id in self.general:
+            self.bbs_controller.mark_read(self.account, "General", post_id)
+        self.assertIsNone(self.bbs_controller.next_unread(self.account, "Reader"))
+
+        self.bbs_controller.grant_access("Staff", "Reader", "read_only")
+        board, number, post = self.bbs_controller.next_unread(self.account, "Reader")
+        self.assertEqual((board['name'], number, post['title']), ("Staff", 1, "Staff 1"))
+
+
+class TestPostPages(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up test environment.
+        """
+        self.caller = Mock()
+        self.caller.key = "Caller"
+        BBSController.objects.filter(db_key="BBSController").delete()
+        self.bbs_controller = create_object(BBSController, key="BBSController")
+        self.bbs_controller.create_board("General", "General discussion board", public=True)
+        for number in range(1, 26):
+            self.bbs_controller.create_post("General", f"Post {number}", "Content", "Author")
+        self.bbs_controller.pin_post("General", 2)
+        self.cmd = CmdReadBBS()
+        self.cmd.caller = self.caller
+        bbs_all_commands._page_cache.clear()
+
+    def tearDown(self):
+        """
+        Clean up test environment.
+        """
+        BBSController.objects.filter(db_key="BBSController").delete()
+        bbs_all_commands._page_cache.clear()
+
+    def titles(self, rows):
+        return [(number, post['title']) for number, post in rows]
+
+    def test_page(self):
+        """
+        Test that pages keep post numbers in either order.
+        """
+        posts = self.bbs_controller.get_posts("General")
+        self.assertEqual(self.titles(posts.page(1, 10))[:2], [(1, "Post 1"), (2, "Post 2")])
+        self.assertEqual(self.titles(posts.page(3, 10)), [(number, f"Post {number}") for number in range(21, 26)])
+        self.assertEqual(self.titles(posts.page(1, 10, newest_first=True))[:2], [(25, "Post 25"), (24, "Post 24")])
+        self.assertEqual(self.titles(posts.page(3, 10, newest_first=True)), [(number, f"Post {number}") for number in range(5, 0, -1)])
+        self.assertEqual(posts.page(4, 10), [])
+
+    def test_pinned(self):
+        """
+        Test that pinned posts keep their post numbers.
+        """
+        posts = self.bbs_controller.get_posts("General")
+        self.assertEqual(self.titles(posts.pinned()), [(3, "Post 3")])
+        self.bbs_controller.delete_post("General", 0)
+        self.assertEqual(self.titles(posts.pinned()), [(2, "Post 3")])
+
+    def test_page_listing(self):
+        """
+        Test that the first page lists pinned posts on top and the last page the rest.
+        """
+        self.cmd.list_posts(self.bbs_controller, "General")
+        text = self.caller.msg.call_args[0][0]
+        self.assertLess(text.index("[Pinned] Post 3"), text.index("Post 1 "))
+        self.assertEqual(text.count("Post 3 "), 1)
+        self.assertIn("Page 1 of 2, oldest first.", text)
+
+        self.cmd.list_posts(self.bbs_controller, "General", page=2)
+        text = self.caller.msg.call_args[0][0]
+        self.assertIn("1/25", text)
+        self.assertNotIn("[Pinned]", text)
+
+        self.cmd.list_posts(self.bbs_controller, "General", page=3)
+        self.caller.msg.assert_called_with("Invalid page number. Board 'General' has 2 pages.")
+
+    def test_page_cache(self):
+        """
+        Test that a listed page is reused until the board changes.
+        """
+        with patch.object(CmdReadBBS, 'render_page', wraps=self.cmd.render_page) as render_page:
+            self.cmd.list_posts(self.bbs_controller, "General")
+            first = self.caller.msg.call_args[0][0]
+            self.cmd.list_posts(self.bbs_controller, "General")
+            self.assertEqual(render_page.call_count, 1)
+            self.assertEqual(self.caller.msg.call_args[0][0], first)
+
+            self.cmd.list_posts(self.bbs_controller, "General", newest_first=True)
+            self.assertEqual(render_page.call_count, 2)
+
+            self.bbs_controller.edit_post("General", 0, "New content")
+            self.cmd.list_posts(self.bbs_controller, "General")
+            self.assertEqual(render_page.call_count, 3)
+
+            self.bbs_controller.save_board("General", {'name': "Chatter"})
+            self.cmd.list_posts(self.bbs_controller, "Chatter")
+            self.assertEqual(render_page.call_count, 4)
+            self.assertIn("Chatter", self.caller.msg.call_args[0][0])
+
+
+class TestImportLegacyBoards(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up test environment.
+        """
+        BBSController.objects.filter(db_key="BBSController").delete()
+        self.bbs_controller = create_object(BBSController, key="BBSController")
+        self.bbs_controller.create_board("General", "General discussion board", public=True)
+        self.bbs_controller.db.boards = {
+            1: {'id': 1, 'name': 'Taken', 'description': '', 'public': True, 'read_only': False,
+                'posts': [], 'access_list': {}, 'locked': False},
+            2: {'id': 2, 'name': 'general', 'description': '', 'public': True, 'read_only': False,
+                'posts': [], 'access_list': {}, 'locked': False},
+            3: {'id': 3, 'name': 'News', 'description': 'Latest news', 'public': False, 'read_only': False,
+                'posts': [
+                    {'title': 'First', 'content': 'One', 'author': 'Alice', 'created_at': '10:00',
+                     'edited_at': None, 'pinned': False},
+                    {'title': 'Second', 'content': 'Two', 'author': 'Bob', 'created_at': '11:00',
+                     'edited_at': '12:00', 'pinned': True},
+                ],
+                'access_list': ['Alice'], 'locked': False},
+        }
+
+    def tearDown(self):
+        """
+        Clean up test environment.
+        """
+        BBSController.objects.filter(db_key="BBSController").delete()
+
+    def test_dry_run(self):
+        """
+        Test that a dry run reports the same result and writes nothing.
+        """
+        moved = self.bbs_controller.import_legacy_boards(dry_run=True)
+        self.assertEqual(moved, (1, 2, [(1, 'Taken'), (2, 'general')]))
+        self.assertIsNone(self.bbs_controller.get_board("News"))
+        self.assertEqual(len(self.bbs_controller.db.boards), 3)
+
+    def test_import_keeps_clashing_boards(self):
+        """
+        Test that boards are moved in order and boards whose ID or name is
+        taken stay in db.boards.
+        """
+        moved = self.bbs_controller.import_legacy_boards()
+        self.assertEqual(moved, (1, 2, [(1, 'Taken'), (2, 'general')]))
+        self.assertEqual(sorted(self.bbs_controller.db.boards), [1, 2])
+        self.assertEqual(self.bbs_controller.db.next_board_id, 4)
+
+        board = self.bbs_controller.get_board("News")
+        self.assertEqual(board['id'], 3)
+        self.assertFalse(board['public'])
+        self.assertEqual(len(board['posts']), 2)
+        self.assertEqual(board['last_poster'], "Bob")
+        posts = self.bbs_controller.get_posts("News")
+        self.assertEqual([post['title'] for post in posts], ["First", "Second"])
+        self.assertTrue(posts[1]['pinned'])
+        self.assertIsNotNone(posts[1]['edited_at'])
+        self.assertTrue(self.bbs_controller.can_read(board, "Alice"))
+        self.assertFalse(self.bbs_controller.can_read(board, "Bob"))
+
+        # Running again moves nothing more.
+        self.assertEqual(self.bbs_controller.import_legacy_boards(), (0, 0, [(1, 'Taken'), (2, 'general')]))
+
 if __name__ == '__main__':
     unittest.main()
@@ -29,7 +29,8 @@ class CmdCharGen(Command):
         Called when character generation is complete.
         """
         try:
-            _apply_chargen_data(caller)
+            with caller.stats.batch():
+                _apply_chargen_data(caller)
             caller.msg("Character generation complete! Your character has been created and is ready to play.")
         except Exception as e:
             caller.msg(f"An error occurred during character generation: {str(e)}")
@@ -51,13 +52,10 @@ def _apply_chargen_data(caller):
         caller.msg("Error: No character generation data found.")
         return
 
-    # Initialize stats if it doesn't exist
-    if not caller.db.stats:
-        caller.db.stats = {}
-
     # Apply splat
     splat = chargen_data.get('splat', '')
-    caller.db.stats['other'] = {'splat': {'Splat': {'perm': splat}}}
+    caller.stats.clear('other')
+    caller.set_stat('other', 'splat', 'Splat', splat)
 
     # Apply basic information
     caller.db.concept = chargen_data.get('concept', '')
@@ -76,7 +74,7 @@ def _apply_chargen_data(caller):
             caller.set_stat(category, 'ability', ability, value)
 
     # Apply disciplines or other splat-specific powers
-    splat = caller.db.stats.get('other', {}).get('splat', {}).get('Splat', {}).get('perm', '')
+    splat = caller.stats.get_type('other', 'splat').get('Splat', {}).get('perm', '')
     if splat.lower() == 'vampire':
         for discipline, value in chargen_data.get('disciplines', {}).items():
             caller.set_stat('powers', 'discipline', discipline, value)
@@ -602,16 +600,8 @@ def _set_attribute_value(caller, raw_string, **kwargs):
             caller.db.chargen['attributes'][category][attribute] = value
 
             # Update character stats directly
-            if 'stats' not in caller.db:
-                caller.db.stats = {}
-            if 'attributes' not in caller.db.stats:
-                caller.db.stats['attributes'] = {}
-            if category not in caller.db.stats['attributes']:
-                caller.db.stats['attributes'][category] = {}
-            if attribute not in caller.db.stats['attributes'][category]:
-                caller.db.stats['attributes'][category][attribute] = {}
-            caller.db.stats['attributes'][category][attribute]['perm'] = value
-            caller.db.stats['attributes'][category][attribute]['temp'] = value
+            caller.set_stat('attributes', category, attribute, value)
+            caller.set_stat('attributes', category, attribute, value, temp=True)
 
             caller.msg(f"{attribute} set to: {value}")
             
@@ -1085,7 +1075,7 @@ def node_review(caller):
     text += "\nAttributes:\n"
     for category in ['physical', 'social', 'mental']:
         text += f"  {category.capitalize()}:\n"
-        attributes = caller.db.stats.get('attributes', {}).get(category, {})
+        attributes = caller.stats.get_type('attributes', category)
         for attr, values in attributes.items():
             perm_value = values.get('perm', 0)
             temp_value = values.get('temp', perm_value)
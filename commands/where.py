@@ -1,8 +1,11 @@
 from evennia import default_cmds
 from evennia.server.sessionhandler import SESSIONS
-from evennia.utils.ansi import ANSIString
+from world.wod20th.utils.activity import idle_time, presence_version
+from world.wod20th.utils.ansi_utils import text_cell
 from world.wod20th.utils.formatting import header
-import time
+
+# viewer class -> (presence version, players, unfindable); see get_snapshot
+_snapshots = {}
 
 class CmdWhere(default_cmds.MuxCommand):
     """
@@ -36,70 +39,71 @@ class CmdWhere(default_cmds.MuxCommand):
 
     def get_idle_time(self, character):
         """
-        Get the idle time for a character.
+        Get the idle time for a character from the activity tracker.
         """
-        if not character.sessions.count():
-            return 0
-        sessions = character.sessions.all()
-        if sessions:
-            # Get the most recent cmd_last_visible from all sessions
-            return time.time() - max(session.cmd_last_visible for session in sessions)
-        return 0
+        return idle_time(character) or 0
 
-    def func(self):
+    def get_snapshot(self):
         """
-        Implement the command.
+        Return (players, unfindable) for the caller's viewer class.
+
+        players holds (padded name, character, location) and unfindable
+        holds (name, character or None) rows, sorted by name. They are
+        built from the connected sessions and cached until the presence
+        version changes (someone logs in or out, puppets, unpuppets,
+        moves or changes name, or a room is renamed), so only the idle times are worked out on every +where.
         """
-        # Get all sessions
-        sessions = SESSIONS.get_sessions()
+        viewer_class = "staff" if self.caller.check_permstring("builders") else "player"
+        version = presence_version()
+        cached = _snapshots.get(viewer_class)
+        if cached and cached[0] == version:
+            return cached[1], cached[2]
+
         players = []
         unfindable = []
-
-        for session in sessions:
+        seen = set()
+        for session in SESSIONS.get_sessions():
             account = session.account
             if not account:
                 continue
             character = session.puppet
+            # Several sessions can share a puppet or an account.
+            key = ("puppet", character.id) if character else ("account", account.id)
+            if key in seen:
+                continue
+            seen.add(key)
+
             if character:
-                idle_time = self.format_idle_time(self.get_idle_time(character))
+                name = character.get_display_name(self.caller)
                 if character.location:
-                    location = character.location.get_display_name(self.caller)
                     # Trim location name if too long
-                    location = location[:46]
-                    players.append({
-                        'name': character.get_display_name(self.caller),
-                        'idle': idle_time,
-                        'location': location,
-                        'is_builder': account.check_permstring("Builder"),
-                    })
+                    location = character.location.get_display_name(self.caller)[:46]
+                    players.append((name, character, location))
                 else:
-                    unfindable.append({
-                        'name': character.get_display_name(self.caller),
-                        'idle': idle_time,
-                        'is_builder': account.check_permstring("Builder"),
-                    })
+                    unfindable.append((name, character))
             else:
                 # Unfindable players (players without a character)
-                unfindable.append({
-                    'name': character.get_display_name(self.caller),
-                    'idle': "N/A",
-                    'is_builder': account.check_permstring("Builder"),
-                })
+                unfindable.append((account.key, None))
+
+        players.sort(key=lambda row: row[0].lower())
+        unfindable.sort(key=lambda row: row[0].lower())
+        players = [(text_cell(name).ljust(28), character, location) for name, character, location in players]
+        _snapshots[viewer_class] = (version, players, unfindable)
+        return players, unfindable
 
-        # Sort players
-        players.sort(key=lambda x: x['name'].lower())
-        unfindable.sort(key=lambda x: x['name'].lower())
+    def func(self):
+        """
+        Implement the command.
+        """
+        players, unfindable = self.get_snapshot()
 
         # Build the output
-        output = ""
-        output += header("+where", width=78, bcolor="|r", fillchar="|r-|n")
-        output += ANSIString(" |wPLAYER|n").ljust(30) + ANSIString("|wIDLE|n").rjust(5) + "    " + ANSIString("|wLOCATION|n\n")
+        output = str(header("+where", width=78, bcolor="|r", fillchar="|r-|n"))
+        output += f"{text_cell(' |wPLAYER|n').ljust(30)}{text_cell('|wIDLE|n').rjust(5)}    |wLOCATION|n\n"
         output += "|r-|n" * 78 + "\n"
         # List of findable players
-        for p in players:
-            name = p['name'].ljust(28)
-            idle = p['idle'].rjust(5) + "   "
-            location = p['location']
+        for name, character, location in players:
+            idle = self.format_idle_time(self.get_idle_time(character)).rjust(5) + "   "
             output += f" {name} {idle} {location}\n"
 
         output += "|r-|n" * 78 + "\n"
@@ -110,11 +114,10 @@ class CmdWhere(default_cmds.MuxCommand):
             # Group unfindable players into groups of four per line
             line = ""
             count = 0
-            for p in unfindable:
-                name = p['name']
-                idle = p['idle']
-                entry = f"{name} {idle}".ljust(18)
-                line += entry
+            for name, character in unfindable:
+                idle = self.format_idle_time(self.get_idle_time(character)) if character else "N/A"
+                entry = text_cell(f"{name} {idle}").ljust(18)
+                line += str(entry)
                 count += 1
                 if count % 4 == 0:
                     output += line.rstrip() + "\n"
@@ -130,4 +133,4 @@ class CmdWhere(default_cmds.MuxCommand):
         output += "|r=|n" * 78 + "\n"
 
         # Send output to caller
-        self.caller.msg(output)
\ No newline at end of file
+        self.caller.msg(output)
@@ -30,7 +30,8 @@ def at_server_start():
     This is called every time the server starts up, regardless of
     how it was shut down.
     """
-    pass
+    from world.wod20th.utils.stat_catalog import load_stat_catalog
+    load_stat_catalog()
 
 
 def at_server_stop():
@@ -38,7 +39,8 @@ def at_server_stop():
     This is called just before the server is shut down, regardless
     of it is for a reload, reset or shutdown.
     """
-    pass
+    from world.wod20th.utils.roll_log import flush_roll_log
+    flush_roll_log()
 
 
 def at_server_reload_start():
@@ -23,6 +23,8 @@ settings file:
 
 from evennia.server.serversession import ServerSession as BaseServerSession
 
+from world.wod20th.utils.activity import record_activity
+
 
 class ServerSession(BaseServerSession):
     """
@@ -34,4 +36,11 @@ class ServerSession(BaseServerSession):
     through their session(s).
     """
 
-    pass
+    def update_session_counters(self, idle=False):
+        """
+        Also record visible commands in the activity tracker, so the
+        puppet's idle time can be read without walking its sessions.
+        """
+        super().update_session_counters(idle=idle)
+        if not idle and self.puppet:
+            record_activity(self.puppet, self.cmd_last_visible)
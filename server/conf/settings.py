@@ -64,6 +64,7 @@ LOCK_FUNC_MODULES = [
     "evennia.locks.lockfuncs",
     "world.wod20th.locks", 
 ]
+SERVER_SESSION_CLASS = "server.conf.serversession.ServerSession"
   # Change 8001 to your desired websocket port
 ######################################################################
 # Settings given in secret_settings.py override those in this file.
@@ -24,6 +24,8 @@ several more options for customizing the Guest account system.
 
 from evennia.accounts.accounts import DefaultAccount, DefaultGuest
 
+from world.wod20th.utils.activity import presence_changed
+
 
 class Account(DefaultAccount):
     """
@@ -136,7 +138,13 @@ class Account(DefaultAccount):
 
     """
 
-    pass
+    def at_post_login(self, session=None, **kwargs):
+        presence_changed()
+        super().at_post_login(session=session, **kwargs)
+
+    def at_post_disconnect(self, **kwargs):
+        presence_changed()
+        super().at_post_disconnect(**kwargs)
 
 
 class Guest(DefaultGuest):
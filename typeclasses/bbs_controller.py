@@ -1,6 +1,216 @@
+"""
+BBS controller.
+
+Boards, posts and access lists are stored in the Board, Post and
+BoardAccess tables (world/wod20th/models.py). The BBSController is the
+only way in: it numbers its boards and hands them out as dicts, the shape
+they had when they were kept in its db.boards Attribute, so the commands
+work the same as before. The difference is that nothing loads a whole
+board any more. A board's 'posts' is a PostList that counts posts or
+fetches the one post asked for, and its 'access_list' is only loaded when
+it is looked at, so posting to or reading a board costs the same few
+rows however long its history is.
+
+Each controller keeps its Board rows in a BoardIndex, loaded with one query
+the first time a board is looked up and kept up to date as boards are
+created, renamed and deleted. Finding a board by name or number is a dict
+lookup, and so is checking access once a board's access list has been
+loaded. Commands that already hold a board dict check access with
+can_read()/can_write() instead of looking the board up again through
+has_access()/has_write_access().
+
+Boards carry their post count, last post time and last poster, updated as
+posts are made and deleted, so listing the boards never touches the Post
+table and a board's len(posts) needs no COUNT.
+
+What each account has read is kept in BoardReadMarkers: the last post id
+read in order plus a bitmap of posts read ahead of it. Unread counts and
+the next unread post are then range queries on the (board, id) index
+from that post id, whatever the size of the board. Post ids grow in the
+order posts are made, so id order is also post number order.
+
+Boards are listed a page at a time (PostList.page()). Every change to a
+board or its posts gives it a new version number (board_version()), so
+rendered pages can be cached until the board changes.
+
+Boards kept in db.boards by earlier versions are not shown until the
+wod20th_migrate_bbs management command has moved them into the tables.
+Boards whose ID or name clashes with a board already in the tables are
+left in db.boards for staff to sort out.
+
+Changing a board dict does not change the board; pass the dict to
+save_board() to store it.
+"""
+import itertools
+from collections.abc import Mapping, Sequence
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
 from evennia import DefaultObject
 from evennia.utils.utils import datetime_format
-from datetime import datetime
+
+from world.wod20th.models import Board, BoardAccess, BoardReadMarker, Post
+
+# Board dict keys that save_board() writes back to the Board row.
+BOARD_FIELDS = ('name', 'description', 'public', 'read_only', 'locked')
+
+# Board versions are never reused, not even after a reset.
+_versions = itertools.count(1)
+
+
+def _post_dict(post):
+    return {
+        'id': post.id,
+        'title': post.title,
+        'content': post.content,
+        'author': post.author,
+        'created_at': datetime_format(post.created_at),
+        'edited_at': datetime_format(post.edited_at) if post.edited_at else None,
+        'pinned': post.pinned,
+    }
+
+
+class PostList(Sequence):
+    """
+    A board's posts, oldest first, as post dicts. Only what is asked for
+    is fetched: len() is the board's post count, an index or slice fetches
+    those posts.
+    """
+
+    def __init__(self, board):
+        self.board = board
+
+    def __len__(self):
+        return self.board.post_count
+
+    def __getitem__(self, index):
+        posts = self.board.posts.all()
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return [_post_dict(post) for post in posts[start:max(start, stop)]]
+        if index < 0:
+            index += len(self)
+        if index < 0:
+            raise IndexError("post index out of range")
+        try:
+            return _post_dict(posts[index])
+        except IndexError:
+            raise IndexError("post index out of range") from None
+
+    def __iter__(self):
+        for post in self.board.posts.all():
+            yield _post_dict(post)
+
+    def _number(self, post):
+        before = self.board.posts.filter(Q(created_at__lt=post.created_at) | Q(created_at=post.created_at, id__lt=post.id))
+        return before.count() + 1
+
+    def page(self, page, size, newest_first=False):
+        """
+        Return one page of posts as (post number, post dict) pairs.
+        :param page: (int) The page, counting from 1.
+        :param size: (int) Posts per page.
+        :param newest_first: (bool) Whether page 1 holds the newest posts.
+        """
+        start = (page - 1) * size
+        if newest_first:
+            posts = self.board.posts.order_by('-created_at', '-id')[start:start + size]
+            return [(len(self) - start - offset, _post_dict(post)) for offset, post in enumerate(posts)]
+        posts = self.board.posts.all()[start:start + size]
+        return [(start + offset + 1, _post_dict(post)) for offset, post in enumerate(posts)]
+
+    def pinned(self):
+        """
+        Return the pinned posts as (post number, post dict) pairs.
+        """
+        return [(self._number(post), _post_dict(post)) for post in self.board.posts.filter(pinned=True)]
+
+
+class AccessList(Mapping):
+    """
+    A board's access list, {character name: access level}, loaded from the
+    BoardIndex the first time it is used.
+    """
+
+    def __init__(self, index, board):
+        self.index = index
+        self.board = board
+
+    @property
+    def entries(self):
+        return self.index.access_list(self.board)
+
+    def __getitem__(self, character_name):
+        return self.entries[character_name]
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class BoardIndex:
+    """
+    A controller's Board rows by number and by lowercased name, and the
+    access lists that have been looked at, by board number.
+    """
+
+    def __init__(self, boards):
+        self.by_number = {}
+        self.by_name = {}
+        self.access = {}
+        self.versions = {}
+        for board in boards:
+            self.add(board)
+
+    def add(self, board):
+        self.by_number[board.number] = board
+        self.by_name[board.name.lower()] = board.number
+
+    def remove(self, board):
+        self.by_number.pop(board.number, None)
+        self.access.pop(board.number, None)
+        self.versions.pop(board.number, None)
+        if self.by_name.get(board.name.lower()) == board.number:
+            del self.by_name[board.name.lower()]
+
+    def rename(self, board, old_name):
+        if self.by_name.get(old_name.lower()) == board.number:
+            del self.by_name[old_name.lower()]
+        self.by_name[board.name.lower()] = board.number
+
+    def find(self, reference):
+        """
+        Return the Board for a board number (int) or name (str), or None.
+        """
+        if isinstance(reference, int):
+            return self.by_number.get(reference)
+        return self.by_number.get(self.by_name.get(reference.lower()))
+
+    def version(self, number):
+        version = self.versions.get(number)
+        if version is None:
+            version = self.versions[number] = next(_versions)
+        return version
+
+    def touch(self, board):
+        self.versions[board.number] = next(_versions)
+
+    def boards(self):
+        return [self.by_number[number] for number in sorted(self.by_number)]
+
+    def access_list(self, board):
+        entries = self.access.get(board.number)
+        if entries is None:
+            entries = dict(board.access.values_list('character_name', 'access_level'))
+            self.access[board.number] = entries
+        return entries
+
 
 class BBSController(DefaultObject):
     """
@@ -16,32 +226,67 @@ class BBSController(DefaultObject):
 
     def at_object_creation(self):
         """
-        Initialize the BBSController object. This is called only once, 
+        Initialize the BBSController object. This is called only once,
         when the object is first created.
         """
-        self.db.boards = {}  # Dictionary to store all boards
+        self.db.boards = {}  # Legacy boards waiting to be moved into the Board table
         self.db.next_board_id = 1  # Start board numbering from 1
 
+    @property
+    def board_index(self):
+        """
+        The BoardIndex of this controller's boards, loaded on first use.
+        """
+        index = self.ndb.board_index
+        if index is None:
+            index = BoardIndex(Board.objects.filter(controller_id=self.id))
+            self.ndb.board_index = index
+        return index
+
+    def _board_dict(self, board):
+        return {
+            'id': board.number,
+            'name': board.name,
+            'description': board.description,
+            'public': board.public,
+            'read_only': board.read_only,
+            'locked': board.locked,
+            'posts': PostList(board),
+            'access_list': AccessList(self.board_index, board),
+            'last_post': board.last_post_at,
+            'last_poster': board.last_poster,
+        }
+
+    def _find_board(self, reference):
+        """
+        Return the Board row for a board name or number, or None.
+        """
+        return self.board_index.find(reference)
+
+    def _find_post(self, board_reference, post_index):
+        board = self._find_board(board_reference)
+        if not board or post_index < 0:
+            return board, None
+        return board, board.posts.all()[post_index:post_index + 1].first()
+
     def create_board(self, name, description, public=True, read_only=False):
         """
         Create a new board.
         """
-        if any(board['name'].lower() == name.lower() for board in self.db.boards.values()):
+        if self._find_board(name):
             raise ValueError("A board with this name already exists.")
-        
+
         board_id = self.db.next_board_id
-        board = {
-            'id': board_id,
-            'name': name,
-            'description': description,
-            'public': public,
-            'read_only': read_only,
-            'posts': [],
-            'access_list': {},
-            'locked': False
-        }
-        self.db.boards[board_id] = board
-        self.db.next_board_id += 1
+        board = Board.objects.create(
+            controller_id=self.id,
+            number=board_id,
+            name=name,
+            description=description,
+            public=public,
+            read_only=read_only,
+        )
+        self.board_index.add(board)
+        self.db.next_board_id = board_id + 1
 
     def get_board(self, reference):
         """
@@ -49,29 +294,40 @@ class BBSController(DefaultObject):
         :param reference: (str or int) The name or ID of the board.
         :return: (dict) The board data or None if not found.
         """
-        if isinstance(reference, int):
-            return self.db.boards.get(reference)
-        else:
-            reference = reference.lower()
-            return next((board for board in self.db.boards.values() if board['name'].lower() == reference), None)
+        board = self._find_board(reference)
+        return self._board_dict(board) if board else None
+
+    def board_version(self, board):
+        """
+        Return a number that changes whenever the board or its posts do.
+        :param board: (dict) The board, as returned by get_board().
+        """
+        return self.board_index.version(board['id'])
+
+    def get_boards(self):
+        """
+        Retrieve every board, in order of ID. Each has its 'last_post' time
+        (a datetime, or None if it has no posts) and 'last_poster'.
+        :return: (list) Board dicts.
+        """
+        return [self._board_dict(board) for board in self.board_index.boards()]
 
     def create_post(self, board_reference, title, content, author):
         """
         Create a new post on a specified board.
         """
-        board = self.get_board(board_reference)
+        board = self._find_board(board_reference)
         if not board:
             return "Board not found"
-        post = {
-            'title': title,
-            'content': content,
-            'author': author,
-            'created_at': datetime_format(datetime.now()),  # Pass current datetime
-            'edited_at': None,
-            'pinned': False  # Initialize pinned status
-        }
-        board['posts'].append(post)
-        return f"Post '{title}' created on board '{board['name']}'."
+        with transaction.atomic():
+            post = Post.objects.create(board=board, title=title, content=content, author=author)
+            Board.objects.filter(id=board.id).update(
+                post_count=F('post_count') + 1, last_post_at=post.created_at, last_poster=author)
+        board.post_count += 1
+        board.last_post_at = post.created_at
+        board.last_poster = author
+        self.board_index.touch(board)
+        return f"Post '{title}' created on board '{board.name}'."
 
     def get_posts(self, board_reference):
         """
@@ -84,41 +340,58 @@ class BBSController(DefaultObject):
         """
         Edit an existing post's content.
         """
-        board = self.get_board(board_reference)
-        if board and 0 <= post_index < len(board['posts']):
-            board['posts'][post_index]['content'] = new_content
-            board['posts'][post_index]['edited_at'] = datetime_format(datetime.now())
+        board, post = self._find_post(board_reference, post_index)
+        if post:
+            post.content = new_content
+            post.edited_at = timezone.now()
+            post.save(update_fields=['content', 'edited_at'])
+            self.board_index.touch(board)
 
     def delete_post(self, board_reference, post_index):
         """
         Delete a post from a board.
         """
-        board = self.get_board(board_reference)
-        if board and 0 <= post_index < len(board['posts']):
-            del board['posts'][post_index]
+        board, post = self._find_post(board_reference, post_index)
+        if post:
+            with transaction.atomic():
+                post.delete()
+                summary = {'post_count': F('post_count') - 1}
+                if board.last_post_at is None or post.created_at >= board.last_post_at:
+                    latest = board.posts.order_by('-created_at', '-id').values_list('created_at', 'author').first()
+                    summary['last_post_at'], summary['last_poster'] = latest or (None, '')
+                Board.objects.filter(id=board.id).update(**summary)
+            board.post_count = max(0, board.post_count - 1)
+            if 'last_post_at' in summary:
+                board.last_post_at = summary['last_post_at']
+                board.last_poster = summary['last_poster']
+            self.board_index.touch(board)
 
     def pin_post(self, board_reference, post_index):
         """
         Pin a post to the top of the board.
         """
-        board = self.get_board(board_reference)
+        board, post = self._find_post(board_reference, post_index)
         if not board:
             return "Board not found"
-        if 0 <= post_index < len(board['posts']):
-            board['posts'][post_index]['pinned'] = True
-            return f"Post {post_index + 1} in board '{board['name']}' has been pinned."
+        if post:
+            post.pinned = True
+            post.save(update_fields=['pinned'])
+            self.board_index.touch(board)
+            return f"Post {post_index + 1} in board '{board.name}' has been pinned."
         return "Post not found"
 
     def unpin_post(self, board_reference, post_index):
         """
         Unpin a post from the top of the board.
         """
-        board = self.get_board(board_reference)
+        board, post = self._find_post(board_reference, post_index)
         if not board:
             return "Board not found"
-        if 0 <= post_index < len(board['posts']):
-            board['posts'][post_index]['pinned'] = False
-            return f"Post {post_index + 1} in board '{board['name']}' has been unpinned."
+        if post:
+            post.pinned = False
+            post.save(update_fields=['pinned'])
+            self.board_index.touch(board)
+            return f"Post {post_index + 1} in board '{board.name}' has been unpinned."
         return "Post not found"
 
     def grant_access(self, board_reference, character_name, access_level="full_access"):
@@ -128,9 +401,11 @@ class BBSController(DefaultObject):
         :param character_name: (str) The name of the character to grant access.
         :param access_level: (str) "full_access" or "read_only".
         """
-        board = self.get_board(board_reference)
+        board = self._find_board(board_reference)
         if board:
-            board['access_list'][character_name] = access_level
+            BoardAccess.objects.update_or_create(
+                board=board, character_name=character_name, defaults={'access_level': access_level})
+            self.board_index.access.pop(board.number, None)
 
     def revoke_access(self, board_reference, character_name):
         """
@@ -138,40 +413,53 @@ class BBSController(DefaultObject):
         :param board_reference: (str or int) The name or ID of the board.
         :param character_name: (str) The name of the character to revoke access.
         """
-        board = self.get_board(board_reference)
-        if board and character_name in board['access_list']:
-            del board['access_list'][character_name]
+        board = self._find_board(board_reference)
+        if board:
+            board.access.filter(character_name=character_name).delete()
+            self.board_index.access.pop(board.number, None)
+
+    def can_read(self, board, character_name):
+        """
+        Check if a character has read access to a board already looked up.
+        :param board: (dict) The board, as returned by get_board().
+        :param character_name: (str) The name of the character.
+        """
+        return board['public'] or character_name in board['access_list']
+
+    def can_write(self, board, character_name):
+        """
+        Check if a character has write access to a board already looked up.
+        :param board: (dict) The board, as returned by get_board().
+        :param character_name: (str) The name of the character.
+        """
+        if board['public'] and not board['read_only']:
+            return True
+        return board['access_list'].get(character_name) == "full_access"
 
     def has_access(self, board_reference, character_name):
         """
         Check if a character has read access to a board.
         """
         board = self.get_board(board_reference)
-        if board:
-            if board['public']:
-                return True
-            return character_name in board['access_list']
-        return False
+        return bool(board) and self.can_read(board, character_name)
 
     def has_write_access(self, board_reference, character_name):
         """
         Check if a character has write access to a board.
         """
         board = self.get_board(board_reference)
-        if board:
-            access_level = board['access_list'].get(character_name)
-            return access_level == "full_access" or (board['public'] and not board['read_only'])
-        return False
+        return bool(board) and self.can_write(board, character_name)
 
     def delete_board(self, board_reference):
         """
         Delete an entire board along with its posts.
         :param board_reference: (str or int) The name or ID of the board to delete.
         """
-        board = self.get_board(board_reference)
+        board = self._find_board(board_reference)
         if board:
-            del self.db.boards[board['id']]
-            return f"Board '{board['name']}' and all its posts have been deleted."
+            board.delete()
+            self.board_index.remove(board)
+            return f"Board '{board.name}' and all its posts have been deleted."
         return "Board not found"
 
     def save_board(self, board_reference, updated_board_data):
@@ -180,22 +468,226 @@ class BBSController(DefaultObject):
         :param board_reference: (str or int) The name or ID of the board to update.
         :param updated_board_data: (dict) Dictionary containing updated board data.
         """
-        board = self.get_board(board_reference)
+        board = self._find_board(board_reference)
         if board:
-            # Update the board's dictionary with new values
-            for key, value in updated_board_data.items():
-                board[key] = value
-            return f"Board '{board['name']}' has been updated."
+            old_name = board.name
+            fields = [key for key in BOARD_FIELDS if key in updated_board_data]
+            for key in fields:
+                setattr(board, key, updated_board_data[key])
+            board.save(update_fields=fields)
+            if board.name != old_name:
+                self.board_index.rename(board, old_name)
+            self.board_index.touch(board)
+            return f"Board '{board.name}' has been updated."
         return "Board not found"
 
-
     def lock_board(self, board_reference):
         """
         Lock a board to prevent new posts from being made.
         :param board_reference: (str or int) The name or ID of the board to lock.
         """
-        board = self.get_board(board_reference)
+        board = self._find_board(board_reference)
         if board:
-            board['locked'] = True
-            return f"Board '{board['name']}' has been locked."
+            board.locked = True
+            board.save(update_fields=['locked'])
+            return f"Board '{board.name}' has been locked."
         return "Board not found"
+
+    def _read_markers(self, account, boards):
+        return {marker.board_id: marker
+                for marker in BoardReadMarker.objects.filter(account=account, board__in=boards)}
+
+    def _unread(self, board, marker):
+        """
+        Return a board's unread posts, in order, as a queryset.
+        """
+        posts = board.posts.order_by('id')
+        if marker:
+            posts = posts.filter(id__gt=marker.last_read_id).exclude(id__in=marker.read_ids())
+        return posts
+
+    def mark_read(self, account, board_reference, post_id):
+        """
+        Mark a post read for an account.
+        :param account: (Account) The reader.
+        :param board_reference: (str or int) The name or ID of the board.
+        :param post_id: (int) The post's 'id'.
+        """
+        board = self._find_board(board_reference)
+        if not board:
+            return
+        marker, created = BoardReadMarker.objects.get_or_create(account=account, board=board)
+        if not marker.mark(post_id):
+            return
+        first_unread = self._unread(board, marker).values_list('id', flat=True).first()
+        if first_unread is None:
+            marker.advance(max([post_id] + marker.read_ids()))
+        else:
+            marker.advance(first_unread - 1)
+        marker.save(update_fields=['last_read_id', 'read_bits'])
+
+    def unread_counts(self, account, boards):
+        """
+        Count the posts an account has not read, with one query for all
+        the boards.
+        :param account: (Account) The reader.
+        :param boards: (list) Board dicts, as returned by get_boards().
+        :return: (dict) Board ID -> number of unread posts.
+        """
+        rows = [self.board_index.find(board['id']) for board in boards]
+        rows = [board for board in rows if board]
+        markers = self._read_markers(account, rows)
+        counts = {}
+        ranges = Q()
+        read_ids = []
+        for board in rows:
+            marker = markers.get(board.id)
+            if not marker:
+                counts[board.number] = board.post_count
+            elif board.post_count:
+                counts[board.number] = 0
+                ranges |= Q(board=board, id__gt=marker.last_read_id)
+                read_ids.extend(marker.read_ids())
+            else:
+                counts[board.number] = 0
+        if ranges:
+            numbers = {board.id: board.number for board in rows}
+            unread = Post.objects.filter(ranges).exclude(id__in=read_ids).values('board').annotate(unread=Count('id'))
+            for row in unread.order_by():
+                counts[numbers[row['board']]] = row['unread']
+        return counts
+
+    def unread_posts(self, account, board_reference, limit=10):
+        """
+        Retrieve the first posts on a board an account has not read.
+        :param account: (Account) The reader.
+        :param board_reference: (str or int) The name or ID of the board.
+        :param limit: (int) The most posts to return.
+        :return: (list) (post number, post dict) pairs, oldest first.
+        """
+        board = self._find_board(board_reference)
+        if not board:
+            return []
+        marker = self._read_markers(account, [board]).get(board.id)
+        first = self._unread(board, marker).first()
+        if not first:
+            return []
+        number = board.posts.filter(id__lt=first.id).count() + 1
+        # Between the first unread post and the limit-th one there can only
+        # be posts that were read ahead.
+        ahead = len(marker.read_ids()) if marker else 0
+        result = []
+        for offset, post in enumerate(board.posts.order_by('id')[number - 1:number - 1 + limit + ahead]):
+            if not marker or not marker.is_read(post.id):
+                result.append((number + offset, _post_dict(post)))
+                if len(result) == limit:
+                    break
+        return result
+
+    def next_unread(self, account, character_name):
+        """
+        Find the first post an account has not read, on the first board
+        with one that the character can read.
+        :param account: (Account) The reader.
+        :param character_name: (str) The name used for access checks.
+        :return: (tuple) (board dict, post number, post dict), or None.
+        """
+        boards = [board for board in self.get_boards() if self.can_read(board, character_name)]
+        counts = self.unread_counts(account, boards)
+        for board in boards:
+            if counts.get(board['id']):
+                posts = self.unread_posts(account, board['id'], limit=1)
+                if posts:
+                    return (board,) + posts[0]
+        return None
+
+    def reset(self):
+        """
+        Delete every board and post and start numbering boards from 1 again.
+        """
+        Board.objects.filter(controller_id=self.id).delete()
+        self.ndb.board_index = None
+        self.db.boards = {}
+        self.db.next_board_id = 1
+
+    def import_legacy_boards(self, dry_run=False):
+        """
+        Move the boards kept in db.boards into the Board, Post and
+        BoardAccess tables, keeping their IDs and post order. Boards whose
+        ID or name (ignoring case) is already taken on this controller are
+        not moved and stay in db.boards; everything else is removed from it.
+
+        Legacy posts only recorded the time of day they were made, so moved
+        posts are dated to the move.
+
+        :param dry_run: (bool) Only work out what would be moved.
+        :return: (tuple) Number of boards and posts moved, and a list of
+            (ID, name) for the boards left in db.boards.
+        """
+        legacy = self.db.boards
+        if hasattr(legacy, 'deserialize'):
+            legacy = legacy.deserialize()
+        if not legacy:
+            return 0, 0, []
+
+        index = self.board_index
+        taken_numbers = set(index.by_number)
+        taken_names = set(index.by_name)
+        moving = {}
+        skipped = []
+        for key, data in sorted(legacy.items()):
+            number = int(data.get('id', key))
+            name = data['name']
+            if number in taken_numbers or name.lower() in taken_names:
+                skipped.append((number, name))
+                continue
+            taken_numbers.add(number)
+            taken_names.add(name.lower())
+            moving[key] = data
+
+        post_count = sum(len(data.get('posts') or []) for data in moving.values())
+        if dry_run or not moving:
+            return len(moving), post_count, skipped
+
+        now = timezone.now()
+        with transaction.atomic():
+            for key, data in moving.items():
+                board = Board.objects.create(
+                    controller_id=self.id,
+                    number=int(data.get('id', key)),
+                    name=data['name'],
+                    description=data.get('description') or '',
+                    public=data.get('public', True),
+                    read_only=data.get('read_only', False),
+                    locked=data.get('locked', False),
+                )
+                posts = data.get('posts') or []
+                if posts:
+                    board.post_count = len(posts)
+                    board.last_post_at = now - timedelta(microseconds=1)
+                    board.last_poster = posts[-1].get('author', '')
+                    board.save(update_fields=['post_count', 'last_post_at', 'last_poster'])
+                Post.objects.bulk_create([
+                    Post(
+                        board=board,
+                        title=post.get('title', ''),
+                        content=post.get('content', ''),
+                        author=post.get('author', ''),
+                        created_at=now - timedelta(microseconds=len(posts) - position),
+                        edited_at=now if post.get('edited_at') else None,
+                        pinned=post.get('pinned', False),
+                    )
+                    for position, post in enumerate(posts)
+                ])
+                access_list = data.get('access_list') or {}
+                if not isinstance(access_list, Mapping):
+                    access_list = dict.fromkeys(access_list, "full_access")
+                BoardAccess.objects.bulk_create([
+                    BoardAccess(board=board, character_name=name, access_level=level)
+                    for name, level in access_list.items()
+                ])
+            next_id = max([self.db.next_board_id or 1] + [int(number) + 1 for number in legacy])
+            self.db.next_board_id = next_id
+            self.db.boards = {key: data for key, data in legacy.items() if key not in moving}
+        self.ndb.board_index = None
+        return len(moving), post_count, skipped
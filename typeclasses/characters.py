@@ -3,10 +3,15 @@ print("DefaultCharacter:", DefaultCharacter)
 from evennia.utils.ansi import ANSIString
 from world.wod20th.models import Stat
 from evennia.utils import lazy_property
+from evennia.utils.utils import make_iter
 from world.wod20th.models import Note
+from world.wod20th.utils.activity import idle_time, presence_changed, refresh_activity
 from world.wod20th.utils.ansi_utils import wrap_ansi
+from world.wod20th.utils.stat_catalog import get_stat_definition
+from world.wod20th.utils.stat_handler import StatsHandler
+from world.wod20th.utils.planes import plane_of
+from world.wod20th.utils.speech import detect_tone, mask_language, parse_speech
 import re
-import random
 
 from evennia import DefaultCharacter
 print("DefaultCharacter:", DefaultCharacter)
@@ -26,6 +31,10 @@ class Character(BaseCharacter):
         super().at_object_creation()
         self.tags.add("in_material", category="state")
 
+    @lazy_property
+    def stats(self):
+        return StatsHandler(self)
+
     @lazy_property
     def notes(self):
         return Note.objects.filter(character=self)
@@ -87,12 +96,32 @@ class Character(BaseCharacter):
         """
         Get the character's known languages from their merits.
         """
-        return_langs = []
-        merits = self.db.stats.get('merits', {}).get('social', {})
-        for merit in merits:
-            if merit.startswith('Language'):
-                return_langs.append(merit.split('(')[1].split(')')[0])
-        return return_langs
+        return list(self._language_cache()[1])
+
+    @property
+    def known_languages(self):
+        """
+        Frozenset of the languages the character knows. Cached until the
+        character's stats change.
+        """
+        return self._language_cache()[2]
+
+    def _language_cache(self):
+        cache = self.ndb.language_cache
+        if cache is None or cache[0] != self.stats_version:
+            return_langs = []
+            merits = self.stats.get_type('merits', 'social')
+            for merit in merits:
+                if merit.startswith('Language'):
+                    return_langs.append(merit.split('(')[1].split(')')[0])
+            cache = self.ndb.language_cache = (self.stats_version, tuple(return_langs), frozenset(return_langs))
+        return cache
+
+    def knows_language(self, language):
+        """
+        Return True if the character knows the given language.
+        """
+        return language in self.known_languages
 
     def set_speaking_language(self, language_name):
         """
@@ -121,53 +150,13 @@ class Character(BaseCharacter):
         """
         Detect the tone of the message based on punctuation and keywords.
         """
-        if message.endswith('!'):
-            return "excitedly"
-        elif message.endswith('?'):
-            return "questioningly"
-        elif any(word in message.lower() for word in ['hello', 'hi', 'hey', 'greetings']):
-            return "in greeting"
-        elif any(word in message.lower() for word in ['goodbye', 'bye', 'farewell']):
-            return "in farewell"
-        elif any(word in message.lower() for word in ['please', 'thank', 'thanks']):
-            return "politely"
-        elif any(word in message.lower() for word in ['sorry', 'apologize']):
-            return "apologetically"
-        else:
-            return None  # No specific tone detected
+        return detect_tone(message)
 
     def mask_language(self, message, language):
         """
         Mask the language in the message with more dynamic responses.
         """
-        words = len(message.split())
-        tone = self.detect_tone(message)
-
-        if words <= 3:
-            options = [
-                f"<< mutters a few words in {language} >>",
-                f"<< something brief in {language} >>",
-                f"<< speaks a short {language} phrase >>",
-            ]
-        elif words <= 10:
-            options = [
-                f"<< speaks a sentence in {language} >>",
-                f"<< a {language} phrase >>",
-                f"<< conveys a short message in {language} >>",
-            ]
-        else:
-            options = [
-                f"<< gives a lengthy explanation in {language} >>",
-                f"<< engages in an extended {language} dialogue >>",
-                f"<< speaks at length in {language} >>",
-            ]
-
-        masked = random.choice(options)
-        
-        if tone:
-            masked = f"{masked[:-3]}, {tone} >>"
-
-        return masked
+        return mask_language(message, language)
 
     def prepare_say(self, message, language_only=False):
         """
@@ -209,16 +198,50 @@ class Character(BaseCharacter):
             msg_not_understand = f'{message}'
             language = None
 
-        else:
+        elif not use_language:
             language = None
 
         return msg_self, msg_understand, msg_not_understand, language
 
+    @property
+    def plane(self):
+        """
+        "umbra" or "material", read from the location's occupancy index
+        when it has one.
+        """
+        if self.location and hasattr(self.location, "get_plane"):
+            return self.location.get_plane(self)
+        return plane_of(self)
+
+    def set_plane(self, plane):
+        """
+        Move the character to the Umbra ("umbra") or the material world
+        ("material"), updating its state tags and its room's occupancy
+        index.
+        """
+        other = "material" if plane == "umbra" else "umbra"
+        self.tags.remove(f"in_{other}", category="state")
+        self.tags.add(f"in_{plane}", category="state")
+        if self.location and hasattr(self.location, "update_occupancy"):
+            self.location.update_occupancy(self, plane)
+
+    def same_plane(self, objects):
+        """
+        Return the objects that are on the same plane as this character.
+        """
+        location = self.location
+        if not (location and hasattr(location, "occupants")):
+            in_umbra = self.tags.get("in_umbra", category="state")
+            return [obj for obj in objects if obj.tags.get("in_umbra", category="state") == in_umbra]
+        members = location.occupants(self.plane)
+        plane = self.plane
+        return [obj for obj in objects if obj.id in members or (obj.location != location and plane_of(obj) == plane)]
+
     def step_sideways(self):
         """
         Attempt to step sideways into the Umbra.
         """
-        if self.tags.get("in_umbra", category="state"):
+        if self.plane == "umbra":
             self.msg("You are already in the Umbra.")
             return False
         
@@ -232,15 +255,43 @@ class Character(BaseCharacter):
         """
         Return from the Umbra to the material world.
         """
-        if not self.tags.get("in_umbra", category="state"):
+        if self.plane != "umbra":
             self.msg("You are not in the Umbra.")
             return False
         
-        self.tags.remove("in_umbra", category="state")
+        self.set_plane("material")
         self.msg("You step back into the material world.")
         self.location.msg_contents(f"{self.name} shimmers into view as they return from the Umbra.", exclude=self, from_obj=self)
         return True
 
+    @property
+    def idle_time(self):
+        """
+        Seconds since the latest command from any session puppeting this
+        character, or None if none does. Read from the activity tracker.
+        """
+        return idle_time(self)
+
+    def at_post_puppet(self, **kwargs):
+        refresh_activity(self)
+        presence_changed()
+        super().at_post_puppet(**kwargs)
+
+    def at_post_unpuppet(self, account=None, session=None, **kwargs):
+        refresh_activity(self)
+        presence_changed()
+        super().at_post_unpuppet(account=account, session=session, **kwargs)
+
+    def at_post_move(self, source_location, move_type="move", **kwargs):
+        if self.sessions.count():
+            presence_changed()
+        super().at_post_move(source_location, move_type=move_type, **kwargs)
+
+    def at_rename(self, oldname, newname):
+        if self.sessions.count():
+            presence_changed()
+        super().at_rename(oldname, newname)
+
     def return_appearance(self, looker, **kwargs):
         """
         This formats a description for any object looking at this object.
@@ -316,8 +367,7 @@ class Character(BaseCharacter):
         but doesn't handle the actual message distribution.
         """
         # Filter receivers based on Umbra status
-        in_umbra = self.tags.get("in_umbra", category="state")
-        filtered_receivers = [r for r in receivers if r.tags.get("in_umbra", category="state") == in_umbra]
+        filtered_receivers = self.same_plane(make_iter(receivers)) if receivers else receivers
         
         # Call the parent method with filtered receivers
         super().at_say(message, msg_self=msg_self, msg_location=msg_location, 
@@ -332,40 +382,27 @@ class Character(BaseCharacter):
 
         speaking_language = self.get_speaking_language()
         name = self.db.gradient_name if self.db.gradient_name else self.name
-        
-        def mask_quotes(match):
-            content = match.group(1)
-            if content.startswith('~'):
-                return f'"{self.mask_language(content[1:], speaking_language)}"'
-            return f'"{content}"'
 
-        # Use regex to find and process quoted text
-        processed_message = re.sub(r'"(.*?)"', mask_quotes, message)
+        # Parse the quotes once; both versions are joined from the same parse
+        speech = parse_speech(message, speaking_language)
 
         if msg_self is None:
-            msg_self = f"{name} {message}"  # The poser always understands themselves
-
+            msg_self = f"{name} {speech.understood}"  # The poser always understands themselves
 
         # Create different messages for those who understand and those who don't
-        msg_understand = f"{name} {message}"
-        msg_not_understand = f"{name} {processed_message}"
+        msg_understand = f"{name} {speech.understood}"
+        msg_not_understand = f"{name} {speech.masked}"
 
         # Send messages to receivers
-        for receiver in self.location.contents:
-            if receiver != self:
-                if speaking_language and speaking_language in receiver.get_languages():
-                    receiver.msg(msg_understand)
-                else:
-                    receiver.msg(msg_not_understand)
-            else:
-                receiver.msg(msg_self)
+        self.location.broadcast(
+            {"self": msg_self, "understand": msg_understand, "not_understand": msg_not_understand},
+            from_obj=self, language=speaking_language)
 
     def at_emote(self, emote, msg_self=None, msg_location=None, receivers=None, msg_receivers=None, **kwargs):
         """
         Override the default emote method to filter receivers based on Umbra status.
         """
-        in_umbra = self.tags.get("in_umbra", category="state")
-        filtered_receivers = [r for r in receivers if r.tags.get("in_umbra", category="state") == in_umbra]
+        filtered_receivers = self.same_plane(make_iter(receivers)) if receivers else receivers
         
         super().at_emote(emote, msg_self=msg_self, msg_location=msg_location, 
                          receivers=filtered_receivers, msg_receivers=msg_receivers, **kwargs)
@@ -374,52 +411,39 @@ class Character(BaseCharacter):
         """
         Retrieve the value of a stat, considering instances if applicable.
         """
-        if not hasattr(self.db, "stats") or not self.db.stats:
-            self.db.stats = {}
-
-        category_stats = self.db.stats.get(category, {})
-        type_stats = category_stats.get(stat_type, {})
-
-        # Check for the stat in the current category and type
-        if stat_name in type_stats:
-            return type_stats[stat_name]['temp' if temp else 'perm']
-
-        # If not found and the category is 'pools', check in 'dual' as well
-        if category == 'pools' and 'dual' in self.db.stats:
-            dual_stats = self.db.stats['dual']
-            if stat_name in dual_stats:
-                return dual_stats[stat_name]['temp' if temp else 'perm']
-
-        # If still not found, check the Stat model
-        stat = Stat.objects.filter(name=stat_name, category=category, stat_type=stat_type).first()
-        if stat:
-            return stat.default
-
-        return None
+        return self.stats.get_stat(category, stat_type, stat_name, temp=temp)
 
     def set_stat(self, category, stat_type, stat_name, value, temp=False):
         """
         Set the value of a stat, considering instances if applicable.
         """
-        if not hasattr(self.db, "stats") or not self.db.stats:
-            self.db.stats = {}
-        if category not in self.db.stats:
-            self.db.stats[category] = {}
-        if stat_type not in self.db.stats[category]:
-            self.db.stats[category][stat_type] = {}
-        if stat_name not in self.db.stats[category][stat_type]:
-            self.db.stats[category][stat_type][stat_name] = {'perm': 0, 'temp': 0}
-        if temp:
-            self.db.stats[category][stat_type][stat_name]['temp'] = value
-        else:
-            self.db.stats[category][stat_type][stat_name]['perm'] = value
+        self.stats.set_stat(category, stat_type, stat_name, value, temp=temp)
+
+    @property
+    def stats_version(self):
+        """
+        Counter that increases every time something shown on the sheet
+        changes. Kept in ndb, so it starts over (along with every cache
+        keyed on it) after a reload.
+        """
+        return self.ndb.stats_version or 0
+
+    def bump_stats_version(self):
+        """
+        Mark cached views of this character's stats (such as the rendered
+        sheet) as stale. The stats handler calls this on every write; call
+        it yourself after changing specialties or damage.
+        """
+        self.ndb.stats_version = self.stats_version + 1
+        # Languages come from merits, so the room's speaker index may be stale.
+        if self.location and hasattr(self.location, "mark_languages_stale"):
+            self.location.mark_languages_stale(self)
             
     def check_stat_value(self, category, stat_type, stat_name, value, temp=False):
         """
         Check if a value is valid for a stat, considering instances if applicable.
         """
-        from world.wod20th.models import Stat  
-        stat = Stat.objects.filter(name=stat_name, category=category, stat_type=stat_type).first()
+        stat = get_stat_definition(stat_name, category, stat_type)
         if stat:
             stat_values = stat.values
             return value in stat_values['temp'] if temp else value in stat_values['perm']
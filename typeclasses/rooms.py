@@ -2,9 +2,14 @@ from evennia import DefaultRoom
 from evennia.utils.utils import make_iter
 from evennia.utils.ansi import ANSIString
 from evennia.utils.search import search_channel
-from world.wod20th.utils.ansi_utils import wrap_ansi
+from world.wod20th.utils.activity import presence_changed
+from world.wod20th.utils.ansi_utils import printable_width, text_cell, wrap_ansi
 from world.wod20th.utils.formatting import header, footer, divider
-import random
+from world.wod20th.utils.dice_rolls import NO_ROLL, roll_pool
+from world.wod20th.utils.planes import PLANES, plane_of
+
+RED_FILL = ANSIString("|r-|n")
+
 
 class RoomParent(DefaultRoom):
 
@@ -31,51 +36,25 @@ class RoomParent(DefaultRoom):
         if not looker:
             return ""
 
-        name = self.get_display_name(looker, **kwargs)
-        
         # Check if the looker is in the Umbra or peeking into it
-        in_umbra = looker.tags.get("in_umbra", category="state")
+        looker_plane = self.get_plane(looker)
         peeking_umbra = kwargs.get("peek_umbra", False)
-        
-        # Choose the appropriate description
-        if (in_umbra or peeking_umbra) and self.db.umbra_desc:
-            desc = self.db.umbra_desc
-        else:
-            desc = self.db.desc
+        plane = "umbra" if (looker_plane == "umbra" or peeking_umbra) and self.db.umbra_desc else "material"
 
-        # Header with room name
-        string = header(name, width=78, bcolor="|r", fillchar=ANSIString("|r-|n")) + "\n"
-        
-        # Process room description
-        if desc:
-            paragraphs = desc.split('%r')
-            formatted_paragraphs = []
-            for i, p in enumerate(paragraphs):
-                if not p.strip():
-                    if i > 0 and not paragraphs[i-1].strip():
-                        formatted_paragraphs.append('')  # Add blank line for double %r
-                    continue
-                
-                lines = p.split('%t')
-                formatted_lines = []
-                for j, line in enumerate(lines):
-                    if j == 0 and line.strip():
-                        formatted_lines.append(wrap_ansi(line.strip(), width=76))
-                    elif line.strip():
-                        formatted_lines.append(wrap_ansi('    ' + line.strip(), width=76))
-                
-                formatted_paragraphs.append('\n'.join(formatted_lines))
-            
-            string += '\n'.join(formatted_paragraphs) + "\n\n"
+        fragments = self.get_appearance_fragments(looker, plane, **kwargs)
 
-        # List all characters in the room
+        # Header with room name, then the room description. Everything is
+        # kept as plain markup and only parsed when the look is sent.
+        string = fragments["header"] + fragments["desc"]
+
+        # List all characters in the room on the looker's plane
+        same_plane = self.occupants(looker_plane)
         characters = [
             obj for obj in self.contents 
-            if obj.has_account and obj != looker and 
-            obj.tags.get("in_umbra", category="state") == looker.tags.get("in_umbra", category="state")
+            if obj.has_account and obj != looker and obj.id in same_plane
         ]
         if characters:
-            string += divider("Characters", width=78, fillchar=ANSIString("|r-|n")) + "\n"
+            string += str(divider("Characters", width=78, fillchar=RED_FILL)) + "\n"
             for character in characters:
                 idle_time = self.idle_time_display(character.idle_time)
                 if character == looker:
@@ -87,18 +66,14 @@ class RoomParent(DefaultRoom):
                 else:
                     shortdesc_str ="|h|xType '|n+shortdesc <desc>|h|x' to set a short description.|n"
 
-                if len(ANSIString(shortdesc_str).strip()) > 43:
-                    shortdesc_str = ANSIString(shortdesc_str)[:43]
-                    shortdesc_str = ANSIString(shortdesc_str[:-3] + "...|n")
-                else:
-                    shortdesc_str = ANSIString(shortdesc_str).ljust(43, ' ')
-                
-                string += ANSIString(f" {character.get_display_name(looker).ljust(25)} {ANSIString(idle_time).rjust(7)}|n {shortdesc_str}\n")
+                shortdesc_cell = text_cell(shortdesc_str.strip()).truncate(43, "...").ljust(43)
+                name_cell = text_cell(character.get_display_name(looker)).ljust(25)
+                string += f" {name_cell} {text_cell(idle_time).rjust(7)}|n {shortdesc_cell}\n"
 
         # List all objects in the room
         objects = [obj for obj in self.contents if not obj.has_account and not obj.destination]
         if objects:
-            string += divider("Objects", width=78, fillchar=ANSIString("|r-|n")) + "\n"
+            string += str(divider("Objects", width=78, fillchar=RED_FILL)) + "\n"
             
             # get shordesc or dhoe s blsnk string
             for obj in objects:
@@ -110,19 +85,89 @@ class RoomParent(DefaultRoom):
 
             # if looker builder+ show dbref.
 
-                string +=" "+  ANSIString(f"{obj.get_display_name(looker)}").ljust(25) + ANSIString(f"{shortdesc}") .ljust(53, ' ') + "\n"
+                string += f" {text_cell(obj.get_display_name(looker)).ljust(25)}{text_cell(shortdesc).ljust(53)}\n"
 
-        # List all exits
+        # Exits and the footer with room type and resources
+        string += fragments["exits"]
+        string += fragments["footer"]
+
+        return string
+
+    def get_appearance_fragments(self, looker, plane, **kwargs):
+        """
+        Return the parts of the room's appearance that do not depend on who
+        is in it: header, wrapped description, exit columns and footer.
+
+        They are cached per viewer class (staff see dbrefs) and plane, and
+        rebuilt whenever the room's name, description, exits, exit aliases,
+        room type or resources differ from when they were built.
+
+        Args:
+            looker (Object): Who is looking.
+            plane (str): "umbra" to use the Umbra description, otherwise
+                "material".
+
+        Returns:
+            dict: With "header", "desc", "exits" and "footer" strings.
+        """
+        viewer_class = "staff" if looker.check_permstring("builders") else "player"
+        name = self.get_display_name(looker, **kwargs)
+        desc = self.db.umbra_desc if plane == "umbra" else self.db.desc
         exits = [ex for ex in self.contents if ex.destination]
+        # Exit display names only differ by key and viewer class, so the
+        # signature uses keys and names are looked up on a rebuild.
+        exit_keys = tuple(
+            (exit.id, exit.key, tuple(exit.aliases.all() or []))
+            for exit in exits
+        )
+        # resources is a mutable Attribute, so compare its text rather than
+        # keeping a reference to it.
+        signature = (str(name), desc, exit_keys, self.db.roomtype, str(self.db.resources))
+
+        cache = self.ndb.appearance_cache
+        if cache is None:
+            cache = self.ndb.appearance_cache = {}
+        cached = cache.get((viewer_class, plane))
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        fragments = {
+            "header": str(header(name, width=78, bcolor="|r", fillchar=RED_FILL)) + "\n",
+            "desc": "",
+            "exits": "",
+        }
+
+        # Process room description
+        if desc:
+            paragraphs = desc.split('%r')
+            formatted_paragraphs = []
+            for i, p in enumerate(paragraphs):
+                if not p.strip():
+                    if i > 0 and not paragraphs[i-1].strip():
+                        formatted_paragraphs.append('')  # Add blank line for double %r
+                    continue
+                
+                lines = p.split('%t')
+                formatted_lines = []
+                for j, line in enumerate(lines):
+                    if j == 0 and line.strip():
+                        formatted_lines.append(wrap_ansi(line.strip(), width=76))
+                    elif line.strip():
+                        formatted_lines.append(wrap_ansi('    ' + line.strip(), width=76))
+                
+                formatted_paragraphs.append('\n'.join(formatted_lines))
+            
+            fragments["desc"] = '\n'.join(formatted_paragraphs) + "\n\n"
+
+        # List all exits
         if exits:
             direction_strings = []
             exit_strings = []
-            for exit in exits:
-                aliases = exit.aliases.all() or []
+            for exit, (_, _, aliases) in zip(exits, exit_keys):
                 exit_name = exit.get_display_name(looker)
                 short = min(aliases, key=len) if aliases else ""
                 
-                exit_string = ANSIString(f" <|y{short.upper()}|n> {exit_name}")
+                exit_string = text_cell(f" <|y{short.upper()}|n> {exit_name}")
                 
                 if any(word in exit_name for word in ['Sector', 'District', 'Neighborhood']):
                     direction_strings.append(exit_string)
@@ -131,13 +176,13 @@ class RoomParent(DefaultRoom):
 
             # Display Directions
             if direction_strings:
-                string += divider("Directions", width=78, fillchar=ANSIString("|r-|n")) + "\n"
-                string += self.format_exit_columns(direction_strings)
+                fragments["exits"] += str(divider("Directions", width=78, fillchar=RED_FILL)) + "\n"
+                fragments["exits"] += self.format_exit_columns(direction_strings)
 
             # Display Exits
             if exit_strings:
-                string += divider("Exits", width=78, fillchar=ANSIString("|r-|n")) + "\n"
-                string += self.format_exit_columns(exit_strings) + "\n"
+                fragments["exits"] += str(divider("Exits", width=78, fillchar=RED_FILL)) + "\n"
+                fragments["exits"] += self.format_exit_columns(exit_strings) + "\n"
 
         # Get room type and resources
         room_type = self.db.roomtype or "Unknown"
@@ -146,12 +191,116 @@ class RoomParent(DefaultRoom):
 
         # Create the footer with room type and resources
         footer_text = f"{resources_str}, {room_type}".strip(", ")
-        footer_length = len(ANSIString(footer_text))
+        footer_length = printable_width(footer_text)
         padding = 78 - footer_length - 2  # -2 for the brackets
 
-        string += ANSIString(f"|r{'-' * padding}[|c{footer_text}|r]|n")
+        fragments["footer"] = f"|r{'-' * padding}[|c{footer_text}|r]|n"
 
-        return string
+        cache[(viewer_class, plane)] = (signature, fragments)
+        return fragments
+
+    @property
+    def occupancy(self):
+        """
+        {plane: set of object ids} for everything in the room, so plane checks
+        are set lookups instead of a tag lookup per occupant. Built on first
+        use and kept up to date by the move hooks and Character.set_plane.
+        Lives in ndb, so it is rebuilt from tags after a reload; call
+        update_occupancy() after changing an occupant's state tags by hand.
+        """
+        occupancy = self.ndb.occupancy
+        if occupancy is None:
+            occupancy = {plane: set() for plane in PLANES}
+            for obj in self.contents:
+                occupancy[plane_of(obj)].add(obj.id)
+            self.ndb.occupancy = occupancy
+        return occupancy
+
+    def occupants(self, plane):
+        """
+        Return the set of ids of the objects in the room on the given plane.
+        """
+        return self.occupancy[plane]
+
+    def get_plane(self, obj):
+        """
+        Return "umbra" or "material" for obj, from the index when obj is in
+        it and from its tags otherwise.
+        """
+        occupancy = self.occupancy
+        if obj.id in occupancy["umbra"]:
+            return "umbra"
+        if obj.id in occupancy["material"]:
+            return "material"
+        return plane_of(obj)
+
+    def update_occupancy(self, obj, plane=None):
+        """
+        Re-file obj in the occupancy index, under plane or under the plane
+        its tags say. Objects that are not in the room are dropped.
+        """
+        occupancy = self.ndb.occupancy
+        if occupancy is None:
+            return
+        for members in occupancy.values():
+            members.discard(obj.id)
+        if obj.location == self:
+            occupancy[plane or plane_of(obj)].add(obj.id)
+
+    @property
+    def language_index(self):
+        """
+        {language: set of ids of occupants who know it}, so working out who
+        understands a language is a set lookup. Built on first use; entries
+        for occupants whose stats changed are refreshed on the next read.
+        """
+        index = self.ndb.language_index
+        if index is None:
+            index = self.ndb.language_index = {}
+            stale = self.ndb.stale_languages = {obj.id for obj in self.contents}
+        else:
+            stale = self.ndb.stale_languages
+        if stale:
+            contents = {obj.id: obj for obj in self.contents}
+            for members in index.values():
+                members -= stale
+            for obj_id in stale:
+                obj = contents.get(obj_id)
+                for language in getattr(obj, "known_languages", ()):
+                    index.setdefault(language, set()).add(obj_id)
+            stale.clear()
+        return index
+
+    def speakers(self, language):
+        """
+        Return the set of ids of occupants who know the given language.
+        """
+        return self.language_index.get(language, frozenset())
+
+    def mark_languages_stale(self, obj):
+        """
+        Re-read obj's languages the next time the language index is used.
+        """
+        if self.ndb.language_index is not None:
+            self.ndb.stale_languages.add(obj.id)
+
+    def at_object_receive(self, moved_obj, source_location, move_type="move", **kwargs):
+        super().at_object_receive(moved_obj, source_location, move_type=move_type, **kwargs)
+        self.update_occupancy(moved_obj)
+        self.mark_languages_stale(moved_obj)
+
+    def at_object_leave(self, moved_obj, target_location, move_type="move", **kwargs):
+        super().at_object_leave(moved_obj, target_location, move_type=move_type, **kwargs)
+        occupancy = self.ndb.occupancy
+        if occupancy is not None:
+            for members in occupancy.values():
+                members.discard(moved_obj.id)
+        self.mark_languages_stale(moved_obj)
+
+    def at_rename(self, oldname, newname):
+        # +where shows room names.
+        presence_changed()
+        super().at_rename(oldname, newname)
 
     def format_exit_columns(self, exit_strings):
         # Split into two columns
@@ -162,8 +311,8 @@ class RoomParent(DefaultRoom):
         # Create two-column format
         formatted_string = ""
         for i in range(max(len(col1), len(col2))):
-            col1_str = col1[i] if i < len(col1) else ANSIString("")
-            col2_str = col2[i] if i < len(col2) else ANSIString("")
+            col1_str = text_cell(col1[i] if i < len(col1) else "")
+            col2_str = text_cell(col2[i] if i < len(col2) else "")
             formatted_string += f"{col1_str.ljust(38)} {col2_str}\n"
         
         return formatted_string
@@ -172,7 +321,7 @@ class RoomParent(DefaultRoom):
         """
         Formats the idle time display.
         """
-        idle_time = int(idle_time)  # Convert to int
+        idle_time = int(idle_time or 0)  # Convert to int; None if not connected
         if idle_time < 60:
             time_str = f"{idle_time}s"
         elif idle_time < 3600:
@@ -207,14 +356,14 @@ class RoomParent(DefaultRoom):
         Allows a character to peek into the Umbra.
         """
         difficulty = self.get_gauntlet_difficulty() + 2
-        success = self.roll_gnosis(character, difficulty)
+        result = self.roll_gnosis(character, difficulty)
         
-        if success:
+        if result.successes > 0:
             if self.db.umbra_desc:
                 # Format the Umbra description
-                umbra_header = header("Umbra Vision", width=78, fillchar=ANSIString("|r-|n"))
+                umbra_header = header("Umbra Vision", width=78, fillchar=RED_FILL)
                 formatted_desc = self.format_description(self.db.umbra_desc)
-                umbra_footer = footer(width=78, fillchar=ANSIString("|r-|n"))
+                umbra_footer = footer(width=78, fillchar=RED_FILL)
                 
                 return f"You successfully pierce the Gauntlet and glimpse into the Umbra:\n\n{umbra_header}\n{formatted_desc}\n{umbra_footer}"
             else:
@@ -255,32 +404,95 @@ class RoomParent(DefaultRoom):
             exclude = make_iter(exclude)
             contents = [obj for obj in contents if obj not in exclude]
 
+        same_plane = None
+        if from_obj and hasattr(from_obj, 'tags'):
+            same_plane = self.occupants(self.get_plane(from_obj))
+
         for obj in contents:
-            if hasattr(obj, 'is_character') and obj.is_character:
+            if hasattr(obj, 'set_plane'):
                 # Check if the character is in the same plane (Umbra or material)
-                if from_obj and hasattr(from_obj, 'tags'):
-                    sender_in_umbra = from_obj.tags.get("in_umbra", category="state")
-                    receiver_in_umbra = obj.tags.get("in_umbra", category="state")
-                    
-                    if sender_in_umbra != receiver_in_umbra:
-                        continue  # Skip this character if they're in a different plane
+                if same_plane is not None and obj.id not in same_plane:
+                    continue  # Skip this character if they're in a different plane
 
             obj.msg(text=text, from_obj=from_obj, mapping=mapping, **kwargs)
 
+    def broadcast(self, messages, from_obj=None, language=None, exclude=None, **kwargs):
+        """
+        Send everyone in the room the version of a message meant for them.
+
+        Receivers are sorted into variants in one pass over the room, then
+        each variant's text is sent to its whole group, so nothing about
+        the message is worked out per receiver.
+
+        Args:
+            messages (dict): Text per variant. Missing variants fall back
+                as noted:
+                "understand": for those who know `language` (everyone when
+                    there is no language);
+                "not_understand": for those who don't ("understand");
+                "self": for from_obj ("understand");
+                "builder": for Builders, whatever they understand (none);
+                "other_plane": for characters on a different plane than
+                    from_obj (they are sent nothing).
+            from_obj (Object, optional): Who the message comes from.
+            language (str, optional): The language spoken in the message.
+            exclude (Object or list, optional): Objects to send nothing to.
+            **kwargs: Passed on to each receiver's msg().
+
+        Returns:
+            dict: {variant: list of receivers} for every group that had
+                anyone in it.
+        """
+        excluded = {obj.id for obj in make_iter(exclude)} if exclude else ()
+        same_plane = self.occupants(self.get_plane(from_obj)) if from_obj is not None else None
+        speakers = self.speakers(language) if language else None
+        builder_view = "builder" in messages
+
+        groups = {}
+        for obj in self.contents:
+            if obj.id in excluded:
+                continue
+            if obj is from_obj:
+                variant = "self"
+            elif not obj.has_account:
+                continue
+            elif builder_view and obj.locks.check_lockstring(obj, "perm(Builder)"):
+                variant = "builder"
+            elif same_plane is not None and obj.id not in same_plane and hasattr(obj, "set_plane"):
+                variant = "other_plane"
+            elif speakers is not None and obj.id not in speakers:
+                variant = "not_understand"
+            else:
+                variant = "understand"
+            groups.setdefault(variant, []).append(obj)
+
+        understand = messages.get("understand")
+        fallbacks = {
+            "self": understand,
+            "understand": understand,
+            "not_understand": messages.get("not_understand", understand),
+        }
+        for variant, receivers in groups.items():
+            text = messages.get(variant, fallbacks.get(variant))
+            if text is None:
+                continue
+            for receiver in receivers:
+                receiver.msg(text=text, from_obj=from_obj, **kwargs)
+        return groups
+
     def step_sideways(self, character):
         """
         Allows a character to step sideways into the Umbra.
         """
         difficulty = self.get_gauntlet_difficulty()
-        successes, ones = self.roll_gnosis(character, difficulty)
+        result = self.roll_gnosis(character, difficulty)
         
-        if successes > 0:
-            character.tags.remove("in_material", category="state")
-            character.tags.add("in_umbra", category="state")
+        if result.successes > 0:
+            character.set_plane("umbra")
             character.msg("You successfully step sideways into the Umbra.")
             self.msg_contents(f"{character.name} shimmers and fades from view as they step into the Umbra.", exclude=character, from_obj=character)
             return True
-        elif successes == 0 and ones > 0:
+        elif result.botch:
             # Botch
             character.msg("You catastrophically fail to step sideways into the Umbra.")
             self.msg_contents(f"{character.name} seems to flicker for a moment, but remains in place.", exclude=character, from_obj=character)
@@ -300,15 +512,14 @@ class RoomParent(DefaultRoom):
         Allows a character to return from the Umbra to the material world.
         """
         difficulty = self.get_gauntlet_difficulty()
-        successes, ones = self.roll_gnosis(character, difficulty)
+        result = self.roll_gnosis(character, difficulty)
         
-        if successes > 0:
-            character.tags.remove("in_umbra", category="state")
-            character.tags.add("in_material", category="state")
+        if result.successes > 0:
+            character.set_plane("material")
             character.msg("You step back into the material world.")
             self.msg_contents(f"{character.name} shimmers into view as they return from the Umbra.", exclude=character, from_obj=character)
             return True
-        elif successes == 0 and ones > 0:
+        elif result.botch:
             # Botch
             character.msg("You catastrophically fail to return from the Umbra.")
             
@@ -325,17 +536,17 @@ class RoomParent(DefaultRoom):
     def roll_gnosis(self, character, difficulty):
         """
         Simulates a Gnosis roll for the character.
-        Returns a tuple of (successes, ones).
+        Returns a RollResult (see world/wod20th/utils/dice_rolls.py) whose
+        successes are the dice that hit, without 1s taken off.
         """
-        stats = character.db.stats
-        if not stats or 'pools' not in stats or 'dual' not in stats['pools'] or 'Gnosis' not in stats['pools']['dual']:
+        if not character.stats.has_stat('pools', 'dual', 'Gnosis'):
             character.msg("Error: Gnosis attribute not found. Please contact an admin.")
-            return 0, 0
+            return NO_ROLL
         
-        gnosis = stats['pools']['dual']['Gnosis']['perm']
+        gnosis = character.get_stat('pools', 'dual', 'Gnosis')
         if gnosis is None:
             character.msg("Error: Permanent Gnosis value is None. Please contact an admin.")
-            return 0, 0
+            return NO_ROLL
         
         # Convert gnosis to an integer if it's stored as a string
         if isinstance(gnosis, str):
@@ -343,19 +554,15 @@ class RoomParent(DefaultRoom):
                 gnosis = int(gnosis)
             except ValueError:
                 character.msg("Error: Invalid Gnosis value. Please contact an admin.")
-                return 0, 0
+                return NO_ROLL
         
-        successes = 0
-        ones = 0
-        for _ in range(gnosis):
-            roll = random.randint(1, 10)
-            if roll >= difficulty:
-                successes += 1
-            elif roll == 1:
-                ones += 1
+        # Gnosis rolls have always counted every die that hits; 1s only
+        # matter when nothing hits, as a botch.
+        result = roll_pool(gnosis, difficulty)
+        result = result._replace(successes=result.hits)
         
-        character.msg(f"Gnosis Roll: {successes} successes against difficulty {difficulty}")
-        return successes, ones
+        character.msg(f"Gnosis Roll: {result.successes} successes against difficulty {difficulty}")
+        return result
     
     def initialize(self):
         """
@@ -9,3 +9,6 @@ from django.apps import AppConfig
 class Wod20thConfig(AppConfig):
     name = 'world.wod20th'
     verbose_name = 'World of Darkness 20th Anniversary Edition'
+
+    def ready(self):
+        import world.wod20th.signals
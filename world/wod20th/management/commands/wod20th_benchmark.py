@@ -0,0 +1,335 @@
+import time
+from random import randint
+from difflib import get_close_matches
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+# Typeclasses and the flat API need Evennia initialized.
+import evennia
+evennia._init()
+
+from evennia import create_object
+
+SPLAT_FIXTURES = {
+    'Mortal': [
+        ('virtues', 'moral', 'Conscience', 3),
+        ('virtues', 'moral', 'Self-Control', 2),
+        ('virtues', 'moral', 'Courage', 2),
+    ],
+    'Vampire': [
+        ('identity', 'lineage', 'Clan', 'Brujah'),
+        ('identity', 'personal', 'Enlightenment', 'Humanity'),
+        ('powers', 'discipline', 'Potence', 2),
+        ('powers', 'discipline', 'Celerity', 1),
+        ('pools', 'dual', 'Blood', 10),
+        ('virtues', 'moral', 'Conscience', 3),
+        ('virtues', 'moral', 'Self-Control', 2),
+        ('virtues', 'moral', 'Courage', 2),
+    ],
+    'Shifter': [
+        ('identity', 'lineage', 'Type', 'Garou'),
+        ('identity', 'lineage', 'Tribe', 'Fianna'),
+        ('powers', 'gift', 'Persuasion', 1),
+        ('advantages', 'renown', 'Glory', 2),
+        ('pools', 'dual', 'Rage', 3),
+        ('pools', 'dual', 'Gnosis', 3),
+    ],
+    'Mage': [
+        ('identity', 'lineage', 'Mage Faction', 'Traditions'),
+        ('identity', 'lineage', 'Tradition', 'Verbena'),
+        ('powers', 'sphere', 'Life', 2),
+        ('powers', 'sphere', 'Prime', 1),
+        ('other', 'advantage', 'Arete', 2),
+        ('pools', 'dual', 'Quintessence', 1),
+    ],
+    'Changeling': [
+        ('identity', 'lineage', 'Kith', 'Pooka'),
+        ('identity', 'lineage', 'Seeming', 'Wilder'),
+        ('powers', 'art', 'Wayfare', 2),
+        ('powers', 'realm', 'Actor', 1),
+        ('pools', 'dual', 'Glamour', 4),
+        ('pools', 'dual', 'Banality', 3),
+    ],
+}
+
+RESOLVER_QUERIES = ['strength', 'stre', 'dex', 'alrtness', 'firarms', 'wilpower', 'manip', 'occult', 'nonexistent']
+
+BASE_FIXTURE = [
+    ('attributes', 'physical', 'Strength', 3),
+    ('attributes', 'physical', 'Dexterity', 2),
+    ('attributes', 'social', 'Charisma', 2),
+    ('attributes', 'mental', 'Wits', 3),
+    ('abilities', 'talent', 'Alertness', 2),
+    ('abilities', 'skill', 'Firearms', 1),
+    ('backgrounds', 'background', 'Resources', 2),
+    ('pools', 'dual', 'Willpower', 5),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark hot game code paths, reporting query counts and wall time per call.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', help=f"What to benchmark: {', '.join(self.targets())}. Defaults to all.")
+        parser.add_argument('--iterations', type=int, default=50, help='Number of timed calls per case.')
+
+    @classmethod
+    def targets(cls):
+        return [name[len('bench_'):] for name in dir(cls) if name.startswith('bench_')]
+
+    def handle(self, *args, **options):
+        targets = options['targets'] or self.targets()
+        iterations = max(1, options['iterations'])
+
+        for target in targets:
+            bench = getattr(self, f'bench_{target}', None)
+            if not bench:
+                self.stdout.write(self.style.ERROR(f"Unknown benchmark '{target}'. Choose from: {', '.join(self.targets())}"))
+                continue
+            self.stdout.write(self.style.NOTICE(f'== {target} ({iterations} iterations) =='))
+            # Fixtures are created inside a transaction that is always rolled back.
+            with transaction.atomic():
+                bench(iterations)
+                transaction.set_rollback(True)
+
+    def report(self, label, func, iterations):
+        """
+        Time func over iterations calls and print queries and wall time per call.
+        """
+        func()  # warm caches so we measure the steady state
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            elapsed = time.perf_counter() - start
+        per_call_ms = elapsed * 1000 / iterations
+        per_call_queries = len(queries) / iterations
+        self.stdout.write(f'{label:<30} {per_call_queries:>8.1f} queries/call {per_call_ms:>10.3f} ms/call')
+
+    def bench_sheet(self, iterations):
+        from commands.CmdSheet import CmdSheet
+
+        for splat, fixture in SPLAT_FIXTURES.items():
+            character = create_object('typeclasses.characters.Character', key=f'Benchmark{splat}')
+            character.set_stat('other', 'splat', 'Splat', splat)
+            for category, stat_type, name, value in BASE_FIXTURE + fixture:
+                character.set_stat(category, stat_type, name, value)
+                character.set_stat(category, stat_type, name, value, temp=True)
+
+            cmd = CmdSheet()
+            cmd.caller = character
+            self.report(f'sheet ({splat})', lambda: cmd.render_sheet(character), iterations)
+
+    def bench_resolver(self, iterations):
+        from world.wod20th.utils.stat_resolver import catalog_name_index
+
+        index = catalog_name_index()
+        names = list(index.names.values())
+        lowered = list(index.names)
+
+        def with_difflib():
+            for query in RESOLVER_QUERIES:
+                get_close_matches(query.lower(), lowered, n=5, cutoff=0.6)
+
+        def with_index():
+            for query in RESOLVER_QUERIES:
+                index.rank(query, limit=5)
+
+        self.stdout.write(f'{len(names)} catalog names, {len(RESOLVER_QUERIES)} queries per call')
+        self.report('difflib (catalog)', with_difflib, iterations)
+        self.report('trigram index (catalog)', with_index, iterations)
+
+    def bench_dice(self, iterations):
+        from world.wod20th.utils.dice_rolls import DiceEngine, numpy
+
+        pools = [7] * 1000
+
+        def per_die_loop():
+            for pool in pools:
+                rolls = [randint(1, 10) for _ in range(pool)]
+                successes = sum(1 for roll in rolls if roll >= 6)
+                ones = sum(1 for roll in rolls if roll == 1)
+
+        engine = DiceEngine()
+
+        self.stdout.write(f"{len(pools)} pools of {pools[0]} dice per call, NumPy {'available' if numpy is not None else 'not installed'}")
+        self.report('randint per die', per_die_loop, iterations)
+        self.report('DiceEngine.roll_pools', lambda: engine.roll_pools(pools, 6), iterations)
+
+    def bench_odds(self, iterations):
+        from world.wod20th.utils.dice_odds import odds_table, roll_odds
+        from world.wod20th.utils.dice_rolls import DiceEngine
+
+        engine = DiceEngine()
+        trials = 10000
+
+        def monte_carlo():
+            results = engine.roll_pools([7] * trials, 7)
+            return sum(1 for result in results if result.successes >= 3) / trials
+
+        start = time.perf_counter()
+        odds_table()
+        self.stdout.write(f'odds table built in {(time.perf_counter() - start) * 1000:.1f} ms; '
+                          f'chance of 3+ successes on 7 dice vs 7, {trials} trials per Monte Carlo call')
+        self.report('Monte Carlo', monte_carlo, iterations)
+        self.report('odds table lookup', lambda: roll_odds(7, 7).at_least(3), iterations)
+
+    def bench_broadcast(self, iterations):
+        room = create_object('typeclasses.rooms.RoomParent', key='BenchmarkRoom')
+        occupants = []
+        for number in range(50):
+            character = create_object('typeclasses.characters.Character', key=f'Benchmark{number}', location=room)
+            if number % 2:
+                character.set_stat('merits', 'social', 'Language(French)', 1)
+            occupants.append(character)
+        sent = []
+        for number, character in enumerate(occupants):
+            # Look connected without a real session, and count messages
+            # instead of sending them.
+            character.sessions._sessid_cache = [number + 1]
+            character.msg = lambda text=None, **kwargs: sent.append(text)
+        speaker = occupants[0]
+        messages = {'self': 'You say, "Bonjour."', 'understand': 'Speaker says, "Bonjour."',
+                    'not_understand': 'Speaker says something in French.'}
+
+        def per_receiver():
+            for receiver in [char for char in room.contents if char.has_account]:
+                if receiver != speaker:
+                    if 'French' in receiver.get_languages():
+                        receiver.msg(messages['understand'])
+                    else:
+                        receiver.msg(messages['not_understand'])
+                else:
+                    receiver.msg(messages['self'])
+
+        per_receiver()
+        self.stdout.write(f'{len(occupants)} occupants, half of them speak French; {len(sent)} messages per call')
+        self.report('per-receiver loop', per_receiver, iterations)
+        self.report('RoomParent.broadcast', lambda: room.broadcast(messages, from_obj=speaker, language='French'), iterations)
+
+    def bench_speech(self, iterations):
+        import re
+
+        from world.wod20th.utils.speech import parse_speech
+
+        character = create_object('typeclasses.characters.Character', key='BenchmarkSpeaker')
+        fragments = [
+            ' leans across the table and says, "~Thank you all for coming tonight, truly." ',
+            'She glances at the door. "We should keep our voices down." ',
+            'A pause. "~Did anyone follow you here?" ',
+            'Her fingers drum on the wood. "~Hello to the newcomers, by the way!" ',
+            '"Coffee?" she offers, then adds, "~Sorry, I forgot you do not drink it." ',
+        ]
+        pose = ''.join(fragments * 4)
+        quotes = len(re.findall(r'"(.*?)"', pose))
+
+        def regex_and_prepare_say():
+            parts_understand = []
+            parts_not_understand = []
+            last_end = 0
+            for match in re.finditer(r'"(.*?)"', pose):
+                parts_understand.append(pose[last_end:match.start()])
+                parts_not_understand.append(pose[last_end:match.start()])
+                content = match.group(1)
+                if content.startswith('~'):
+                    _, understand, not_understand, _ = character.prepare_say(content[1:], language_only=True)
+                    parts_understand.append(f'"{understand}"')
+                    parts_not_understand.append(f'"{not_understand}"')
+                else:
+                    parts_understand.append(f'"{content}"')
+                    parts_not_understand.append(f'"{content}"')
+                last_end = match.end()
+            parts_understand.append(pose[last_end:])
+            parts_not_understand.append(pose[last_end:])
+            return ''.join(parts_understand), ''.join(parts_not_understand)
+
+        def parsed():
+            speech = parse_speech(pose, 'French')
+            return speech.understood, speech.masked
+
+        character.db.speaking_language = 'French'
+        self.stdout.write(f'{len(pose)} character pose with {quotes} quotes')
+        self.report('regex + prepare_say', regex_and_prepare_say, iterations)
+        self.report('parse_speech', parsed, iterations)
+
+    def bench_wrap(self, iterations):
+        import textwrap
+
+        from evennia.utils.ansi import ANSIString, strip_raw_ansi
+
+        from world.wod20th.utils.ansi_utils import wrap_ansi
+
+        description = ("The |rold fountain|n sprays water across the plaza while |[bstreet lamps|n flicker "
+                       "against the rain. |123Pigeons|n scatter as a |ywhite van|n rolls past. ") * 12
+        note = "|wSession notes:|n met the |gprince|n at |hElysium|n, agreed to look into the thefts. " * 30
+
+        def ansistring_textwrap(text, width):
+            raw_text = strip_raw_ansi(ANSIString(text))
+            return textwrap.fill(raw_text, width=width, break_long_words=False, break_on_hyphens=False)
+
+        for label, text in (('room description', description), ('note', note)):
+            self.stdout.write(f'{label}: {len(text)} characters')
+            self.report('ANSIString + textwrap', lambda: ansistring_textwrap(text, 76), iterations)
+            self.report('wrap_ansi', lambda: wrap_ansi(text, 76), iterations)
+
+    def bench_formatting(self, iterations):
+        from evennia.utils.ansi import ANSIString
+
+        from world.wod20th.utils.formatting import divider, footer, header
+
+        def build(make_header, make_footer, make_divider):
+            make_header("Attributes", width=78, color="|y")
+            make_header("Plaza", width=78, bcolor="|r", fillchar=ANSIString("|r-|n"))
+            make_divider("Physical", width=25, fillchar=" ")
+            make_divider("Characters", width=78, fillchar=ANSIString("|r-|n"))
+            make_footer(width=78, fillchar=ANSIString("|r-|n"))
+
+        self.stdout.write('2 headers, 2 dividers and a footer per call')
+        self.report('unmemoized', lambda: build(header.__wrapped__, footer.__wrapped__, divider.__wrapped__), iterations)
+        self.report('memoized', lambda: build(header, footer, divider), iterations)
+
+    def bench_bbs(self, iterations):
+        from types import SimpleNamespace
+
+        from commands.bbs.bbs_all_commands import POSTS_PER_PAGE, CmdReadBBS
+        from typeclasses.bbs_controller import BBSController
+
+        history = 500
+        controller = create_object(BBSController, key='BenchmarkBBS')
+        controller.create_board('General', 'Benchmark board')
+        for number in range(history):
+            controller.create_post('General', f'Post {number}', 'Some news. ' * 20, 'Benchmark')
+        # The layout boards had when they were kept in the controller's db.boards.
+        controller.attributes.add('benchmark_boards', {1: {
+            'id': 1, 'name': 'General', 'description': 'Benchmark board', 'public': True, 'read_only': False,
+            'posts': list(controller.get_posts('General')), 'access_list': {}, 'locked': False,
+        }})
+
+        def attribute_read():
+            posts = controller.attributes.get('benchmark_boards')[1]['posts']
+            return posts[len(posts) // 2]
+
+        def attribute_post():
+            boards = controller.attributes.get('benchmark_boards')
+            boards[1]['posts'].append({'title': 'New', 'content': 'Some news.', 'author': 'Benchmark',
+                                       'created_at': '12:00', 'edited_at': None, 'pinned': False})
+
+        def table_read():
+            posts = controller.get_posts('General')
+            return posts[len(posts) // 2]
+
+        self.stdout.write(f'a board with {history} posts')
+        self.report('read post (Attribute)', attribute_read, iterations)
+        self.report('read post (tables)', table_read, iterations)
+        self.report('add post (Attribute)', attribute_post, iterations)
+        self.report('add post (tables)', lambda: controller.create_post('General', 'New', 'Some news.', 'Benchmark'), iterations)
+
+        cmd = CmdReadBBS()
+        cmd.caller = SimpleNamespace(key='Benchmark', msg=lambda text=None, **kwargs: None)
+        board = controller.get_board('General')
+        pages = -(-len(board['posts']) // POSTS_PER_PAGE)
+        self.report('list whole board', lambda: list(enumerate(board['posts'], 1)), iterations)
+        self.report('render one page', lambda: cmd.render_page(board, 1, pages, False), iterations)
+        self.report('+bbs page (cached)', lambda: cmd.list_posts(controller, 'General'), iterations)
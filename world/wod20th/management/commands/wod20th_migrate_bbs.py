@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+# Typeclasses and the flat API need Evennia initialized.
+import evennia
+evennia._init()
+
+from typeclasses.bbs_controller import BBSController
+
+
+class Command(BaseCommand):
+    help = ('Move boards kept in BBSController db.boards Attributes into the Board, Post and '
+            'BoardAccess tables. Run it once, while the game is stopped; boards that are '
+            'not moved are not shown. Boards whose ID or name is already used by a board in '
+            'the tables are not moved and stay in db.boards; they are listed so they can be '
+            'renamed or renumbered before running again.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be moved without writing anything.')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        board_count = 0
+        post_count = 0
+        skipped_count = 0
+        for controller in BBSController.objects.all():
+            if not controller.attributes.get('boards'):
+                continue
+            boards, posts, skipped = controller.import_legacy_boards(dry_run=dry_run)
+            self.stdout.write(f"{controller.key} (#{controller.id}): {boards} boards, {posts} posts")
+            for number, name in skipped:
+                self.stdout.write(self.style.WARNING(f"  Skipped board {number} ({name}): its ID or name is already in use."))
+            board_count += boards
+            post_count += posts
+            skipped_count += len(skipped)
+
+        verb = 'Would move' if dry_run else 'Moved'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {post_count} posts on {board_count} boards."))
+        if skipped_count:
+            self.stdout.write(self.style.WARNING(f"{skipped_count} boards were left in db.boards."))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from evennia.objects.models import ObjectDB
+
+# Typeclasses and the flat API need Evennia initialized.
+import evennia
+evennia._init()
+
+from world.wod20th.models import CharacterStat
+from world.wod20th.utils.stat_handler import LEGACY_STATS_ATTRIBUTE, legacy_stat_rows
+
+
+class Command(BaseCommand):
+    help = ('Convert legacy character.db.stats Attributes into CharacterStat rows. '
+            'Run it while the game is stopped; characters that are not converted here '
+            'are converted the first time their stats are read.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be converted without writing anything.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk insert.')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = max(1, options['batch_size'])
+
+        characters = ObjectDB.objects.filter(
+            db_attributes__db_key=LEGACY_STATS_ATTRIBUTE,
+            db_attributes__db_category__isnull=True,
+        ).distinct()
+
+        converted = 0
+        row_count = 0
+        for character in list(characters):
+            stats = character.attributes.get(LEGACY_STATS_ATTRIBUTE)
+            if hasattr(stats, 'deserialize'):
+                stats = stats.deserialize()
+            rows, skipped = legacy_stat_rows(character, stats)
+
+            for path in skipped:
+                self.stdout.write(self.style.WARNING(f"{character.key} (#{character.id}): skipped malformed entry '{path}'"))
+
+            if not dry_run:
+                with transaction.atomic():
+                    CharacterStat.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+                    character.attributes.remove(LEGACY_STATS_ATTRIBUTE)
+
+            converted += 1
+            row_count += len(rows)
+
+        verb = 'Would convert' if dry_run else 'Converted'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {row_count} stats on {converted} characters."))
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.16 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("objects", "0014_defaultobject_defaultcharacter_defaultexit_and_more"),
+        ("wod20th", "0031_actiontemplate_asset_shapeshifterform_action"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CharacterStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("category", models.CharField(max_length=100)),
+                ("stat_type", models.CharField(max_length=100)),
+                ("name", models.CharField(max_length=100)),
+                ("instance", models.CharField(blank=True, default="", max_length=100)),
+                ("perm", models.JSONField(blank=True, default=int, null=True)),
+                ("temp", models.JSONField(blank=True, default=int, null=True)),
+                ("perm_rating", models.IntegerField(blank=True, null=True)),
+                (
+                    "character",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="character_stats",
+                        to="objects.objectdb",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["category", "stat_type", "name", "perm_rating"],
+                        name="charstat_rating_idx",
+                    ),
+                    models.Index(
+                        fields=["name", "perm_rating"],
+                        name="charstat_name_rating_idx",
+                    ),
+                ],
+                "unique_together": {
+                    ("character", "category", "stat_type", "name", "instance")
+                },
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.16 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("objects", "0014_defaultobject_defaultcharacter_defaultexit_and_more"),
+        ("wod20th", "0032_characterstat"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RollLog",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("character_name", models.CharField(max_length=255)),
+                ("expression", models.CharField(max_length=255)),
+                ("pool", models.IntegerField()),
+                ("difficulty", models.IntegerField()),
+                ("dice", models.JSONField(default=list)),
+                ("successes", models.IntegerField()),
+                ("botch", models.BooleanField(default=False)),
+                ("seed", models.BigIntegerField()),
+                ("generator", models.CharField(max_length=20)),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+                (
+                    "character",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="roll_logs",
+                        to="objects.objectdb",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at", "-id"],
+                "indexes": [
+                    models.Index(
+                        fields=["character", "created_at"],
+                        name="rolllog_char_time_idx",
+                    )
+                ],
+            },
+        ),
+    ]
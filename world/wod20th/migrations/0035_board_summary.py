@@ -0,0 +1,41 @@
+# Generated by Django 4.2.16 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+def fill_board_summaries(apps, schema_editor):
+    Board = apps.get_model("wod20th", "Board")
+    Post = apps.get_model("wod20th", "Post")
+    for board in Board.objects.all():
+        posts = Post.objects.filter(board=board)
+        latest = posts.order_by("-created_at", "-id").first()
+        board.post_count = posts.count()
+        board.last_post_at = latest.created_at if latest else None
+        board.last_poster = latest.author if latest else ""
+        board.save(update_fields=["post_count", "last_post_at", "last_poster"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wod20th", "0034_board_post_boardaccess"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="board",
+            name="post_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="board",
+            name="last_post_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="board",
+            name="last_poster",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.RunPython(fill_board_summaries, migrations.RunPython.noop),
+    ]
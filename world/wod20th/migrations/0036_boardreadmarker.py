@@ -0,0 +1,55 @@
+# Generated by Django 4.2.16 on 2026-10-18 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("wod20th", "0035_board_summary"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(fields=["board", "id"], name="post_board_id_idx"),
+        ),
+        migrations.CreateModel(
+            name="BoardReadMarker",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("last_read_id", models.BigIntegerField(default=0)),
+                ("read_bits", models.BinaryField(blank=True, default=b"")),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="bbs_read_markers",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "board",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="read_markers",
+                        to="wod20th.board",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("account", "board")},
+            },
+        ),
+    ]
@@ -1,6 +1,7 @@
 # mygame/server/conf/models.py
 import re
 from django.db import models
+from django.utils import timezone
 from django.db.models import JSONField  # Use the built-in JSONField
 from django.forms import ValidationError
 from evennia.locks.lockhandler import LockHandler
@@ -143,18 +144,259 @@ class Note(SharedMemoryModel):
     class Meta:
         unique_together = ('character', 'name')
 
+STAT_INSTANCE_RE = re.compile(r'^(?P<name>.*)\((?P<instance>.*)\)$')
+
+
+class CharacterStat(models.Model):
+    """
+    One stat on one character. Replaces the nested character.db.stats dict;
+    read and write these through the character's stats handler
+    (world/wod20th/utils/stat_handler.py) rather than directly.
+
+    Instanced stats such as 'Language(Spanish)' are stored as name='Language',
+    instance='Spanish'. perm and temp hold whatever the stat holds (numbers or
+    text); perm_rating mirrors perm when it is a whole number so ratings can
+    be compared across characters with an index.
+    """
+    character = models.ForeignKey("objects.ObjectDB", related_name="character_stats", on_delete=models.CASCADE)
+    category = models.CharField(max_length=100)
+    stat_type = models.CharField(max_length=100)
+    name = models.CharField(max_length=100)
+    instance = models.CharField(max_length=100, blank=True, default='')
+    perm = JSONField(blank=True, null=True, default=int)
+    temp = JSONField(blank=True, null=True, default=int)
+    perm_rating = models.IntegerField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ('character', 'category', 'stat_type', 'name', 'instance')
+        indexes = [
+            models.Index(fields=['category', 'stat_type', 'name', 'perm_rating'], name='charstat_rating_idx'),
+            models.Index(fields=['name', 'perm_rating'], name='charstat_name_rating_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.character_id}: {self.full_name} ({self.category}/{self.stat_type})"
+
+    @property
+    def full_name(self):
+        return self.join_name(self.name, self.instance)
+
+    @staticmethod
+    def split_name(full_name):
+        """
+        Split 'Name(Instance)' into ('Name', 'Instance'); names without an
+        instance come back as (full_name, '').
+        """
+        match = STAT_INSTANCE_RE.match(full_name)
+        if match:
+            return match.group('name'), match.group('instance')
+        return full_name, ''
+
+    @staticmethod
+    def join_name(name, instance):
+        return f"{name}({instance})" if instance else name
+
+    @staticmethod
+    def rating_for(value):
+        """
+        Return value as the integer stored in perm_rating, or None.
+        """
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        return None
+
+    def save(self, *args, **kwargs):
+        self.perm_rating = self.rating_for(self.perm)
+        super().save(*args, **kwargs)
+
+
+class RollLog(models.Model):
+    """
+    One +roll, as rolled. Entries are written in batches by
+    world/wod20th/utils/roll_log.py and never changed afterwards; the seed
+    and generator are enough to roll the same dice again.
+
+    character_name keeps the roller's name readable after the character is
+    deleted.
+    """
+    character = models.ForeignKey("objects.ObjectDB", related_name="roll_logs", null=True, blank=True, on_delete=models.SET_NULL)
+    character_name = models.CharField(max_length=255)
+    expression = models.CharField(max_length=255)
+    pool = models.IntegerField()
+    difficulty = models.IntegerField()
+    dice = JSONField(default=list)
+    successes = models.IntegerField()
+    botch = models.BooleanField(default=False)
+    seed = models.BigIntegerField()
+    generator = models.CharField(max_length=20)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['character', 'created_at'], name='rolllog_char_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.character_name}: {self.expression} vs {self.difficulty}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Roll log entries cannot be changed.")
+        super().save(*args, **kwargs)
+
+
+class Board(models.Model):
+    """
+    A bulletin board. Boards belong to a BBSController
+    (typeclasses/bbs_controller.py), which numbers them and is the only
+    thing that should read or write them.
+
+    post_count, last_post_at and last_poster summarize the board's posts
+    for the +bbs index; the controller updates them whenever a post is
+    made or deleted.
+    """
+    controller = models.ForeignKey("objects.ObjectDB", related_name="bbs_boards", on_delete=models.CASCADE)
+    number = models.PositiveIntegerField()
+    name = models.CharField(max_length=255)
+    description = models.TextField(blank=True, default='')
+    public = models.BooleanField(default=True)
+    read_only = models.BooleanField(default=False)
+    locked = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now)
+    post_count = models.PositiveIntegerField(default=0)
+    last_post_at = models.DateTimeField(null=True, blank=True)
+    last_poster = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        ordering = ['number']
+        unique_together = ('controller', 'number')
+
+    def __str__(self):
+        return f"{self.number}: {self.name}"
+
+
+class Post(models.Model):
+    """
+    One post on a Board. Posts are numbered on their board in the order
+    they were made, oldest first.
+    """
+    board = models.ForeignKey(Board, related_name="posts", on_delete=models.CASCADE)
+    title = models.CharField(max_length=255)
+    content = models.TextField()
+    author = models.CharField(max_length=255)
+    created_at = models.DateTimeField(default=timezone.now)
+    edited_at = models.DateTimeField(null=True, blank=True)
+    pinned = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['board', 'created_at'], name='post_board_time_idx'),
+            models.Index(fields=['board', 'pinned'], name='post_board_pinned_idx'),
+            models.Index(fields=['board', 'id'], name='post_board_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.board_id}: {self.title} ({self.author})"
+
+
+class BoardAccess(models.Model):
+    """
+    A character allowed on a private Board, by name, with 'full_access'
+    or 'read_only'.
+    """
+    board = models.ForeignKey(Board, related_name="access", on_delete=models.CASCADE)
+    character_name = models.CharField(max_length=255)
+    access_level = models.CharField(max_length=20, default='full_access')
+
+    class Meta:
+        unique_together = ('board', 'character_name')
+
+    def __str__(self):
+        return f"{self.character_name}: {self.access_level} on {self.board_id}"
+
+
+class BoardReadMarker(models.Model):
+    """
+    Which posts on a Board an account has read.
+
+    Every post up to last_read_id is read. Posts after it that were read
+    out of order are kept in read_bits, a little-endian bitmap where bit n
+    stands for post id last_read_id + 1 + n. The BBSController moves
+    last_read_id up to just before the first unread post whenever a post
+    is marked read, so the bitmap only ever covers posts read ahead of
+    one still unread.
+    """
+    account = models.ForeignKey("accounts.AccountDB", related_name="bbs_read_markers", on_delete=models.CASCADE)
+    board = models.ForeignKey(Board, related_name="read_markers", on_delete=models.CASCADE)
+    last_read_id = models.BigIntegerField(default=0)
+    read_bits = models.BinaryField(blank=True, default=b'')
+
+    class Meta:
+        unique_together = ('account', 'board')
+
+    def __str__(self):
+        return f"{self.account_id}: {self.board_id} up to {self.last_read_id}"
+
+    @property
+    def bits(self):
+        return int.from_bytes(bytes(self.read_bits or b''), 'little')
+
+    @bits.setter
+    def bits(self, value):
+        self.read_bits = value.to_bytes((value.bit_length() + 7) // 8, 'little')
+
+    def read_ids(self):
+        """
+        Return the ids of the posts after last_read_id that have been read.
+        """
+        bits = self.bits
+        ids = []
+        post_id = self.last_read_id + 1
+        while bits:
+            if bits & 1:
+                ids.append(post_id)
+            bits >>= 1
+            post_id += 1
+        return ids
+
+    def is_read(self, post_id):
+        if post_id <= self.last_read_id:
+            return True
+        return bool(self.bits >> (post_id - self.last_read_id - 1) & 1)
+
+    def mark(self, post_id):
+        """
+        Mark one post read. Returns False if it already was.
+        """
+        if self.is_read(post_id):
+            return False
+        self.bits |= 1 << (post_id - self.last_read_id - 1)
+        return True
+
+    def advance(self, last_read_id):
+        """
+        Move last_read_id up to last_read_id, once every post up to it is
+        known to be read.
+        """
+        if last_read_id > self.last_read_id:
+            self.bits >>= last_read_id - self.last_read_id
+            self.last_read_id = last_read_id
+
+
 def calculate_willpower(character):
     courage = character.get_stat('virtues', 'moral', 'Courage', temp=False)
     if courage is None:
         # If Courage is not present, use the highest virtue
-        virtues = character.db.stats.get('virtues', {}).get('moral', {})
+        virtues = character.stats.get_type('virtues', 'moral')
         highest_virtue = max(virtues.values(), key=lambda x: x.get('perm', 0))
         return highest_virtue.get('perm', 1)
     return courage if courage is not None else 1
 
 def calculate_road(character):
     enlightenment = character.get_stat('identity', 'personal', 'Enlightenment', temp=False)
-    virtues = character.db.stats.get('virtues', {}).get('moral', {})
+    virtues = character.stats.get_type('virtues', 'moral')
 
     path_virtues = {
         'Humanity': ('Conscience', 'Self-Control'),
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Stat
+from .utils.stat_catalog import invalidate_stat_catalog
+
+
+@receiver(post_save, sender=Stat)
+def stat_saved(sender, instance, **kwargs):
+    invalidate_stat_catalog()
+
+
+@receiver(post_delete, sender=Stat)
+def stat_deleted(sender, instance, **kwargs):
+    invalidate_stat_catalog()
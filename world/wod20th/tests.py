@@ -0,0 +1,875 @@
+import itertools
+import textwrap
+import unittest
+from unittest.mock import Mock, patch
+
+from django.db import IntegrityError, OperationalError
+from evennia import create_object
+from twisted.internet import reactor
+
+from commands.CmdRoll import CmdRoll
+from commands.CmdSheet import CmdSheet
+from commands.CmdSpendGain import CmdSpendGain
+from typeclasses.characters import Character
+from typeclasses.exits import Exit
+from typeclasses.objects import Object
+from typeclasses.rooms import RoomParent
+from world.wod20th.models import CharacterStat, RollLog
+from world.wod20th.utils.ansi_utils import TextCell, join_cells, printable_width, text_cell, wrap_ansi
+from world.wod20th.utils.dice_odds import MAX_POOL, roll_odds, success_chance
+from world.wod20th.utils import dice_rolls, roll_log
+from world.wod20th.utils.dice_rolls import NO_ROLL, DiceEngine, RollResult, format_roll, roll_seeded, score_roll
+from world.wod20th.utils.roll_log import FLUSH_DELAY, flush_roll_log, log_roll, recent_rolls, replay_roll
+from world.wod20th.utils.stat_handler import MAX_FLUSH_ATTEMPTS, RETRY_DELAY, StatsHandler, import_legacy_stats
+from world.wod20th.utils.stat_resolver import StatNameIndex
+
+
+class TestRollLog(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up test environment.
+        """
+        self.character = create_object(Character, key="Roller")
+
+    def tearDown(self):
+        """
+        Clean up test environment.
+        """
+        flush_roll_log()
+        RollLog.objects.filter(character_name="Roller").delete()
+        self.character.delete()
+
+    def test_log_and_replay(self):
+        """
+        Test that a logged roll is stored as rolled and replays to the same dice.
+        """
+        engine, result = roll_seeded(7, 6)
+        log_roll(self.character, "stre+dex+2", 7, 6, engine, result)
+        entry = recent_rolls(self.character)[0]
+        self.assertEqual(entry.dice, list(result.dice))
+        self.assertEqual(entry.successes, result.successes)
+        self.assertEqual(entry.botch, result.botch)
+        self.assertEqual(entry.seed, engine.seed)
+        self.assertEqual(list(replay_roll(entry).dice), list(result.dice))
+
+    def test_entries_cannot_change(self):
+        """
+        Test that saving a logged roll again is refused.
+        """
+        engine, result = roll_seeded(3, 6)
+        log_roll(self.character, "3", 3, 6, engine, result)
+        entry = recent_rolls(self.character)[0]
+        with self.assertRaises(ValueError):
+            entry.save()
+
+    def roll(self, pool=3, character=None):
+        engine, result = roll_seeded(pool, 6)
+        log_roll(character or self.character, str(pool), pool, 6, engine, result)
+
+    def logged(self):
+        return RollLog.objects.filter(character_name="Roller")
+
+    def test_queue_waits_for_flush(self):
+        """
+        Test that with a reactor running, rolls are queued and written together later.
+        """
+        with patch.object(reactor, 'running', True), patch.object(reactor, 'callLater') as call_later:
+            self.roll()
+            self.roll()
+            call_later.assert_called_once_with(FLUSH_DELAY, flush_roll_log)
+            self.assertFalse(self.logged().exists())
+            flush_roll_log()
+        self.assertEqual(self.logged().count(), 2)
+
+    def test_full_batch_is_written_at_once(self):
+        """
+        Test that reaching BATCH_SIZE writes the queue without waiting.
+        """
+        with patch.object(reactor, 'running', True), patch.object(reactor, 'callLater'), \
+                patch.object(roll_log, 'BATCH_SIZE', 2):
+            self.roll()
+            self.assertFalse(self.logged().exists())
+            self.roll()
+            self.assertEqual(self.logged().count(), 2)
+
+    def test_failed_flush_is_rescheduled(self):
+        """
+        Test that a failed write keeps the entries, schedules another flush
+        and does not retry on every roll.
+        """
+        with patch.object(reactor, 'running', True), patch.object(reactor, 'callLater') as call_later, \
+                patch.object(roll_log, 'BATCH_SIZE', 1), patch.object(roll_log, 'logger'), \
+                patch.object(RollLog.objects, 'bulk_create', side_effect=OperationalError("database is locked")) as bulk_create:
+            self.roll()
+            self.assertEqual(bulk_create.call_count, 1)
+            call_later.assert_called_with(FLUSH_DELAY, flush_roll_log)
+            self.roll()
+            self.assertEqual(bulk_create.call_count, 1)
+            self.assertEqual(len(roll_log._pending), 2)
+        flush_roll_log()
+        self.assertEqual(self.logged().count(), 2)
+        self.assertFalse(roll_log._pending)
+
+    def test_queue_is_capped(self):
+        """
+        Test that the oldest entries are dropped once MAX_PENDING are waiting.
+        """
+        with patch.object(reactor, 'running', True), patch.object(reactor, 'callLater'), \
+                patch.object(roll_log, 'MAX_PENDING', 2), patch.object(roll_log, 'logger') as logger:
+            for pool in (1, 2, 3, 4):
+                self.roll(pool)
+            self.assertEqual([entry.pool for entry in roll_log._pending], [3, 4])
+            self.assertEqual(logger.log_err.call_count, 2)
+        flush_roll_log()
+
+    def test_deleted_character(self):
+        """
+        Test that rolls queued before their character was deleted are still written.
+        """
+        doomed = create_object(Character, key="Roller")
+        with patch.object(reactor, 'running', True), patch.object(reactor, 'callLater'), \
+                patch.object(roll_log, 'logger') as logger:
+            self.roll(character=doomed)
+            doomed.delete()
+            flush_roll_log()
+            logger.log_trace.assert_called_once()
+            flush_roll_log()
+        entry = self.logged().get()
+        self.assertIsNone(entry.character_id)
+
+    def test_log_and_replay_switches(self):
+        """
+        Test +roll/log and +roll/replay, and that only staff can use them.
+        """
+        self.roll(5)
+        entry = recent_rolls(self.character)[0]
+        cmd = CmdRoll()
+        cmd.caller = Mock()
+        cmd.caller.check_permstring.return_value = True
+        cmd.switches = ["log"]
+        cmd.args = ""
+        cmd.func()
+        text = cmd.caller.msg.call_args[0][0]
+        self.assertIn(f"#{entry.id}", text)
+        self.assertIn("Roller: 5 (5 dice) vs 6", text)
+
+        cmd.switches = ["replay"]
+        cmd.args = f"#{entry.id}"
+        cmd.func()
+        self.assertIn("matches the log", cmd.caller.msg.call_args[0][0])
+        self.assertNotIn("does NOT", cmd.caller.msg.call_args[0][0])
+
+        cmd.args = "nonsense"
+        cmd.func()
+        cmd.caller.msg.assert_called_with("Usage: +roll/replay <roll number> (see +roll/log)")
+
+        cmd.caller.check_permstring.return_value = False
+        cmd.func()
+        cmd.caller.msg.assert_called_with("You don't have permission to view the roll log.")
+
+
+class TestDiceRules(unittest.TestCase):
+
+    def test_scoring(self):
+        """
+        Test hits, 1s, specialty 10s, willpower and botches.
+        """
+        self.assertEqual(score_roll([10, 6, 5, 1], 6), RollResult([10, 6, 5, 1], 2, 1, 1, False))
+        self.assertEqual(score_roll([10, 6, 5, 1], 6, specialty=True).successes, 2)
+        self.assertEqual(score_roll([10, 1, 1, 1], 6, specialty=True).successes, 0)
+        self.assertEqual(score_roll([5, 1, 1], 6, willpower=True), RollResult([5, 1, 1], 0, 2, 1, False))
+        self.assertEqual(score_roll([7, 1, 1], 6, willpower=True).successes, 1)
+        self.assertTrue(score_roll([1, 3], 6).botch)
+        self.assertFalse(score_roll([7, 1, 1], 6).botch)
+        self.assertFalse(score_roll([], 6).botch)
+
+    def test_difficulty_is_clamped(self):
+        """
+        Test that difficulties outside 2-10 are treated as 2 or 10.
+        """
+        self.assertEqual(score_roll([1, 2, 9], 0), score_roll([1, 2, 9], 2))
+        self.assertEqual(score_roll([10, 9], 12), score_roll([10, 9], 10))
+        self.assertEqual(score_roll([10, 9], 12).hits, 1)
+
+    def test_seeded_rolls_repeat(self):
+        """
+        Test that a roll can be repeated from its seed.
+        """
+        engine, first = roll_seeded(10, 6, seed=1234)
+        self.assertEqual(engine.seed, 1234)
+        self.assertEqual(engine.generator, "numpy" if dice_rolls.numpy is not None else "python")
+        self.assertEqual(roll_seeded(10, 6, seed=1234)[1], first)
+        self.assertEqual(len(first.dice), 10)
+        self.assertTrue(all(1 <= die <= 10 for die in first.dice))
+
+    def check_engine(self):
+        """
+        Roll a mix of pools and check each against score_roll on its own dice.
+        """
+        pools = [3, 0, 5, -2, 4, 8]
+        difficulties = [6, 7, 10, 6, 3, 12]
+        specialties = [True, False, True, False, False, True]
+        willpowers = [False, True, False, False, True, False]
+        for seed in range(25):
+            engine = DiceEngine(seed)
+            results = engine.roll_pools(pools, difficulties, specialties, willpowers)
+            self.assertEqual(len(results), len(pools))
+            for pool, difficulty, specialty, willpower, result in zip(
+                    pools, difficulties, specialties, willpowers, results):
+                self.assertEqual(len(result.dice), max(0, pool))
+                self.assertEqual(result, score_roll(list(result.dice), difficulty, specialty, willpower))
+            self.assertEqual(DiceEngine(seed).roll_pools(pools, difficulties, specialties, willpowers), results)
+
+    @unittest.skipUnless(dice_rolls.numpy, "NumPy is not installed")
+    def test_numpy_engine(self):
+        """
+        Test that the NumPy path scores pools the same way as score_roll.
+        """
+        self.assertEqual(DiceEngine(1).generator, "numpy")
+        self.check_engine()
+
+    def test_python_engine(self):
+        """
+        Test that the pure-Python path scores pools the same way as score_roll.
+        """
+        with patch.object(dice_rolls, 'numpy', None):
+            self.assertEqual(DiceEngine(1).generator, "python")
+            self.check_engine()
+
+    def test_no_roll_is_shared_safely(self):
+        """
+        Test that the shared empty result cannot be changed by a caller.
+        """
+        self.assertIsInstance(NO_ROLL.dice, tuple)
+        self.assertEqual((NO_ROLL.successes, NO_ROLL.botch), (0, False))
+
+
+class TestDiceOdds(unittest.TestCase):
+
+    def brute_force(self, pool, difficulty, specialty, willpower):
+        """
+        Score every possible roll of pool dice and count the outcomes.
+        """
+        successes = {}
+        botches = 0
+        for dice in itertools.product(range(1, 11), repeat=pool):
+            result = score_roll(list(dice), difficulty, specialty, willpower)
+            successes[result.successes] = successes.get(result.successes, 0) + 1
+            botches += result.botch
+        return successes, botches
+
+    def test_table_matches_enumeration(self):
+        """
+        Test the dynamic programming table against every possible roll of
+        small pools, with and without specialty and willpower.
+        """
+        for pool in range(4):
+            for difficulty in range(2, 11):
+                for specialty in (False, True):
+                    for willpower in (False, True):
+                        odds = roll_odds(pool, difficulty, specialty, willpower)
+                        successes, botches = self.brute_force(pool, difficulty, specialty, willpower)
+                        total = 10 ** pool
+                        label = (pool, difficulty, specialty, willpower)
+                        self.assertAlmostEqual(odds.botch, botches / total, msg=label)
+                        self.assertAlmostEqual(sum(odds.successes), 1.0, msg=label)
+                        for count in range(max(len(odds.successes), max(successes) + 1)):
+                            self.assertAlmostEqual(odds.exactly(count), successes.get(count, 0) / total, msg=(label, count))
+
+    def test_queries(self):
+        """
+        Test at_least, expected and the range checks.
+        """
+        odds = roll_odds(1, 6)
+        self.assertAlmostEqual(odds.at_least(1), 0.5)
+        self.assertAlmostEqual(odds.at_least(0), 1.0)
+        self.assertAlmostEqual(odds.expected, 0.5)
+        self.assertAlmostEqual(odds.botch, 0.1)
+        self.assertEqual(odds.exactly(5), 0.0)
+        self.assertAlmostEqual(success_chance(1, 6, willpower=True), 1.0)
+        self.assertEqual(roll_odds(-3, 6), roll_odds(0, 6))
+        with self.assertRaises(ValueError):
+            roll_odds(MAX_POOL + 1, 6)
+        with self.assertRaises(ValueError):
+            roll_odds(3, 11)
+
+    def test_odds_switch(self):
+        """
+        Test that +roll/odds shows the table and rolls nothing.
+        """
+        cmd = CmdRoll()
+        cmd.caller = Mock()
+        cmd.switches = ["odds"]
+        cmd.args = "2 vs 6"
+        cmd.func()
+        text = cmd.caller.msg.call_args[0][0]
+        self.assertIn("(2 dice)", text)
+        self.assertIn("|wBotch:|n   9.0%", text)
+        self.assertIn("        2     25.0%      25.0%", text)
+        cmd.caller.location.broadcast.assert_not_called()
+
+        cmd.args = "2 vs 11"
+        cmd.func()
+        cmd.caller.msg.assert_called_with("|rOdds> Difficulty must be between 2 and 10.|n")
+
+
+class TestRollGnosis(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up test environment.
+        """
+        self.room = create_object(RoomParent, key="Glade")
+        self.character = create_object(Character, key="Walker", location=self.room)
+        self.character.msg = Mock()
+
+    def tearDown(self):
+        """
+        Clean up test environment.
+        """
+        self.character.delete()
+        self.room.delete()
+
+    def test_ones_do_not_cancel(self):
+        """
+        Test that Gnosis rolls count every hit, as they always have, and
+        only botch when nothing hits.
+        """
+        self.character.set_stat('pools', 'dual', 'Gnosis', 3)
+        with patch('typeclasses.rooms.roll_pool', return_value=score_roll([8, 1, 1], 7)):
+            result = self.room.roll_gnosis(self.character, 7)
+        self.assertEqual((result.successes, result.botch), (1, False))
+        with patch('typeclasses.rooms.roll_pool', return_value=score_roll([3, 1, 5], 7)):
+            result = self.room.roll_gnosis(self.character, 7)
+        self.assertEqual((result.successes, result.botch), (0, True))
+
+    def test_no_gnosis(self):
+        """
+        Test that characters without Gnosis get the empty result.
+        """
+        self.assertIs(self.room.roll_gnosis(self.character, 6), NO_ROLL)
+
+
+class TestAppearanceCache(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up test environment.
+        """
+        self.room = create_object(RoomParent, key="Glade")
+        self.other = create_object(RoomParent, key="Clearing")
+        self.room.db.desc = "Moss and standing stones."
+        self.room.db.umbra_desc = "The stones hum with spirits."
+        self.character = create_object(Character, key="Walker", location=self.room)
+        self.objects = [self.room, self.other, self.character]
+
+    def tearDown(self):
+        """
+        Clean up test environment.
+        """
+        for obj in reversed(self.objects):
+            if obj.pk:
+                obj.delete()
+
+    def fragments(self, plane="material"):
+        return self.room.get_appearance_fragments(self.character, plane)
+
+    def add_exit(self, key, alias):
+        exit = create_object(Exit, key=key, location=self.room, destination=self.other, aliases=[alias])
+        self.objects.append(exit)
+        return exit
+
+    def test_reused_until_changed(self):
+        """
+        Test that an unchanged room reuses its fragments without asking
+        the exits for their display names.
+        """
+        self.add_exit("North", "n")
+        first = self.fragments()
+        with patch.object(Exit, "get_display_name") as get_display_name:
+            self.assertIs(self.fragments(), first)
+        get_display_name.assert_not_called()
+
+    def test_exit_changes(self):
+        """
+        Test that adding, renaming, re-aliasing and removing exits rebuilds
+        the exit columns.
+        """
+        first = self.fragments()
+        self.assertEqual(first["exits"], "")
+        exit = self.add_exit("North", "n")
+        self.assertIn("North", self.fragments()["exits"])
+        exit.key = "Northern Path"
+        self.assertIn("Northern Path", self.fragments()["exits"])
+        exit.aliases.add("np")
+        self.assertIn("<|yN|n>", self.fragments()["exits"])
+        exit.aliases.remove("n")
+        self.assertIn("<|yNP|n>", self.fragments()["exits"])
+        exit.delete()
+        self.assertEqual(self.fragments()["exits"], "")
+
+    def test_contents_change(self):
+        """
+        Test that objects moving in and out show up even though the
+        fragments are reused.
+        """
+        first = self.fragments()
+        stone = create_object(Object, key="Standing Stone", location=self.room)
+        self.objects.append(stone)
+        self.assertIn("Standing Stone", self.room.return_appearance(self.character))
+        self.assertIs(self.fragments(), first)
+        stone.move_to(self.other, quiet=True)
+        self.assertNotIn("Standing Stone", self.room.return_appearance(self.character))
+
+    def test_description_change(self):
+        """
+        Test that new descriptions, room types and resources are shown.
+        """
+        self.fragments()
+        self.room.db.desc = "Ash where the stones stood."
+        self.assertIn("Ash where the stones stood.", self.fragments()["desc"])
+        self.room.db.roomtype = "Caern"
+        self.room.db.resources = 3
+        self.assertIn("Res:3, Caern", self.fragments()["footer"])
+        self.room.db.umbra_desc = "Spirits mourn the stones."
+        self.assertIn("Spirits mourn the stones.", self.fragments("umbra")["desc"])
+
+    def test_plane_change(self):
+        """
+        Test that stepping sideways switches between the material and
+        Umbra descriptions.
+        """
+        self.assertIn("Moss and standing stones.", self.room.return_appearance(self.character))
+        self.character.set_plane("umbra")
+        appearance = self.room.return_appearance(self.character)
+        self.assertIn("The stones hum with spirits.", appearance)
+        self.assertNotIn("Moss and standing stones.", appearance)
+        self.character.set_plane("material")
+        self.assertIn("Moss and standing stones.", self.room.return_appearance(self.character))
+
+
+class TestFormatRoll(unittest.TestCase):
+
+    def test_botch_needs_no_hits(self):
+        """
+        Test that ones only botch a roll without hits, as the log scores it.
+        """
+        botch = score_roll([1, 1, 3], 6)
+        self.assertTrue(botch.botch)
+        self.assertIn("Botch!", format_roll(botch))
+
+        cancelled = score_roll([7, 1, 1], 6)
+        self.assertFalse(cancelled.botch)
+        self.assertEqual(cancelled.successes, 0)
+        text = format_roll(cancelled)
+        self.assertNotIn("Botch!", text)
+        self.assertIn("|y0|n", text)
+
+    def test_successes(self):
+        """
+        Test the success count and wording.
+        """
+        self.assertIn("|g1|n|w)|n|y Success|n", format_roll(score_roll([8, 3], 6)))
+        self.assertIn("|g2|n|w)|n|y Successes|n", format_roll(RollResult([9, 6], 2, 0, 2, False)))
+
+
+class TestCharacterStat(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up test environment.
+        """
+        self.character = create_object(Character, key="Statted")
+
+    def tearDown(self):
+        """
+        Clean up test environment.
+        """
+        self.character.delete()
+
+    def rows(self):
+        return CharacterStat.objects.filter(character_id=self.character.id)
+
+    def test_defaults(self):
+        """
+        Test that new rows start at 0 and keep perm_rating in step with perm.
+        """
+        row = CharacterStat.objects.create(
+            character_id=self.character.id, category='pools', stat_type='dual', name='Willpower')
+        row.refresh_from_db()
+        self.assertEqual((row.perm, row.temp, row.perm_rating), (0, 0, 0))
+
+        row.perm = "Brujah"
+        row.save()
+        row.refresh_from_db()
+        self.assertIsNone(row.perm_rating)
+
+    def test_split_name(self):
+        """
+        Test that instanced names are split and joined again.
+        """
+        self.assertEqual(CharacterStat.split_name("Language(Spanish)"), ("Language", "Spanish"))
+        self.assertEqual(CharacterStat.split_name("Strength"), ("Strength", ""))
+        self.assertEqual(CharacterStat.join_name("Language", "Spanish"), "Language(Spanish)")
+        self.assertIsNone(CharacterStat.rating_for(True))
+
+    def test_rows_follow_the_handler(self):
+        """
+        Test that stats set through the handler are stored one row each.
+        """
+        self.character.set_stat('attributes', 'physical', 'Strength', 3)
+        self.character.set_stat('attributes', 'physical', 'Strength', 2, temp=True)
+        self.character.set_stat('merits', 'social', 'Language(Spanish)', 1)
+        row = self.rows().get(name='Strength')
+        self.assertEqual((row.perm, row.temp, row.perm_rating), (3, 2, 3))
+        row = self.rows().get(name='Language')
+        self.assertEqual(row.instance, 'Spanish')
+
+        self.assertEqual(StatsHandler(self.character).get_stat('merits', 'social', 'Language(Spanish)'), 1)
+        self.character.stats.remove_stat('attributes', 'physical', 'Strength')
+        self.assertFalse(self.rows().filter(name='Strength').exists())
+
+    def test_legacy_import(self):
+        """
+        Test that a legacy db.stats Attribute is moved into rows.
+        """
+        self.character.attributes.add('stats', {
+            'attributes': {'physical': {'Dexterity': {'perm': 4, 'temp': 4}, 'Broken': 3}},
+            'identity': {'lineage': {'Clan': {'perm': 'Brujah', 'temp': 'Brujah'}}},
+        })
+        created, skipped = import_legacy_stats(self.character)
+        self.assertEqual(created, 2)
+        self.assertEqual(skipped, ['attributes/physical/Broken'])
+        self.assertFalse(self.character.attributes.has('stats'))
+        self.assertEqual(self.rows().get(name='Dexterity').perm_rating, 4)
+        self.assertEqual(StatsHandler(self.character).get_stat('identity', 'lineage', 'Clan'), 'Brujah')
+        self.assertIsNone(import_legacy_stats(self.character))
+
+
+class TestStatsHandlerFlush(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up test environment.
+        """
+        self.character = create_object(Character, key="Flushed")
+
+    def tearDown(self):
+        """
+        Clean up test environment.
+        """
+        self.character.delete()
+
+    def test_batch_writes_once(self):
+        """
+        Test that writes inside a batch reach the table when it exits.
+        """
+        rows = CharacterStat.objects.filter(character_id=self.character.id)
+        with self.character.stats.batch():
+            self.character.set_stat('attributes', 'physical', 'Strength', 3)
+            self.character.set_stat('attributes', 'physical', 'Stamina', 2)
+            self.assertFalse(rows.exists())
+        self.assertEqual(rows.count(), 2)
+
+    def test_failed_flush_is_retried(self):
+        """
+        Test that a transient failure keeps the stats dirty and schedules
+        another flush, and that the retry writes them.
+        """
+        stats = self.character.stats
+        with patch.object(reactor, 'running', True), patch.object(reactor, 'callLater') as call_later:
+            stats.set_stat('attributes', 'physical', 'Strength', 3)
+            call_later.assert_called_once_with(0, stats.flush)
+            with patch.object(CharacterStat.objects, 'bulk_create', side_effect=OperationalError("database is locked")):
+                with self.assertRaises(OperationalError):
+                    stats.flush()
+            call_later.assert_called_with(RETRY_DELAY, stats.flush)
+            stats.flush()
+        self.assertEqual(CharacterStat.objects.get(character_id=self.character.id, name='Strength').perm, 3)
+
+    def test_retries_are_capped(self):
+        """
+        Test that changes are dropped after MAX_FLUSH_ATTEMPTS transient failures.
+        """
+        stats = self.character.stats
+        with patch.object(reactor, 'running', True), patch.object(reactor, 'callLater') as call_later, \
+                patch.object(CharacterStat.objects, 'bulk_create', side_effect=OperationalError("database is locked")), \
+                patch('world.wod20th.utils.stat_handler.logger') as logger:
+            stats.set_stat('attributes', 'physical', 'Strength', 3)
+            for _ in range(MAX_FLUSH_ATTEMPTS):
+                with self.assertRaises(OperationalError):
+                    stats.flush()
+            retries = [call for call in call_later.call_args_list if call.args[0] == RETRY_DELAY]
+            self.assertEqual(len(retries), MAX_FLUSH_ATTEMPTS - 1)
+            logger.log_err.assert_called_once()
+        self.assertFalse(stats._dirty)
+        self.assertFalse(stats.has_stat('attributes', 'physical', 'Strength'))
+
+    def test_lasting_errors_are_not_retried(self):
+        """
+        Test that an error that would happen again drops the changes at once.
+        """
+        stats = self.character.stats
+        with patch.object(reactor, 'running', True), patch.object(reactor, 'callLater') as call_later, \
+                patch.object(CharacterStat.objects, 'bulk_create', side_effect=IntegrityError("constraint failed")), \
+                patch('world.wod20th.utils.stat_handler.logger') as logger:
+            stats.set_stat('attributes', 'physical', 'Strength', 3)
+            with self.assertRaises(IntegrityError):
+                stats.flush()
+            self.assertNotIn(RETRY_DELAY, [call.args[0] for call in call_later.call_args_list])
+            logger.log_err.assert_called_once()
+        self.assertFalse(stats._dirty)
+
+    def test_deleted_character(self):
+        """
+        Test that a flush scheduled before the character was deleted does nothing.
+        """
+        character = create_object(Character, key="Doomed")
+        stats = character.stats
+        with patch.object(reactor, 'running', True), patch.object(reactor, 'callLater') as call_later:
+            stats.set_stat('attributes', 'physical', 'Strength', 3)
+            character_id = character.id
+            character.delete()
+            stats.flush()
+            self.assertNotIn(RETRY_DELAY, [call.args[0] for call in call_later.call_args_list])
+        self.assertFalse(stats._dirty)
+        self.assertFalse(CharacterStat.objects.filter(character_id=character_id).exists())
+
+
+class TestSpendGain(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up test environment.
+        """
+        self.character = create_object(Character, key="Spender")
+        self.character.msg = Mock()
+        for pool in ('Willpower', 'Banality', 'Blood'):
+            self.character.set_stat('pools', 'dual', pool, 5, temp=True)
+        self.character.set_stat('abilities', 'talent', 'Brawl', 2)
+
+    def tearDown(self):
+        """
+        Clean up test environment.
+        """
+        self.character.delete()
+
+    def spend(self, args, cmdstring="+spend"):
+        cmd = CmdSpendGain()
+        cmd.caller = self.character
+        cmd.cmdstring = cmdstring
+        cmd.args = args
+        with patch.object(cmd, 'log_action'):
+            cmd.func()
+        return self.character.msg.call_args[0][0]
+
+    def temp(self, pool):
+        return self.character.get_stat('pools', 'dual', pool, temp=True)
+
+    def test_exact_and_prefix(self):
+        """
+        Test that pools are found by exact name or a prefix only one pool has.
+        """
+        self.spend("willpower=1")
+        self.assertEqual(self.temp('Willpower'), 4)
+        self.spend("will=2", cmdstring="+gain")
+        self.assertEqual(self.temp('Willpower'), 6)
+        self.spend("bla=1")
+        self.assertEqual(self.temp('Blood'), 5)
+        self.spend("blo=1")
+        self.assertEqual(self.temp('Blood'), 4)
+
+    def test_no_fuzzy_matches(self):
+        """
+        Test that misspelled, ambiguous and non-pool names are refused.
+        """
+        self.assertEqual(self.spend("banana=1"), "Invalid pool: banana")
+        self.assertEqual(self.spend("power=1"), "Invalid pool: power")
+        self.assertEqual(self.spend("brawl=1"), "Invalid pool: brawl")
+        self.assertEqual(self.spend("b=1"), "Which pool do you mean: Banality, Blood?")
+        self.assertEqual(self.spend("=1"), "Usage: +spend/+gain <pool>=<amount>[/<reason>]")
+        for pool in ('Willpower', 'Banality', 'Blood'):
+            self.assertEqual(self.temp(pool), 5)
+
+
+class TestStatNameResolution(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up test environment.
+        """
+        self.character = create_object(Character, key="Resolver")
+        with self.character.stats.batch():
+            self.character.set_stat('attributes', 'physical', 'Strength', 3)
+            self.character.set_stat('attributes', 'physical', 'Dexterity', 2)
+            self.character.set_stat('abilities', 'skill', 'Streetwise', 1)
+
+    def tearDown(self):
+        """
+        Clean up test environment.
+        """
+        self.character.delete()
+
+    def test_shared_prefix_is_ranked(self):
+        """
+        Test that a prefix several names share resolves to the closest one.
+        """
+        index = StatNameIndex(["Strength", "Streetwise", "Stamina"])
+        self.assertEqual(index.resolve("stre"), "Strength")
+        self.assertEqual(index.resolve("stree"), "Streetwise")
+        self.assertEqual(index.resolve("strenght"), "Strength")
+        self.assertIsNone(index.resolve("xyzzy"))
+
+    def test_roll_shared_prefix(self):
+        """
+        Test that +roll stre+dex rolls Strength when Streetwise shares the prefix.
+        """
+        cmd = CmdRoll()
+        cmd.caller = self.character
+        self.assertIsNone(self.character.stats.lookup("stre"))
+        self.assertEqual(cmd.get_stat_value_and_name("stre"), (3, "Strength"))
+        self.assertEqual(cmd.get_stat_value_and_name("dex"), (2, "Dexterity"))
+        self.assertEqual(cmd.get_stat_value_and_name("street"), (1, "Streetwise"))
+
+
+class TestWrapAnsi(unittest.TestCase):
+
+    def test_plain_text_matches_textwrap(self):
+        """
+        Test that text without markup wraps exactly as textwrap.fill does.
+        """
+        text = "The wind   howls through the caern, and the  Garou gather at the stones."
+        for width in (10, 17, 30, 76):
+            self.assertEqual(wrap_ansi(text, width), textwrap.fill(text, width, break_long_words=False, break_on_hyphens=False))
+        self.assertEqual(wrap_ansi("a extraordinarily b", 5), "a\nextraordinarily\nb")
+
+    def test_colors_carry_over(self):
+        """
+        Test that each line closes the colors it ends in and the next line
+        opens them again.
+        """
+        self.assertEqual(
+            wrap_ansi("|rred words that keep going|n plain", 10),
+            "|rred words|n\n|rthat keep|n\n|rgoing|n\nplain",
+        )
+        self.assertEqual(
+            wrap_ansi("|[b|wwhite on blue here|n", 10, left_padding=1, right_padding=1),
+            " |[b|wwhite on|n \n |[b|wblue|n \n |[b|where|n ",
+        )
+        self.assertEqual(wrap_ansi("plain |gthen green", 10), "plain |gthen|n\n|ggreen|n")
+
+    def test_markup_takes_no_width(self):
+        """
+        Test that markup is not counted when filling lines.
+        """
+        self.assertEqual(wrap_ansi("|rab|n |gcd|n", 5), "|rab|n |gcd|n")
+        self.assertEqual(wrap_ansi("a||b c", 4), "a||b\nc")
+
+    def test_line_breaks_and_tabs(self):
+        """
+        Test the documented differences from textwrap: |/ starts a new
+        line, and tabs count as a single space.
+        """
+        self.assertEqual(wrap_ansi("one|/two three", 20), "one\ntwo three")
+        self.assertEqual(wrap_ansi("|rone|/two|n", 20), "|rone|n\n|rtwo|n")
+        self.assertEqual(wrap_ansi("one|/|/two", 20), "one\n\ntwo")
+        self.assertEqual(wrap_ansi("a\tb", 20), "a b")
+        self.assertEqual(textwrap.fill("a\tb", 20), "a       b")
+        self.assertEqual(wrap_ansi("a|_b c", 3), "a|_b\nc")
+
+    def test_padding(self):
+        """
+        Test padding and the check that it leaves room for text.
+        """
+        self.assertEqual(wrap_ansi("one two", 6, left_padding=2), "  one\n  two")
+        with self.assertRaises(ValueError):
+            wrap_ansi("text", 4, left_padding=2, right_padding=2)
+
+
+class TestTextCell(unittest.TestCase):
+
+    def test_printable_width(self):
+        """
+        Test that markup takes no width and escapes and whitespace codes
+        count as printed.
+        """
+        self.assertEqual(printable_width("plain"), 5)
+        self.assertEqual(printable_width("|rred|n"), 3)
+        self.assertEqual(printable_width("|[b|w|500x|=a|n"), 1)
+        self.assertEqual(printable_width("a||b"), 3)
+        self.assertEqual(printable_width("a|_b"), 3)
+        self.assertEqual(printable_width("|lcsay hi|lthi|le"), 2)
+        self.assertEqual(text_cell("|rHello|n |gWorld|n"), TextCell("|rHello|n |gWorld|n", 11))
+
+    def test_padding(self):
+        """
+        Test that padding goes by printable width.
+        """
+        cell = text_cell("|rab|n")
+        self.assertEqual(str(cell.ljust(4)), "|rab|n  ")
+        self.assertEqual(str(cell.rjust(4, "-")), "--|rab|n")
+        self.assertEqual(cell.center(5), TextCell(" |rab|n  ", 5))
+        self.assertIs(cell.ljust(1), cell)
+
+    def test_truncate(self):
+        """
+        Test that truncating counts printable columns, keeps the markup
+        before the cut and closes colors left open.
+        """
+        cell = text_cell("|rHello|n |gWorld|n")
+        self.assertIs(cell.truncate(11), cell)
+        self.assertEqual(cell.truncate(8, "..."), TextCell("|rHello|n...", 8))
+        self.assertEqual(cell.truncate(3), TextCell("|rHel|n", 3))
+        self.assertEqual(cell.truncate(7), TextCell("|rHello|n |gW|n", 7))
+        self.assertEqual(text_cell("a||bcd").truncate(3), TextCell("a||b", 3))
+        self.assertEqual(text_cell("plain text").truncate(6, "..."), TextCell("pla...", 6))
+        self.assertEqual(text_cell("|rred|n").truncate(0), TextCell("|r|n", 0))
+
+    def test_join_cells(self):
+        """
+        Test that joined cells add up their widths and the separators'.
+        """
+        row = join_cells([text_cell("|rab|n").ljust(4), "|gc|n", "d"], " | ")
+        self.assertEqual(row, TextCell("|rab|n   | |gc|n | d", 12))
+        self.assertEqual(join_cells([]), TextCell("", 0))
+
+
+class TestSheetCache(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Set up test environment.
+        """
+        self.character = create_object(Character, key="Walker")
+        self.character.msg = Mock()
+        self.cmd = CmdSheet()
+        self.cmd.caller = self.character
+        self.cmd.session = None
+
+    def tearDown(self):
+        """
+        Clean up test environment.
+        """
+        self.character.delete()
+
+    def test_invalidation(self):
+        """
+        Test that the sheet is reused until a stat is written or the
+        character's approval changes.
+        """
+        with patch.object(CmdSheet, "render_sheet", autospec=True, side_effect=CmdSheet.render_sheet) as render:
+            sheet = self.cmd.get_sheet(self.character)
+            self.assertIn("Unapproved Character", sheet)
+            self.assertIs(self.cmd.get_sheet(self.character), sheet)
+            self.assertEqual(render.call_count, 1)
+
+            self.character.set_stat('attributes', 'physical', 'Strength', 4)
+            sheet = self.cmd.get_sheet(self.character)
+            self.assertEqual(render.call_count, 2)
+            self.assertIs(self.cmd.get_sheet(self.character), sheet)
+
+            self.character.db.approved = True
+            sheet = self.cmd.get_sheet(self.character)
+            self.assertEqual(render.call_count, 3)
+            self.assertNotIn("Unapproved Character", sheet)
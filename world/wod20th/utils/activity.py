@@ -0,0 +1,82 @@
+"""
+Session activity tracker.
+
+Keeps the time of the latest visible command (a session's
+cmd_last_visible) for every puppeted character in one in-memory map, so
+idle times in room listings and +where are a dict lookup instead of a
+walk over each character's sessions.
+
+The server session records every command it receives (see
+server/conf/serversession.py); characters add themselves when puppeted
+and drop out when their last session unpuppets them. The map is not
+saved: after a reload it is filled again from the sessions as characters
+are looked up.
+
+It also keeps the presence version, a counter bumped whenever someone
+logs in or out, puppets or unpuppets a character, a puppeted
+character moves or is renamed, a room is renamed or a name gradient is
+set. Views of who is where (+where) cache their output
+against it.
+"""
+import time
+
+_last_active = {}
+_presence_version = 0
+
+
+def presence_version():
+    return _presence_version
+
+
+def presence_changed():
+    """
+    Mark cached who/where views as stale.
+    """
+    global _presence_version
+    _presence_version += 1
+
+
+def record_activity(obj, timestamp=None):
+    """
+    Note that obj just did something visible. With several sessions
+    puppeting obj, the latest timestamp wins.
+    """
+    if timestamp is None:
+        timestamp = time.time()
+    if timestamp > _last_active.get(obj.id, 0):
+        _last_active[obj.id] = timestamp
+
+
+def refresh_activity(obj):
+    """
+    Set obj's latest activity from its connected sessions, or forget it if
+    it has none. Call when a session starts or stops puppeting obj.
+    """
+    sessions = obj.sessions.all()
+    if sessions:
+        _last_active[obj.id] = max(float(session.cmd_last_visible) for session in sessions)
+    else:
+        _last_active.pop(obj.id, None)
+
+
+def last_active(obj):
+    """
+    Return the time of obj's latest visible command, or None if no session
+    puppets it.
+    """
+    timestamp = _last_active.get(obj.id)
+    if timestamp is None and obj.sessions.count():
+        refresh_activity(obj)
+        timestamp = _last_active.get(obj.id)
+    return timestamp
+
+
+def idle_time(obj):
+    """
+    Return how many seconds obj has been idle, or None if no session
+    puppets it.
+    """
+    timestamp = last_active(obj)
+    if timestamp is None:
+        return None
+    return time.time() - timestamp
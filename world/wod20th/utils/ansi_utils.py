@@ -1,5 +1,162 @@
-import textwrap
-from evennia.utils.ansi import strip_raw_ansi, ANSIString
+"""
+ANSI-aware text wrapping.
+
+wrap_ansi() wraps text that contains Evennia color markup (|r, |[b,
+|123, |=a, ...) or raw ANSI escapes without losing the colors. The text
+is tokenized once: markup takes no width, everything else is measured as
+printed. Lines are then filled greedily, with the same rules as
+textwrap.fill(break_long_words=False, break_on_hyphens=False). Every
+line that ends inside a color is closed with |n, and the colors are
+opened again at the start of the next line, so each line stands on its
+own.
+
+|/ starts a new line, as it does when the text is displayed. The
+whitespace codes |_, |> and |- count as spaces. Unlike textwrap, tab
+characters are not expanded to tab stops and count as one space each.
+
+TextCell is a cheap alternative to ANSIString for laying out columns: a
+piece of markup plus its printable width, measured once by the same
+tokenizer. Padding, truncating and joining cells is plain string work, so
+a listing is built as markup and only parsed when it is sent:
+
+    name = text_cell(character.get_display_name(looker)).ljust(25)
+    row = join_cells([name, text_cell(idle).rjust(7), text_cell(desc).truncate(43, "...")])
+"""
+import re
+from collections import namedtuple
+
+from evennia.utils.ansi import ANSI_NORMAL, ANSIParser
+
+TEXT = 'text'
+SPACE = 'space'
+CODE = 'code'
+RESET = 'reset'
+BREAK = 'break'
+
+_MARKUP_MAP = dict(ANSIParser.ansi_map)
+_MARKUP_MAP.update(ANSIParser.ansi_xterm256_bright_bg_map)
+
+_MARKUP_RE = re.compile(
+    "|".join(
+        [r"\|\|", r"\|l[cu].*?\|lt", r"\|le", ANSIParser.ansi_re]
+        + ANSIParser.xterm256_fg + ANSIParser.xterm256_bg
+        + ANSIParser.xterm256_gfg + ANSIParser.xterm256_gbg
+        + [re.escape(key) for key in sorted(_MARKUP_MAP, key=len, reverse=True)]
+    ),
+    re.DOTALL,
+)
+_WHITESPACE_RE = re.compile(r"(\s+)")
+
+# token -> (kind, width)
+_token_kinds = {"||": (TEXT, 1), ANSI_NORMAL: (RESET, 0)}
+
+
+def _token_kind(token):
+    kind = _token_kinds.get(token)
+    if kind is None:
+        value = _MARKUP_MAP.get(token, "")
+        if token.startswith("|l") and not value:
+            # MXP link markup: no width, and not a color to carry over.
+            kind = (TEXT, 0)
+        elif value == ANSI_NORMAL:
+            kind = (RESET, 0)
+        elif "\n" in value:
+            kind = (BREAK, 0)
+        elif value and value.isspace():
+            kind = (SPACE, len(value.expandtabs(4)))
+        else:
+            kind = (CODE, 0)
+        _token_kinds[token] = kind
+    return kind
+
+
+def _paragraphs(text):
+    """
+    Split text into paragraphs (at |/) of chunks. A chunk is a word or a
+    run of whitespace: [is_space, width, parts, codes], where parts are the
+    strings to print and codes the color tokens among them, in order.
+    Color codes always belong to the word they precede or follow, never to
+    whitespace, so dropping whitespace at line ends never drops a color.
+    """
+    paragraphs = []
+    chunks = []
+    pending = []  # codes seen after whitespace, waiting for the next word
+
+    def add(piece, is_space, width):
+        if chunks and chunks[-1][0] == is_space and not (pending and not is_space):
+            chunk = chunks[-1]
+            chunk[1] += width
+            chunk[2].append(piece)
+        elif is_space:
+            chunks.append([True, width, [piece], None])
+        else:
+            chunks.append([False, width, pending[:] + [piece], pending[:]])
+            del pending[:]
+
+    def add_text(piece):
+        for index, part in enumerate(_WHITESPACE_RE.split(piece)):
+            if part:
+                # Odd parts are whitespace; textwrap turns each whitespace
+                # character into a single space.
+                if index % 2:
+                    add(" " * len(part), True, len(part))
+                else:
+                    add(part, False, len(part))
+
+    position = 0
+    for match in _MARKUP_RE.finditer(text):
+        if match.start() > position:
+            add_text(text[position:match.start()])
+        position = match.end()
+        token = match.group()
+        kind, width = _token_kind(token)
+        if kind == TEXT:
+            add(token, False, width)
+        elif kind == SPACE:
+            add(token, True, width)
+        elif kind == BREAK:
+            paragraphs.append(chunks)
+            chunks = []
+        elif chunks and not chunks[-1][0] and not pending:
+            chunks[-1][2].append(token)
+            chunks[-1][3].append(token)
+        else:
+            pending.append(token)
+    if position < len(text):
+        add_text(text[position:])
+    words = [chunk for chunk in chunks if not chunk[0]]
+    if pending and words:
+        # Codes after the last word: the whitespace before them is dropped
+        # at the end of the line anyway, so they can join that word.
+        words[-1][2].extend(pending)
+        words[-1][3].extend(pending)
+    paragraphs.append(chunks)
+    return paragraphs
+
+
+def _fill(chunks, width):
+    """
+    Split one paragraph's chunks into lines, like textwrap does.
+    """
+    lines = []
+    chunks = chunks[::-1]
+    while chunks:
+        line = []
+        length = 0
+        if lines and chunks[-1][0]:
+            del chunks[-1]
+        while chunks and length + chunks[-1][1] <= width:
+            length += chunks[-1][1]
+            line.append(chunks.pop())
+        if chunks and chunks[-1][1] > width and not line:
+            # Words longer than the width get a line of their own.
+            line.append(chunks.pop())
+        if line and line[-1][0]:
+            del line[-1]
+        if line:
+            lines.append(line)
+    return lines
+
 
 def wrap_ansi(text, width, left_padding=0, right_padding=0):
     """
@@ -17,23 +174,126 @@ def wrap_ansi(text, width, left_padding=0, right_padding=0):
     if left_padding + right_padding >= width:
         raise ValueError("Combined padding is too large for the given width.")
 
-    text = ANSIString(text)
-    raw_text = strip_raw_ansi(text)
-    
     # Adjust the width for the padding
     wrap_width = width - left_padding - right_padding
+    left = " " * left_padding
+    right = " " * right_padding
 
-    wrapped_text = textwrap.fill(
-        raw_text, 
-        width=wrap_width, 
-        break_long_words=False, 
-        break_on_hyphens=False
-    )
-
-    # Add padding to each line
-    padded_lines = [
-        " " * left_padding + line + " " * right_padding
-        for line in wrapped_text.split('\n')
-    ]
+    padded_lines = []
+    active = []  # color codes in effect since the last |n
+    for paragraph in _paragraphs(str(text)):
+        lines = _fill(paragraph, wrap_width) or [[]]
+        for line in lines:
+            reopen = "".join(active)
+            for chunk in line:
+                for code in chunk[3] or ():
+                    if _token_kinds[code][0] == RESET:
+                        del active[:]
+                    else:
+                        active.append(code)
+            body = "".join(part for chunk in line for part in chunk[2])
+            padded_lines.append(left + reopen + body + ("|n" if active else "") + right)
 
     return "\n".join(padded_lines)
+
+
+def printable_width(text):
+    """
+    Return how many columns text takes up once its markup is rendered.
+    """
+    text = str(text)
+    width = 0
+    position = 0
+    for match in _MARKUP_RE.finditer(text):
+        width += match.start() - position + _token_kind(match.group())[1]
+        position = match.end()
+    return width + len(text) - position
+
+
+class TextCell(namedtuple('TextCell', ['markup', 'width'])):
+    """
+    A single line of markup and its printable width. str() gives the
+    markup, so cells drop straight into f-strings.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        return self.markup
+
+    def ljust(self, width, fillchar=" "):
+        if self.width >= width:
+            return self
+        return TextCell(self.markup + fillchar * (width - self.width), width)
+
+    def rjust(self, width, fillchar=" "):
+        if self.width >= width:
+            return self
+        return TextCell(fillchar * (width - self.width) + self.markup, width)
+
+    def center(self, width, fillchar=" "):
+        if self.width >= width:
+            return self
+        left = (width - self.width) // 2
+        return TextCell(fillchar * left + self.markup + fillchar * (width - self.width - left), width)
+
+    def truncate(self, width, ending=""):
+        """
+        Cut the cell down to width columns, replacing the end with ending
+        (such as "...") if anything was cut. Colors still open at the cut
+        are closed.
+        """
+        if self.width <= width:
+            return self
+        limit = max(0, width - len(ending))
+        parts = []
+        used = 0
+        colored = False
+        position = 0
+        for match in _MARKUP_RE.finditer(self.markup):
+            text = self.markup[position:match.start()]
+            if used + len(text) > limit:
+                parts.append(text[:limit - used])
+                used = limit
+                break
+            parts.append(text)
+            used += len(text)
+            token = match.group()
+            kind, token_width = _token_kind(token)
+            if used + token_width > limit:
+                break
+            parts.append(token)
+            used += token_width
+            position = match.end()
+            if kind == RESET:
+                colored = False
+            elif kind == CODE:
+                colored = True
+        else:
+            text = self.markup[position:position + limit - used]
+            parts.append(text)
+            used += len(text)
+        parts.append(ending)
+        if colored:
+            parts.append("|n")
+        return TextCell("".join(parts), used + len(ending))
+
+
+def text_cell(text):
+    """
+    Return text (a string with markup, an ANSIString or a TextCell) as a
+    TextCell.
+    """
+    if isinstance(text, TextCell):
+        return text
+    text = str(text)
+    return TextCell(text, printable_width(text))
+
+
+def join_cells(cells, separator=" "):
+    """
+    Join cells (or strings) into one TextCell, as for a table row.
+    """
+    cells = [text_cell(cell) for cell in cells]
+    separator = text_cell(separator)
+    return TextCell(separator.markup.join(cell.markup for cell in cells),
+                    sum(cell.width for cell in cells) + separator.width * max(0, len(cells) - 1))
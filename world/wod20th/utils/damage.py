@@ -77,6 +77,7 @@ def apply_damage_or_healing(character, change, damage_type):
     character.db.lethal = new_lethal
     character.db.agg = new_agg
     character.db.injury_level = new_injury_level
+    character.bump_stats_version()
 
     return new_injury_level
 
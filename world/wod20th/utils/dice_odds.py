@@ -0,0 +1,128 @@
+"""
+Exact odds for WoD20 dice pools.
+
+The outcome distribution of every pool of 0-30 dice against every
+difficulty from 2 to 10 is worked out once by dynamic programming, on
+first use, and kept in a table. Odds queries are then a lookup:
+
+    roll_odds(7, 6).at_least(3)     # chance of 3+ successes on 7 dice vs 6
+    roll_odds(5, 8).botch           # chance of botching 5 dice vs 8
+
+The same rules as dice_rolls.roll_pool apply, including specialties (10s
+count double) and willpower (one automatic success, no botch).
+
+Probabilities are exact: the table counts the outcomes of all 10**pool
+possible rolls with integers and only divides at the end.
+"""
+from collections import namedtuple
+
+from world.wod20th.utils.dice_rolls import MAX_DIFFICULTY, MIN_DIFFICULTY
+
+MAX_POOL = 30
+
+
+class RollOdds(namedtuple('RollOdds', ['pool', 'difficulty', 'specialty', 'willpower', 'successes', 'botch'])):
+    """
+    Outcome distribution of one roll.
+
+    successes[k] is the chance of ending with exactly k successes (botches
+    count as 0 successes); botch is the chance of botching.
+    """
+    __slots__ = ()
+
+    def exactly(self, successes):
+        if 0 <= successes < len(self.successes):
+            return self.successes[successes]
+        return 0.0
+
+    def at_least(self, successes):
+        return sum(self.successes[max(0, successes):], 0.0)
+
+    @property
+    def expected(self):
+        """
+        Average number of successes.
+        """
+        return sum(count * chance for count, chance in enumerate(self.successes))
+
+
+def _distributions(difficulty, specialty):
+    """
+    Yield (success counts, botch count) for pools of 0..MAX_POOL dice.
+
+    A roll's state is its running net (successes rolled minus 1s) plus
+    whether any die succeeded, since only rolls without a single success
+    can botch. Each step adds one die to every state.
+    """
+    misses = difficulty - 2           # faces 2..difficulty-1
+    plain_hits = 10 - difficulty      # faces difficulty..9
+    ten = 2 if specialty else 1
+
+    states = {(0, False): 1}
+    for pool in range(MAX_POOL + 1):
+        successes = [0] * (pool * ten + 1)
+        botches = 0
+        for (net, hit), count in states.items():
+            successes[max(0, net)] += count
+            if not hit and net < 0:
+                botches += count
+        while len(successes) > 1 and not successes[-1]:
+            successes.pop()
+        yield successes, botches
+
+        rolled = {}
+        for (net, hit), count in states.items():
+            for key, ways in (((net - 1, hit), 1), ((net, hit), misses),
+                              ((net + 1, True), plain_hits), ((net + ten, True), 1)):
+                if ways:
+                    rolled[key] = rolled.get(key, 0) + count * ways
+        states = rolled
+
+
+_tables = {}
+
+
+def odds_table(specialty=False):
+    """
+    Return the table of RollOdds (without willpower) keyed by (pool,
+    difficulty), building it on first use.
+    """
+    table = _tables.get(specialty)
+    if table is None:
+        table = {}
+        for difficulty in range(MIN_DIFFICULTY, MAX_DIFFICULTY + 1):
+            for pool, (successes, botches) in enumerate(_distributions(difficulty, specialty)):
+                total = 10 ** pool
+                table[(pool, difficulty)] = RollOdds(
+                    pool, difficulty, specialty, False,
+                    tuple(count / total for count in successes), botches / total)
+        _tables[specialty] = table
+    return table
+
+
+def roll_odds(pool, difficulty=6, specialty=False, willpower=False):
+    """
+    Return the RollOdds of rolling pool dice against difficulty.
+
+    Pools below 0 roll no dice, like roll_pool. Raises ValueError for pools
+    over MAX_POOL or difficulties outside 2-10.
+    """
+    pool = max(0, int(pool))
+    if pool > MAX_POOL:
+        raise ValueError(f"Odds are only tabled for pools of up to {MAX_POOL} dice.")
+    if not MIN_DIFFICULTY <= difficulty <= MAX_DIFFICULTY:
+        raise ValueError(f"Difficulty must be between {MIN_DIFFICULTY} and {MAX_DIFFICULTY}.")
+
+    odds = odds_table(bool(specialty))[(pool, difficulty)]
+    if willpower:
+        # The automatic success shifts every outcome up by one and turns
+        # botches into a single success.
+        odds = odds._replace(willpower=True, successes=(0.0,) + odds.successes, botch=0.0)
+    return odds
+
+
+def success_chance(pool, difficulty=6, successes=1, specialty=False, willpower=False):
+    """
+    Return the chance of rolling at least the given number of successes.
+    """
+    return roll_odds(pool, difficulty, specialty, willpower).at_least(successes)
@@ -1,6 +1,192 @@
-from random import randint
+"""
+Dice engine for World of Darkness 20th Anniversary Edition.
+
+All game code rolls through the functions here. Dice for every pool in a
+request are drawn in one batch from a DiceEngine's generator and counted
+per pool, so a storyteller rolling fifty pools pays for one draw rather
+than one randint call per die. NumPy is used when it is installed; a
+pure-Python fallback gives the same results otherwise.
+
+roll_seeded() rolls with a fresh engine seeded for that one roll, so the
+roll can be repeated exactly from its seed (see utils/roll_log.py). Seeds
+replay on the same generator only: an engine's `generator` is 'numpy' or
+'python' depending on which one it uses.
+
+Rules applied by roll_pool/roll_pools:
+    - a die showing the difficulty or higher is a success, each 1
+      cancels one success;
+    - specialty: each 10 counts as two successes;
+    - willpower: one automatic success that 1s cannot cancel, and the
+      roll cannot botch;
+    - botch: no successes rolled at all and at least one 1;
+    - difficulties are clamped to 2-10.
+"""
+import random
+import secrets
+from collections import namedtuple
 from typing import List, Tuple
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# dice: the faces rolled, in roll order.
+# hits: dice at or above the difficulty (10s counted twice with a specialty).
+# ones: dice showing 1.
+# successes: final successes after 1s and willpower, never negative.
+# botch: True if the roll botched.
+RollResult = namedtuple('RollResult', ['dice', 'hits', 'ones', 'successes', 'botch'])
+
+NO_ROLL = RollResult((), 0, 0, 0, False)
+
+MIN_DIFFICULTY = 2
+MAX_DIFFICULTY = 10
+
+
+def clamp_difficulty(difficulty):
+    """
+    Return difficulty within MIN_DIFFICULTY-MAX_DIFFICULTY.
+    """
+    return min(MAX_DIFFICULTY, max(MIN_DIFFICULTY, int(difficulty)))
+
+
+def score_roll(dice, difficulty, specialty=False, willpower=False):
+    """
+    Apply the WoD20 rules to a list of faces.
+    """
+    difficulty = clamp_difficulty(difficulty)
+    hits = sum(1 for die in dice if die >= difficulty)
+    ones = dice.count(1)
+    if specialty:
+        hits += dice.count(10)
+
+    successes = max(0, hits - ones)
+    botch = hits == 0 and ones > 0 and not willpower
+    if willpower:
+        successes += 1
+    return RollResult(dice, hits, ones, successes, botch)
+
+
+class DiceEngine:
+    """
+    A d10 source. Engines created with the same seed roll the same dice.
+    """
+
+    def __init__(self, seed=None):
+        self.seed = seed
+        if numpy is not None:
+            self.generator = 'numpy'
+            self._rng = numpy.random.default_rng(seed)
+        else:
+            self.generator = 'python'
+            self._rng = random.Random(seed)
+
+    def draw(self, count):
+        """
+        Return count d10 faces, as a NumPy array when NumPy is available and
+        a list otherwise.
+        """
+        if numpy is not None:
+            return self._rng.integers(1, 11, size=count)
+        rand = self._rng.random
+        return [int(rand() * 10) + 1 for _ in range(count)]
+
+    def roll_pools(self, pools, difficulty=6, specialty=False, willpower=False) -> List[RollResult]:
+        """
+        Roll several dice pools at once.
+
+        Args:
+            pools (list of int): Dice in each pool; negative pools roll no dice.
+            difficulty (int or list of int): One difficulty for every pool,
+                or one per pool.
+            specialty (bool or list of bool): 10s count double.
+            willpower (bool or list of bool): Add one automatic success.
+
+        Returns:
+            list of RollResult: One per pool, in the same order.
+        """
+        pools = [max(0, int(pool)) for pool in pools]
+        count = len(pools)
+        difficulties = list(difficulty) if isinstance(difficulty, (list, tuple)) else [difficulty] * count
+        difficulties = [clamp_difficulty(value) for value in difficulties]
+        specialties = list(specialty) if isinstance(specialty, (list, tuple)) else [specialty] * count
+        willpowers = list(willpower) if isinstance(willpower, (list, tuple)) else [willpower] * count
+
+        faces = self.draw(sum(pools))
+        if numpy is None or not count:
+            results = []
+            start = 0
+            for index, pool in enumerate(pools):
+                results.append(score_roll(faces[start:start + pool], difficulties[index],
+                                          specialties[index], willpowers[index]))
+                start += pool
+            return results
+
+        # Count every pool at once: owners[i] is the pool die i belongs to.
+        owners = numpy.repeat(numpy.arange(count), pools)
+        hits = numpy.bincount(owners, weights=faces >= numpy.repeat(difficulties, pools), minlength=count)
+        ones = numpy.bincount(owners, weights=faces == 1, minlength=count)
+        tens = numpy.bincount(owners, weights=faces == 10, minlength=count)
+        hits = (hits + tens * numpy.array(specialties, dtype=bool)).astype(int)
+        ones = ones.astype(int)
+        willpowers = numpy.array(willpowers, dtype=bool)
+        successes = numpy.maximum(0, hits - ones) + willpowers
+        botches = (hits == 0) & (ones > 0) & ~willpowers
+
+        faces = faces.tolist()
+        ends = numpy.cumsum(pools).tolist()
+        starts = [0] + ends[:-1]
+        return [
+            RollResult(faces[start:end], hit, one, success, botch)
+            for start, end, hit, one, success, botch in zip(
+                starts, ends, hits.tolist(), ones.tolist(), successes.tolist(), botches.tolist())
+        ]
+
+    def roll_pool(self, pool, difficulty=6, specialty=False, willpower=False) -> RollResult:
+        """
+        Roll a single dice pool.
+        """
+        return self.roll_pools([pool], difficulty, specialty, willpower)[0]
+
+
+DICE = DiceEngine()
+
+
+def roll_pools(pools, difficulty=6, specialty=False, willpower=False) -> List[RollResult]:
+    """
+    Roll several pools with the shared engine. See DiceEngine.roll_pools.
+    """
+    return DICE.roll_pools(pools, difficulty, specialty, willpower)
+
+
+def roll_pool(pool, difficulty=6, specialty=False, willpower=False) -> RollResult:
+    """
+    Roll one pool with the shared engine. See DiceEngine.roll_pools.
+    """
+    return DICE.roll_pool(pool, difficulty, specialty, willpower)
+
+
+def new_seed():
+    """
+    Return a fresh random seed that fits a signed 64-bit database column.
+    """
+    return secrets.randbits(63)
+
+
+def roll_seeded(pool, difficulty=6, specialty=False, willpower=False, seed=None):
+    """
+    Roll one pool from its own seed. Passing a seed from an earlier call
+    rolls the same dice again.
+
+    Returns:
+        tuple: (engine, RollResult); engine.seed and engine.generator
+            identify the roll.
+    """
+    engine = DiceEngine(new_seed() if seed is None else seed)
+    return engine, engine.roll_pool(pool, difficulty, specialty, willpower)
+
+
 def roll_dice(dice_pool: int, difficulty: int) -> Tuple[List[int], int, int]:
     """
     Roll dice for World of Darkness 20th Anniversary Edition.
@@ -12,15 +198,11 @@ def roll_dice(dice_pool: int, difficulty: int) -> Tuple[List[int], int, int]:
     Returns:
     Tuple[List[int], int, int]: A tuple containing:
         - List of individual die results
-        - Number of successes
+        - Number of successes (successes rolled minus ones, may be negative)
         - Number of ones (potential botches)
     """
-    rolls = [randint(1, 10) for _ in range(max(0, dice_pool))]
-    successes = sum(1 for roll in rolls if roll >= difficulty)
-    ones = sum(1 for roll in rolls if roll == 1)
-    successes = successes - ones
-    
-    return rolls, successes, ones
+    result = roll_pool(dice_pool, difficulty)
+    return result.dice, result.hits - result.ones, result.ones
 
 def interpret_roll_results(successes, ones, diff=6, rolls=None):
     """
@@ -66,4 +248,35 @@ def interpret_roll_results(successes, ones, diff=6, rolls=None):
 
 
     msg += "|w)|n"
-    return msg
\ No newline at end of file
+    return msg
+
+def format_roll(result, diff=6):
+    """
+    Describe a RollResult the way +roll shows it, from its scored
+    successes and botch, so what the room sees matches the roll log.
+
+    Args:
+    result (RollResult): The roll to describe.
+    diff (int): The difficulty it was rolled against, for coloring dice.
+
+    Returns:
+    str: A string describing the result of the roll.
+    """
+    successes = result.successes
+    if result.botch:
+        msg = "|w(|n|r0|n|w)|n|r Botch!|n"
+    else:
+        color = "|g" if successes > 0 else "|y"
+        msg = f"|w(|n{color}{successes}|n|w)|n"
+        msg += "|y Success|n" if successes == 1 else "|y Successes|n"
+
+    # colorize the successes to green, ones to red and everything else to yellow
+    faces = []
+    for roll in sorted(result.dice, reverse=True):
+        if roll == 1:
+            faces.append(f"|r{roll}|n")
+        elif roll >= diff:
+            faces.append(f"|g{roll}|n")
+        else:
+            faces.append(f"|y{roll}|n")
+    return f"{msg} |w(|n{' '.join(faces)}|w)|n"
@@ -1,5 +1,42 @@
+import functools
+from collections import OrderedDict
+
 from evennia.utils.ansi import ANSIString
 
+FORMAT_CACHE_SIZE = 512
+
+
+def _cache_key(value):
+    # ANSIString compares equal to plain strings, but header/divider treat
+    # the two differently, so the type is part of the key.
+    return (type(value), str(value))
+
+
+def memoize_format(func):
+    """
+    Cache a builder's results by its arguments, keeping the
+    FORMAT_CACHE_SIZE most recently used. The results are strings and
+    ANSIStrings, which are immutable, so callers share them safely.
+    """
+    cache = OrderedDict()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (tuple(_cache_key(arg) for arg in args),
+               tuple((name, _cache_key(value)) for name, value in sorted(kwargs.items())))
+        result = cache.get(key)
+        if result is not None:
+            cache.move_to_end(key)
+            return result
+        result = cache[key] = func(*args, **kwargs)
+        if len(cache) > FORMAT_CACHE_SIZE:
+            cache.popitem(last=False)
+        return result
+
+    wrapper.cache_clear = cache.clear
+    return wrapper
+
+
 def format_stat(stat, value, width=25, default=None, tempvalue=None):
     if default is not None and (value is None or value == 0 or value == ""):
         value = default
@@ -26,13 +63,16 @@ def format_stat(stat, value, width=25, default=None, tempvalue=None):
     dots = "." * (width - len(stat_str) - len(value_str) - 1)
     return f"{stat_str}{dots}{value_str}"
 
+@memoize_format
 def header(title, width=78,  color="|y", fillchar=ANSIString("|b-|n"), bcolor="|b"):
     return ANSIString.center(ANSIString(f"{bcolor}<|n {color} {title} |n{bcolor}>|n"), width=width, fillchar=ANSIString(fillchar)) + "\n"
 
+@memoize_format
 def footer(width=78, fillchar=ANSIString("|b-|n")):
     return ANSIString(fillchar) * width + "\n"
 
 
+@memoize_format
 def divider(title, width=78, fillchar="-", color="|r", text_color="|n"):
     """
     Create a divider with a title.
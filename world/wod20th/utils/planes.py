@@ -0,0 +1,17 @@
+"""
+Material world and Umbra.
+
+Which plane an object is on is kept in its state tags (in_material or
+in_umbra). This module has no typeclass imports, so characters and rooms
+can both use it however early they are imported.
+"""
+
+PLANES = ("material", "umbra")
+
+
+def plane_of(obj):
+    """
+    Read which plane an object is on from its state tags. Objects without
+    an in_umbra tag are in the material world.
+    """
+    return "umbra" if obj.tags.get("in_umbra", category="state") else "material"
@@ -0,0 +1,146 @@
+"""
+Roll audit log.
+
+Every +roll is recorded as a RollLog row holding its seed, so staff can
+see exactly what was rolled and roll the same dice again with
+replay_roll().
+
+log_roll() only queues the entry; queued entries are written together
+with one bulk INSERT FLUSH_DELAY seconds later, or at once when
+BATCH_SIZE of them are waiting, so logging never adds a query to the
+command that rolled. The queue is also flushed when the server stops.
+When no reactor is running (management commands, tests) entries are
+written immediately.
+
+If a write fails the entries stay queued and another flush is tried
+FLUSH_DELAY seconds later; until one succeeds, reaching BATCH_SIZE does
+not force a write on every roll. Entries for characters deleted while
+they were queued are kept without the character. At most MAX_PENDING entries are kept
+waiting: beyond that the oldest are dropped and the loss is logged.
+"""
+from django.db import IntegrityError, transaction
+from evennia.objects.models import ObjectDB
+from evennia.utils import logger
+
+from world.wod20th.models import RollLog
+from world.wod20th.utils.dice_rolls import DICE, roll_seeded
+
+BATCH_SIZE = 100
+FLUSH_DELAY = 5
+MAX_PENDING = 10 * BATCH_SIZE
+
+_pending = []
+_flush_call = None
+_failed = False
+
+
+def log_roll(character, expression, pool, difficulty, engine, result):
+    """
+    Queue a roll for the log.
+
+    Args:
+        character (Object): Who rolled.
+        expression (str): What they typed, e.g. 'stre+dex+2'.
+        pool (int): Dice rolled.
+        difficulty (int): Difficulty rolled against.
+        engine (DiceEngine): The engine the roll came from (roll_seeded).
+        result (RollResult): What was rolled.
+    """
+    _pending.append(RollLog(
+        character_id=character.id,
+        character_name=character.key,
+        expression=expression[:255],
+        pool=pool,
+        difficulty=difficulty,
+        dice=list(result.dice),
+        successes=result.successes,
+        botch=result.botch,
+        seed=engine.seed,
+        generator=engine.generator,
+    ))
+    if len(_pending) > MAX_PENDING:
+        dropped = len(_pending) - MAX_PENDING
+        del _pending[:dropped]
+        logger.log_err(f"Roll log queue is full; dropped the {dropped} oldest entries.")
+    _schedule_flush()
+
+
+def _schedule_flush():
+    global _flush_call
+    from twisted.internet import reactor
+
+    if not reactor.running or (len(_pending) >= BATCH_SIZE and not _failed):
+        flush_roll_log()
+    elif _flush_call is None:
+        _flush_call = reactor.callLater(FLUSH_DELAY, flush_roll_log)
+
+
+def flush_roll_log():
+    """
+    Write every queued roll. Entries that fail to save stay queued and
+    another flush is scheduled.
+    """
+    global _flush_call, _failed
+    if _flush_call is not None and _flush_call.active():
+        _flush_call.cancel()
+    _flush_call = None
+    if not _pending:
+        return
+
+    entries = _pending[:]
+    del _pending[:]
+    try:
+        with transaction.atomic():
+            RollLog.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+    except Exception as err:
+        if isinstance(err, IntegrityError):
+            _forget_deleted_characters(entries)
+        _pending[:0] = entries
+        _failed = True
+        logger.log_trace("Could not write the roll log.")
+        from twisted.internet import reactor
+        if reactor.running:
+            _flush_call = reactor.callLater(FLUSH_DELAY, flush_roll_log)
+        return
+    _failed = False
+
+
+def _forget_deleted_characters(entries):
+    """
+    Clear the character of entries whose character was deleted while they
+    were queued, as the foreign key would have; character_name still says
+    who rolled.
+    """
+    ids = {entry.character_id for entry in entries if entry.character_id}
+    existing = set(ObjectDB.objects.filter(id__in=ids).values_list('id', flat=True))
+    for entry in entries:
+        if entry.character_id not in existing:
+            entry.character_id = None
+
+
+def recent_rolls(character=None, limit=20):
+    """
+    Return the latest logged rolls, newest first, optionally only those of
+    one character.
+    """
+    flush_roll_log()
+    rolls = RollLog.objects.all()
+    if character is not None:
+        rolls = rolls.filter(character_id=character.id)
+    return list(rolls[:limit])
+
+
+def replay_roll(entry):
+    """
+    Roll a logged roll's dice again from its seed.
+
+    Returns:
+        RollResult: The same dice as the original roll.
+
+    Raises:
+        ValueError: If the roll came from a different generator than the
+            one available now (NumPy installed or removed since).
+    """
+    if entry.generator != DICE.generator:
+        raise ValueError(f"Roll #{entry.id} was made with the {entry.generator} generator and cannot be replayed here.")
+    return roll_seeded(entry.pool, entry.difficulty, seed=entry.seed)[1]
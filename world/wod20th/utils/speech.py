@@ -0,0 +1,133 @@
+"""
+Speech parsing for poses, emits and says.
+
+A pose is split once into segments: narration, plain quotes ("like
+this") and language quotes ("~like this"). Each language quote is masked
+once, when the pose is parsed, so the version for those who understand
+the speaker's language and the version for those who don't are both
+joined from the same parse:
+
+    speech = parse_speech(' waves. "~Bonjour!" and "hi"', 'French')
+    speech.understood  # ' waves. "Bonjour! |w<< in French >>|n" and "hi"'
+    speech.masked      # ' waves. "<< ..., excitedly >>" and "hi"'
+"""
+import random
+import re
+from collections import namedtuple
+
+QUOTE_RE = re.compile(r'"(.*?)"')
+
+NARRATION = 'narration'
+QUOTE = 'quote'
+LANGUAGE = 'language'
+
+# First matching entry wins. Keywords match anywhere in the lowercased text.
+TONE_KEYWORDS = (
+    (('hello', 'hi', 'hey', 'greetings'), "in greeting"),
+    (('goodbye', 'bye', 'farewell'), "in farewell"),
+    (('please', 'thank', 'thanks'), "politely"),
+    (('sorry', 'apologize'), "apologetically"),
+)
+
+# (maximum words, ways of describing speech that long)
+MASKS = (
+    (3, ("<< mutters a few words in {language} >>",
+         "<< something brief in {language} >>",
+         "<< speaks a short {language} phrase >>")),
+    (10, ("<< speaks a sentence in {language} >>",
+          "<< a {language} phrase >>",
+          "<< conveys a short message in {language} >>")),
+    (None, ("<< gives a lengthy explanation in {language} >>",
+            "<< engages in an extended {language} dialogue >>",
+            "<< speaks at length in {language} >>")),
+)
+
+# understood: the text for those who understand it; masked: for those who
+# don't. They are the same except for language quotes.
+Segment = namedtuple('Segment', ['kind', 'understood', 'masked'])
+
+
+def detect_tone(message):
+    """
+    Detect the tone of the message based on punctuation and keywords.
+    """
+    if message.endswith('!'):
+        return "excitedly"
+    if message.endswith('?'):
+        return "questioningly"
+    lowered = message.lower()
+    for keywords, tone in TONE_KEYWORDS:
+        if any(word in lowered for word in keywords):
+            return tone
+    return None
+
+
+def mask_language(message, language):
+    """
+    Describe speech in a language without giving away what was said.
+    """
+    words = len(message.split())
+    for max_words, options in MASKS:
+        if max_words is None or words <= max_words:
+            break
+    masked = random.choice(options).format(language=language)
+
+    tone = detect_tone(message)
+    if tone:
+        masked = f"{masked[:-3]}, {tone} >>"
+    return masked
+
+
+class ParsedSpeech(namedtuple('ParsedSpeech', ['segments', 'language'])):
+    """
+    A pose split into Segments.
+    """
+    __slots__ = ()
+
+    @property
+    def understood(self):
+        return "".join(segment.understood for segment in self.segments)
+
+    @property
+    def masked(self):
+        return "".join(segment.masked for segment in self.segments)
+
+    @property
+    def has_language(self):
+        return any(segment.kind == LANGUAGE for segment in self.segments)
+
+
+def parse_speech(text, language=None):
+    """
+    Split text into narration and quotes. Quotes starting with ~ are in
+    language; without a language they are shown as plain quotes.
+
+    Returns:
+        ParsedSpeech
+    """
+    segments = []
+    last_end = 0
+    for match in QUOTE_RE.finditer(text):
+        if match.start() > last_end:
+            narration = text[last_end:match.start()]
+            segments.append(Segment(NARRATION, narration, narration))
+
+        content = match.group(1)
+        if content.startswith('~') and language:
+            content = content[1:]
+            segments.append(Segment(
+                LANGUAGE,
+                f'"{content} |w<< in {language} >>|n"',
+                f'"{mask_language(content, language)}"',
+            ))
+        else:
+            if content.startswith('~'):
+                content = content[1:]
+            quote = f'"{content}"'
+            segments.append(Segment(QUOTE, quote, quote))
+        last_end = match.end()
+
+    if last_end < len(text):
+        narration = text[last_end:]
+        segments.append(Segment(NARRATION, narration, narration))
+    return ParsedSpeech(tuple(segments), language)
@@ -0,0 +1,135 @@
+"""
+In-process catalog of Stat definitions.
+
+The Stat table is read on nearly every sheet, roll and stat edit but only
+changes when staff load or edit stat definitions. This module keeps one
+read-mostly copy of every Stat row in memory, indexed by
+(name, category, stat_type), by lowercased name and by sorted lowercased
+name for prefix searches, so default lookups never touch the database.
+
+The catalog is loaded at server start (see server/conf/at_server_startstop.py)
+and marked stale by the post_save/post_delete signals in
+world/wod20th/signals.py; the next lookup after a change reloads it in a
+single query.
+"""
+from bisect import bisect_left
+
+from world.wod20th.models import Stat
+
+
+class StatCatalog:
+    """
+    Indexes of Stat rows. Use the module-level helpers rather than
+    instantiating this directly.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.version = 0
+        self.by_key = {}
+        self.by_name = {}
+        self.by_type = {}
+        self.sorted_names = []
+
+    def load(self):
+        """
+        (Re)build every index from the Stat table in one query.
+        """
+        by_key = {}
+        by_name = {}
+        by_type = {}
+        for stat in Stat.objects.all().order_by('id'):
+            # First row wins, matching the old .filter(...).first() lookups.
+            by_key.setdefault((stat.name, stat.category, stat.stat_type), stat)
+            by_name.setdefault(stat.name.lower(), []).append(stat)
+            by_type.setdefault((stat.category, stat.stat_type), []).append(stat)
+
+        # Swap the indexes in together so readers never see a half-built catalog.
+        self.by_key = by_key
+        self.by_name = by_name
+        self.by_type = by_type
+        self.sorted_names = sorted(by_name)
+        self.loaded = True
+
+    def invalidate(self):
+        self.loaded = False
+        self.version += 1
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+
+STAT_CATALOG = StatCatalog()
+
+
+def load_stat_catalog():
+    """
+    Load the catalog eagerly. Called once at server start.
+    """
+    STAT_CATALOG.load()
+
+
+def invalidate_stat_catalog(*args, **kwargs):
+    """
+    Mark the catalog stale. Accepts and ignores signal arguments so it can be
+    connected directly as a receiver.
+    """
+    STAT_CATALOG.invalidate()
+
+
+def stat_catalog_version():
+    """
+    Return a counter that changes whenever Stat definitions change, for use
+    in keys of caches built from the catalog.
+    """
+    return STAT_CATALOG.version
+
+
+def get_stat_definition(name, category, stat_type):
+    """
+    Return the Stat row for an exact (name, category, stat_type), or None.
+    The returned object is shared; do not modify it.
+    """
+    STAT_CATALOG.ensure_loaded()
+    return STAT_CATALOG.by_key.get((name, category, stat_type))
+
+
+def get_stat_default(name, category, stat_type):
+    """
+    Return the default value defined for a stat, or None if there is no
+    such stat.
+    """
+    stat = get_stat_definition(name, category, stat_type)
+    return stat.default if stat else None
+
+
+def find_stats(name):
+    """
+    Return all Stat rows whose name matches case-insensitively.
+    """
+    STAT_CATALOG.ensure_loaded()
+    return list(STAT_CATALOG.by_name.get(name.lower(), ()))
+
+
+def find_stats_by_prefix(prefix):
+    """
+    Return all Stat rows whose lowercased name starts with prefix.
+    """
+    STAT_CATALOG.ensure_loaded()
+    prefix = prefix.lower()
+    names = STAT_CATALOG.sorted_names
+    matches = []
+    index = bisect_left(names, prefix)
+    while index < len(names) and names[index].startswith(prefix):
+        matches.extend(STAT_CATALOG.by_name[names[index]])
+        index += 1
+    return matches
+
+
+def get_stats_by_type(category, stat_type):
+    """
+    Return all Stat rows of a category/stat_type, in database id order.
+    """
+    STAT_CATALOG.ensure_loaded()
+    return list(STAT_CATALOG.by_type.get((category, stat_type), ()))
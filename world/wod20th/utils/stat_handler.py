@@ -0,0 +1,414 @@
+"""
+Character stats handler.
+
+Character stats are stored one row per stat in the CharacterStat table.
+Each character gets a StatsHandler (character.stats) that loads all of its
+rows in a single query the first time they are needed and keeps them in a
+nested dict with the same shape the old character.db.stats Attribute had:
+
+    {category: {stat_type: {name: {'perm': value, 'temp': value}}}}
+
+Reads are served from that dict. Writes update the dict at once and mark
+the stat dirty; dirty stats are written together by flush(), which runs
+once the current command has finished (on the next reactor tick) or when
+the outermost `with character.stats.batch():` block exits. A whole chargen
+or +stats splat change therefore costs one transaction with at most one
+INSERT, one UPDATE and one DELETE. When no reactor is running (management
+commands, tests) every write is flushed immediately. If a flush fails on
+a transient database error (a locked table, a dropped connection), its
+stats stay dirty and it is tried again RETRY_DELAY seconds later, up to
+MAX_FLUSH_ATTEMPTS times. Any other error, or running out of attempts,
+logs the failure and drops the unsaved changes: the handler reloads from
+the database. Changes to a character that has been deleted are dropped.
+
+Characters that still carry a legacy db.stats Attribute are converted the
+first time their handler loads. The wod20th_migrate_stats management
+command converts all of them at once.
+"""
+import copy
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.db import InterfaceError, OperationalError, transaction
+from evennia.utils import logger
+
+from world.wod20th.models import CharacterStat
+from world.wod20th.utils.stat_catalog import get_stat_default
+from world.wod20th.utils.stat_resolver import StatNameIndex
+
+LEGACY_STATS_ATTRIBUTE = 'stats'
+
+# Seconds to wait before writing stats again after a failed flush, and how
+# many times in a row a flush may fail before its changes are dropped.
+RETRY_DELAY = 5
+MAX_FLUSH_ATTEMPTS = 3
+
+# Errors that may go away if the same write is tried again later.
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+# One entry of StatsHandler.index.
+IndexedStat = namedtuple('IndexedStat', ['name', 'category', 'stat_type', 'perm', 'temp'])
+
+
+def legacy_stat_rows(character, stats):
+    """
+    Turn a legacy nested stats dict into unsaved CharacterStat rows.
+
+    Args:
+        character (ObjectDB): The owner of the stats.
+        stats (dict): A {category: {stat_type: {name: {'perm', 'temp'}}}} dict.
+
+    Returns:
+        tuple: (rows, skipped) where skipped lists the paths of entries that
+            did not have that shape and were left out.
+    """
+    rows = []
+    skipped = []
+    for category, stat_types in (stats or {}).items():
+        if not isinstance(stat_types, dict):
+            skipped.append(category)
+            continue
+        for stat_type, named_stats in stat_types.items():
+            if not isinstance(named_stats, dict):
+                skipped.append(f"{category}/{stat_type}")
+                continue
+            for full_name, values in named_stats.items():
+                if not isinstance(values, dict) or not ({'perm', 'temp'} & set(values)):
+                    skipped.append(f"{category}/{stat_type}/{full_name}")
+                    continue
+                name, instance = CharacterStat.split_name(full_name)
+                perm = values.get('perm')
+                rows.append(CharacterStat(
+                    character_id=character.id,
+                    category=category,
+                    stat_type=stat_type,
+                    name=name,
+                    instance=instance,
+                    perm=perm,
+                    temp=values.get('temp'),
+                    perm_rating=CharacterStat.rating_for(perm),
+                ))
+    return rows, skipped
+
+
+def import_legacy_stats(character):
+    """
+    Move a character's legacy db.stats Attribute into CharacterStat rows and
+    remove the Attribute. Rows the character already has are kept.
+
+    Returns:
+        tuple: (number of rows created, list of skipped entry paths), or
+            None if the character had no legacy stats.
+    """
+    stats = character.attributes.get(LEGACY_STATS_ATTRIBUTE)
+    if stats is None:
+        return None
+    if hasattr(stats, 'deserialize'):
+        stats = stats.deserialize()
+
+    rows, skipped = legacy_stat_rows(character, stats)
+    with transaction.atomic():
+        created = CharacterStat.objects.bulk_create(rows, ignore_conflicts=True)
+        character.attributes.remove(LEGACY_STATS_ATTRIBUTE)
+    return len(created), skipped
+
+
+class StatsHandler:
+    """
+    Reads and writes a character's CharacterStat rows. Available as
+    character.stats on Characters.
+    """
+
+    def __init__(self, obj):
+        self.obj = obj
+        self._stats = None
+        self._pks = {}
+        self._dirty = set()
+        self._batch_depth = 0
+        self._flush_scheduled = False
+        self._failed_flushes = 0
+        self._index = None
+        self._prefixes = None
+        self._name_index = None
+
+    def _load(self):
+        if self._stats is None:
+            if self.obj.attributes.has(LEGACY_STATS_ATTRIBUTE):
+                import_legacy_stats(self.obj)
+            stats = {}
+            pks = {}
+            rows = CharacterStat.objects.filter(character_id=self.obj.id).values_list(
+                'id', 'category', 'stat_type', 'name', 'instance', 'perm', 'temp')
+            for pk, category, stat_type, name, instance, perm, temp in rows:
+                full_name = CharacterStat.join_name(name, instance)
+                stats.setdefault(category, {}).setdefault(stat_type, {})[full_name] = {'perm': perm, 'temp': temp}
+                pks[(category, stat_type, full_name)] = pk
+            self._stats = stats
+            self._pks = pks
+            self._index = self._prefixes = self._name_index = None
+        return self._stats
+
+    def _build_index(self):
+        index = {}
+        for category, stat_types in self._load().items():
+            for stat_type, named_stats in stat_types.items():
+                for stat_name, values in named_stats.items():
+                    # First occurrence wins when a name is used under several
+                    # categories, as in the old nested-dict walk.
+                    index.setdefault(stat_name.lower(), IndexedStat(
+                        stat_name, category, stat_type, values.get('perm'), values.get('temp')))
+
+        # Every prefix of every name, mapped to the one name it identifies
+        # or to None when several names share it.
+        prefixes = {}
+        for key in index:
+            for end in range(1, len(key) + 1):
+                prefix = key[:end]
+                prefixes[prefix] = None if prefix in prefixes else key
+
+        self._index = index
+        self._prefixes = prefixes
+
+    @property
+    def index(self):
+        """
+        Flat {lowercased name: IndexedStat} view of every stat, rebuilt
+        lazily after writes. Do not modify it.
+        """
+        if self._index is None:
+            self._build_index()
+        return self._index
+
+    @property
+    def name_index(self):
+        """
+        StatNameIndex over the names of this character's stats, for ranked
+        fuzzy matching. Rebuilt lazily after writes.
+        """
+        if self._name_index is None:
+            self._name_index = StatNameIndex(entry.name for entry in self.index.values())
+        return self._name_index
+
+    def lookup(self, name):
+        """
+        Find a stat by exact name or by a prefix that only one of the
+        character's stats starts with, ignoring case.
+
+        Returns:
+            IndexedStat or None: None if nothing matches or the prefix is
+                ambiguous.
+        """
+        key = name.lower()
+        index = self.index
+        if key in index:
+            return index[key]
+        match = self._prefixes.get(key)
+        return index[match] if match else None
+
+    def _mark_dirty(self, keys):
+        self._dirty.update(keys)
+        self._index = self._prefixes = self._name_index = None
+        self.obj.bump_stats_version()
+        if not self._batch_depth:
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        from twisted.internet import reactor
+
+        if not reactor.running:
+            self.flush()
+        elif not self._flush_scheduled:
+            self._flush_scheduled = True
+            reactor.callLater(0, self.flush)
+
+    def _schedule_retry(self):
+        from twisted.internet import reactor
+
+        if reactor.running and not self._flush_scheduled:
+            self._flush_scheduled = True
+            reactor.callLater(RETRY_DELAY, self.flush)
+
+    @contextmanager
+    def batch(self):
+        """
+        Hold back writes until the block exits, then flush them together.
+        Blocks may be nested; only the outermost one flushes.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush()
+
+    def flush(self):
+        """
+        Write every dirty stat to the database in one transaction. If that
+        fails the error is raised, after either keeping the stats dirty and
+        scheduling another try (transient errors) or dropping them.
+        """
+        self._flush_scheduled = False
+        if not self._dirty or self._stats is None:
+            return
+        if not self.obj.pk:
+            # The character was deleted; there is nowhere to write to.
+            self._dirty = set()
+            return
+        dirty, self._dirty = self._dirty, set()
+
+        to_create = []
+        to_update = []
+        to_delete = []
+        deleted_keys = []
+        for key in dirty:
+            category, stat_type, stat_name = key
+            values = self._stats.get(category, {}).get(stat_type, {}).get(stat_name)
+            pk = self._pks.get(key)
+            if values is None:
+                if pk is not None:
+                    to_delete.append(pk)
+                    deleted_keys.append(key)
+                continue
+            name, instance = CharacterStat.split_name(stat_name)
+            perm = values.get('perm')
+            row = CharacterStat(
+                pk=pk, character_id=self.obj.id, category=category, stat_type=stat_type,
+                name=name, instance=instance, perm=perm, temp=values.get('temp'),
+                perm_rating=CharacterStat.rating_for(perm))
+            if pk is None:
+                to_create.append((key, row))
+            else:
+                to_update.append(row)
+
+        try:
+            with transaction.atomic():
+                if to_delete:
+                    CharacterStat.objects.filter(pk__in=to_delete).delete()
+                if to_update:
+                    CharacterStat.objects.bulk_update(to_update, ['perm', 'temp', 'perm_rating'])
+                if to_create:
+                    CharacterStat.objects.bulk_create(
+                        [row for _, row in to_create],
+                        update_conflicts=True,
+                        unique_fields=['character', 'category', 'stat_type', 'name', 'instance'],
+                        update_fields=['perm', 'temp', 'perm_rating'])
+        except Exception as err:
+            self._flush_failed(dirty, err)
+            raise
+
+        self._failed_flushes = 0
+        for key in deleted_keys:
+            del self._pks[key]
+        for key, row in to_create:
+            self._pks[key] = row.pk
+        if any(row.pk is None for _, row in to_create):
+            # Not every backend returns ids for upserted rows.
+            self._pks.update(
+                ((category, stat_type, CharacterStat.join_name(name, instance)), pk)
+                for pk, category, stat_type, name, instance in CharacterStat.objects.filter(
+                    character_id=self.obj.id).values_list('id', 'category', 'stat_type', 'name', 'instance'))
+
+    def _flush_failed(self, dirty, err):
+        """
+        Keep the stats of a failed flush for another try if the error may
+        be transient and there are attempts left; otherwise log the error
+        and forget the unsaved changes.
+        """
+        self._failed_flushes += 1
+        if isinstance(err, TRANSIENT_ERRORS) and self._failed_flushes < MAX_FLUSH_ATTEMPTS:
+            self._dirty |= dirty
+            self._schedule_retry()
+            return
+        logger.log_err(f"Dropped {len(dirty)} unsaved stat changes on {self.obj.key} "
+                       f"after {self._failed_flushes} failed flushes: {err}")
+        self._failed_flushes = 0
+        self._dirty = set()
+        self._stats = None
+        self._pks = {}
+        self._index = self._prefixes = self._name_index = None
+        self.obj.bump_stats_version()
+
+    def reload(self):
+        """
+        Write pending changes, then forget the loaded stats so the next
+        access reads them from the database again. Use after changing
+        CharacterStat rows directly.
+        """
+        self.flush()
+        self._stats = None
+        self._pks = {}
+        self._index = self._prefixes = self._name_index = None
+        self.obj.bump_stats_version()
+
+    def get_stat(self, category, stat_type, stat_name, temp=False):
+        """
+        Return the perm (or temp) value of a stat, falling back to the
+        Stat definition's default when the character does not have it.
+        """
+        values = self._load().get(category, {}).get(stat_type, {}).get(stat_name)
+        if values is not None:
+            return values.get('temp' if temp else 'perm')
+        return get_stat_default(stat_name, category, stat_type)
+
+    def has_stat(self, category, stat_type, stat_name):
+        return stat_name in self._load().get(category, {}).get(stat_type, {})
+
+    def set_stat(self, category, stat_type, stat_name, value, temp=False):
+        """
+        Set the perm (or temp) value of a stat, creating it with 0 for the
+        other value if the character does not have it yet.
+        """
+        type_stats = self._load().setdefault(category, {}).setdefault(stat_type, {})
+        values = type_stats.setdefault(stat_name, {'perm': 0, 'temp': 0})
+        values['temp' if temp else 'perm'] = value
+        self._mark_dirty([(category, stat_type, stat_name)])
+
+    def remove_stat(self, category, stat_type, stat_name):
+        """
+        Remove a stat from the character. Returns False if it did not have it.
+        """
+        type_stats = self._load().get(category, {}).get(stat_type, {})
+        if stat_name not in type_stats:
+            return False
+        del type_stats[stat_name]
+        self._mark_dirty([(category, stat_type, stat_name)])
+        return True
+
+    def clear(self, category=None, stat_type=None):
+        """
+        Remove every stat, every stat in a category, or every stat of one
+        category/stat_type.
+        """
+        stats = self._load()
+        if category is None:
+            removed = stats.copy()
+            stats.clear()
+        elif stat_type is None:
+            removed = {category: stats.pop(category, {})}
+        else:
+            removed = {category: {stat_type: stats.get(category, {}).pop(stat_type, {})}}
+        self._mark_dirty([
+            (removed_category, removed_type, stat_name)
+            for removed_category, stat_types in removed.items()
+            for removed_type, named_stats in stat_types.items()
+            for stat_name in named_stats
+        ])
+
+    def get_category(self, category):
+        """
+        Return a copy of one category as {stat_type: {name: {'perm', 'temp'}}}.
+        """
+        return copy.deepcopy(self._load().get(category, {}))
+
+    def get_type(self, category, stat_type):
+        """
+        Return a copy of one category/stat_type as {name: {'perm', 'temp'}}.
+        """
+        return copy.deepcopy(self._load().get(category, {}).get(stat_type, {}))
+
+    def all(self):
+        """
+        Return a copy of every stat in the nested legacy layout.
+        """
+        return copy.deepcopy(self._load())
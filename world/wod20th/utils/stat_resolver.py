@@ -0,0 +1,195 @@
+"""
+Stat name resolution.
+
+Commands accept abbreviated or misspelled stat names ('stre', 'dex',
+'alrtness'). StatNameIndex answers those lookups from a prebuilt index
+instead of running difflib over every name:
+
+- exact names and prefixes come from a sorted list of lowercased names,
+- fuzzy matches are ranked by how many padded trigrams they share with the
+  query (Dice coefficient), and only names sharing at least one trigram
+  are ever scored.
+
+One index covers the whole Stat catalog and is rebuilt when the catalog
+changes; each character's stats handler keeps another over the stats that
+character has (character.stats.name_index).
+"""
+from bisect import bisect_left
+from collections import namedtuple
+
+from world.wod20th.utils.stat_catalog import STAT_CATALOG, find_stats, stat_catalog_version
+
+# A ranked match. score is 1.0 for an exact match, 0.8-1.0 for a prefix
+# match (longer prefixes score higher) and below 0.8 for fuzzy matches.
+Candidate = namedtuple('Candidate', ['name', 'score'])
+
+FUZZY_CUTOFF = 0.5
+
+
+def trigrams(text):
+    """
+    Return the set of trigrams of text, padded so that the start of a word
+    weighs more than its end.
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class StatNameIndex:
+    """
+    Prefix and trigram index over a set of names. Lookups ignore case;
+    results use the names' original spelling.
+    """
+
+    def __init__(self, names):
+        self.names = {}
+        for name in names:
+            self.names.setdefault(name.lower(), name)
+        self.keys = sorted(self.names)
+        self.key_trigrams = {key: trigrams(key) for key in self.keys}
+        self.postings = {}
+        for key, grams in self.key_trigrams.items():
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(key)
+
+    def __contains__(self, name):
+        return name.lower() in self.names
+
+    def __len__(self):
+        return len(self.names)
+
+    def _prefixed_keys(self, prefix):
+        keys = []
+        index = bisect_left(self.keys, prefix)
+        while index < len(self.keys) and self.keys[index].startswith(prefix):
+            keys.append(self.keys[index])
+            index += 1
+        return keys
+
+    def prefixed(self, prefix):
+        """
+        Return every name starting with prefix, in alphabetical order.
+        """
+        return [self.names[key] for key in self._prefixed_keys(prefix.lower())]
+
+    def containing(self, text):
+        """
+        Return every name containing text, in alphabetical order.
+        """
+        text = text.lower()
+        if len(text) < 3:
+            return [self.names[key] for key in self.keys if text in key]
+
+        # Only names holding every trigram of text can contain it.
+        candidates = None
+        for i in range(len(text) - 2):
+            keys = set(self.postings.get(text[i:i + 3], ()))
+            candidates = keys if candidates is None else candidates & keys
+            if not candidates:
+                return []
+        return [self.names[key] for key in sorted(candidates) if text in key]
+
+    def rank(self, query, limit=5, cutoff=FUZZY_CUTOFF):
+        """
+        Return up to limit Candidates for query, best first.
+
+        Args:
+            query (str): What the player typed.
+            limit (int): Maximum number of candidates to return.
+            cutoff (float): Minimum trigram similarity (0-1) for fuzzy
+                matches. Exact and prefix matches are always returned.
+        """
+        key = query.lower().strip()
+        if not key:
+            return []
+
+        scores = {}
+        if key in self.names:
+            scores[key] = 1.0
+        for match in self._prefixed_keys(key):
+            scores.setdefault(match, 0.8 + 0.19 * len(key) / len(match))
+
+        query_grams = trigrams(key)
+        shared = {}
+        for gram in query_grams:
+            for match in self.postings.get(gram, ()):
+                shared[match] = shared.get(match, 0) + 1
+        for match, count in shared.items():
+            if match in scores:
+                continue
+            similarity = 2 * count / (len(query_grams) + len(self.key_trigrams[match]))
+            if similarity >= cutoff:
+                scores[match] = 0.8 * similarity
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [Candidate(self.names[match], score) for match, score in ranked]
+
+    def resolve(self, query, cutoff=FUZZY_CUTOFF):
+        """
+        Return the one name query refers to: an exact match, else the only
+        name it is a prefix of, else the best ranked match. A prefix shared
+        by several names picks the shortest of them ('stre' is Strength
+        rather than Streetwise). Returns None when nothing matches.
+        """
+        key = query.lower().strip()
+        if key in self.names:
+            return self.names[key]
+        prefixed = self._prefixed_keys(key)
+        if len(prefixed) == 1:
+            return self.names[prefixed[0]]
+        return self.best(key, cutoff=cutoff)
+
+    def best(self, query, cutoff=FUZZY_CUTOFF):
+        """
+        Return the single best matching name, or None.
+        """
+        candidates = self.rank(query, limit=1, cutoff=cutoff)
+        return candidates[0].name if candidates else None
+
+
+_catalog_index = None
+_catalog_index_version = None
+
+
+def catalog_name_index():
+    """
+    Return the StatNameIndex over every Stat name in the catalog, rebuilding
+    it if stat definitions changed since it was built.
+    """
+    global _catalog_index, _catalog_index_version
+
+    STAT_CATALOG.ensure_loaded()
+    version = stat_catalog_version()
+    if _catalog_index is None or _catalog_index_version != version:
+        _catalog_index = StatNameIndex(stats[0].name for stats in STAT_CATALOG.by_name.values())
+        _catalog_index_version = version
+    return _catalog_index
+
+
+def resolve_stat_names(query, limit=5):
+    """
+    Return ranked Candidates for query among all Stat names.
+    """
+    return catalog_name_index().rank(query, limit=limit)
+
+
+def find_catalog_stats(name):
+    """
+    Return the Stat rows matching name the way +stats looks them up: exact
+    (case-insensitive) name first, otherwise every stat whose name contains
+    it.
+    """
+    matches = find_stats(name)
+    if matches:
+        return matches
+    stats = []
+    for match in catalog_name_index().containing(name):
+        stats.extend(find_stats(match))
+    return stats
+
+
+def resolve_character_stat(character, query, limit=5):
+    """
+    Return ranked Candidates for query among the stats character has.
+    """
+    return character.stats.name_index.rank(query, limit=limit)